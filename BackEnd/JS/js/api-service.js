@@ -30,13 +30,17 @@ class OfertasService {
         this.baseURL = API_CONFIG.BASE_URL;
     }
 
-    // ========== OBTENER TODAS LAS OFERTAS ==========
-    async obtenerTodasLasOfertas() {
+    // ========== OBTENER UNA PÁGINA DE OFERTAS ==========
+    // El listado viene paginado en el servidor: se pide una página y, para la
+    // siguiente, se vuelve a llamar con el `siguienteCursor` recibido (null = no hay más)
+    async obtenerPaginaOfertas({ cursor = null, limit = 20 } = {}) {
         try {
             if (this.useAPI) {
                 // Modo API (Backend)
+                const params = new URLSearchParams({ limit });
+                if (cursor) params.set('cursor', cursor);
                 const response = await this._fetchWithTimeout(
-                    `${this.baseURL}${API_CONFIG.ENDPOINTS.OFERTAS}`
+                    `${this.baseURL}${API_CONFIG.ENDPOINTS.OFERTAS}?${params}`
                 );
 
                 if (!response.ok) {
@@ -49,10 +53,10 @@ class OfertasService {
                     ...oferta,
                     responsabilidades: oferta.funciones || oferta.responsabilidades || 'No especificado'
                 }));
-                return ofertas;
+                return { ofertas, siguienteCursor: data.siguiente_cursor || null };
             } else {
-                // Modo LocalStorage (Sin Backend)
-                return this._getFromLocalStorage();
+                // Modo LocalStorage (Sin Backend): todo cabe en una página
+                return { ofertas: this._getFromLocalStorage(), siguienteCursor: null };
             }
         } catch (error) {
             console.error('Error al obtener ofertas:', error);
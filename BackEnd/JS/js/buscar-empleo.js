@@ -3,6 +3,7 @@ const busquedaInput = document.getElementById('busqueda');
 const filtroUbicacion = document.getElementById('filtroUbicacion');
 const filtroModalidad = document.getElementById('filtroModalidad');
 const filtroContrato = document.getElementById('filtroContrato');
+const filtroRadio = document.getElementById('filtroRadio');
 const filtroSalarioMin = document.getElementById('filtroSalarioMin');
 
 // Soportar varias convenciones de IDs: legacy `listaOfertas` y nuevo `job-offers-container`
@@ -25,40 +26,146 @@ const resultadosCount = document.getElementById('resultadosCount') || document.g
 // Variables globales
 let todasLasOfertas = [];
 let ofertasFiltradas = [];
+// Cursor de la siguiente página de /api/ofertas (null = no hay más)
+let siguienteCursor = null;
+let busquedaTimer = null;
+let busquedaSeq = 0;
+const OFERTAS_POR_PAGINA = 20;
+// Campos que usan las tarjetas y la tabla (sparse fieldset, sin textos largos)
+const CAMPOS_TARJETA = 'id,titulo,empresa,ubicacion,modalidad,tipoContrato,salarioMin,salarioMax';
+
+// Botón "Cargar más" para la paginación por cursor
+const btnCargarMas = document.createElement('button');
+btnCargarMas.id = 'cargarMasOfertas';
+btnCargarMas.className = 'btn btn-secondary';
+btnCargarMas.textContent = 'Cargar más ofertas';
+btnCargarMas.style.display = 'none';
+btnCargarMas.addEventListener('click', () => cargarOfertas(false));
+listaOfertas.insertAdjacentElement('afterend', btnCargarMas);
 
 // Cargar ofertas al iniciar la página
 window.addEventListener('DOMContentLoaded', async function() {
     await cargarOfertas();
 });
 
-// Función para cargar y mostrar todas las ofertas
-async function cargarOfertas() {
+// Texto de búsqueda con al menos una letra o número (si no, se lista sin buscar)
+function textoBusqueda() {
+    const texto = busquedaInput.value.trim();
+    return /[\p{L}\p{N}]/u.test(texto) ? texto : '';
+}
+
+// Filtros de la página como parámetros de /api/ofertas y /api/ofertas/buscar
+function parametrosFiltros() {
+    const params = new URLSearchParams();
+    const ubicacion = filtroUbicacion.value.trim();
+    const salarioMin = parseFloat(filtroSalarioMin.value) || 0;
+    if (ubicacion) params.set('ubicacion', ubicacion);
+    if (ubicacion && filtroRadio && filtroRadio.value) params.set('radio_km', filtroRadio.value);
+    if (filtroModalidad.value) params.set('modalidad', filtroModalidad.value);
+    if (filtroContrato.value) params.set('tipo_contrato', filtroContrato.value);
+    if (salarioMin > 0) params.set('salario_min', salarioMin);
+    return params;
+}
+
+// Función para cargar y mostrar ofertas. El servidor filtra y pagina: con texto
+// se usa la búsqueda (ordenada por relevancia), sin texto el listado por fecha.
+// `reiniciar` = false agrega la siguiente página a las ya mostradas.
+async function cargarOfertas(reiniciar = true) {
+    const seq = ++busquedaSeq;
+    const texto = textoBusqueda();
+    const params = parametrosFiltros();
+    params.set('fields', CAMPOS_TARJETA);
+    let url;
+    if (texto) {
+        params.set('q', texto);
+        url = '/api/ofertas/buscar?' + params;
+    } else {
+        params.set('limit', OFERTAS_POR_PAGINA);
+        if (!reiniciar && siguienteCursor) params.set('cursor', siguienteCursor);
+        url = '/api/ofertas?' + params;
+    }
+
     try {
-        mostrarCargando(true);
+        if (reiniciar) mostrarCargando(true);
+        btnCargarMas.disabled = true;
 
         // Obtener ofertas desde el backend
-        const resp = await fetch('/api/ofertas');
+        const resp = await fetch(url);
+        let json = {};
         if (resp.ok) {
-            const json = await resp.json();
-            todasLasOfertas = json.ofertas || [];
+            json = await resp.json();
         } else {
             console.warn('Error HTTP al cargar ofertas:', resp.status);
-            todasLasOfertas = [];
         }
 
+        // Descartar respuestas de cargas que ya fueron reemplazadas
+        if (seq !== busquedaSeq) return;
+
+        const pagina = json.ofertas || [];
+        todasLasOfertas = reiniciar ? pagina : todasLasOfertas.concat(pagina);
+        siguienteCursor = json.siguiente_cursor || null;
+
         // DEBUG: mostrar en consola cuántas ofertas llegaron
         try { console.log('[buscar-empleo] ofertas cargadas:', todasLasOfertas.length, todasLasOfertas.slice(0,5)); } catch(e) {}
 
-        // Renderizar tabla para inspección directa y depuración
-        renderOffersTable(todasLasOfertas);
-
         aplicarFiltros();
+        if (reiniciar) cargarFacetas(seq);
 
     } catch (error) {
         console.error('Error al cargar ofertas:', error);
         mostrarError('No se pudieron cargar las ofertas. Por favor, recarga la página.');
     } finally {
-        mostrarCargando(false);
+        btnCargarMas.disabled = false;
+    }
+}
+
+// Sugerencias de ubicación con su conteo (datalist del campo de ubicación)
+const ubicacionesFacetas = document.createElement('datalist');
+ubicacionesFacetas.id = 'ubicacionesFacetas';
+filtroUbicacion.insertAdjacentElement('afterend', ubicacionesFacetas);
+filtroUbicacion.setAttribute('list', ubicacionesFacetas.id);
+
+const NOMBRES_MODALIDAD = { presencial: 'Presencial', hibrido: 'Híbrido', remoto: 'Remoto' };
+
+// Rehace las opciones de un select con los valores de una faceta y su conteo,
+// conservando la opción "Todas" y la selección actual aunque ya no tenga ofertas
+function llenarSelectFaceta(select, valores, nombre = v => v) {
+    const actual = select.value;
+    const todas = select.options[0];
+    select.innerHTML = '';
+    select.appendChild(todas);
+    const elegida = valores.some(v => v.valor.toLowerCase() === actual.toLowerCase());
+    if (actual && !elegida) valores = [{ valor: actual, total: 0 }, ...valores];
+    for (const { valor, total } of valores) {
+        const opcion = document.createElement('option');
+        opcion.value = valor;
+        opcion.textContent = `${nombre(valor)} (${total})`;
+        if (valor.toLowerCase() === actual.toLowerCase()) opcion.selected = true;
+        select.appendChild(opcion);
+    }
+}
+
+// Conteos por modalidad, contrato y ubicación para la búsqueda y filtros actuales
+async function cargarFacetas(seq) {
+    const params = parametrosFiltros();
+    const texto = textoBusqueda();
+    if (texto) params.set('q', texto);
+    try {
+        const resp = await fetch('/api/ofertas/facetas?' + params);
+        if (!resp.ok || seq !== busquedaSeq) return;
+        const { facetas } = await resp.json();
+        if (!facetas || seq !== busquedaSeq) return;
+        llenarSelectFaceta(filtroModalidad, facetas.modalidad, v => NOMBRES_MODALIDAD[v.toLowerCase()] || v);
+        llenarSelectFaceta(filtroContrato, facetas.tipo_contrato);
+        ubicacionesFacetas.innerHTML = '';
+        for (const { valor, total } of facetas.ubicacion) {
+            const opcion = document.createElement('option');
+            opcion.value = valor;
+            opcion.label = `${valor} (${total})`;
+            ubicacionesFacetas.appendChild(opcion);
+        }
+    } catch (error) {
+        console.warn('No se pudieron cargar las facetas:', error);
     }
 }
 
@@ -81,39 +188,17 @@ function mostrarError(mensaje) {
     listaOfertas.style.display = 'block';
 }
 
-// Función para aplicar filtros
-function aplicarFiltros() {
-    const textoBusqueda = busquedaInput.value.toLowerCase().trim();
-    const ubicacion = filtroUbicacion.value.toLowerCase().trim();
-    const modalidad = filtroModalidad.value;
-    const contrato = filtroContrato.value;
-    const salarioMin = parseFloat(filtroSalarioMin.value) || 0;
-
-    ofertasFiltradas = todasLasOfertas.filter(oferta => {
-        // Filtro de búsqueda por texto
-        const cumpleBusqueda = !textoBusqueda ||
-            oferta.titulo.toLowerCase().includes(textoBusqueda) ||
-            oferta.empresa.toLowerCase().includes(textoBusqueda) ||
-            oferta.descripcion.toLowerCase().includes(textoBusqueda);
-
-        // Filtro de ubicación
-        const cumpleUbicacion = !ubicacion ||
-            oferta.ubicacion.toLowerCase().includes(ubicacion);
-
-        // Filtro de modalidad
-        const cumpleModalidad = !modalidad || oferta.modalidad === modalidad;
-
-        // Filtro de tipo de contrato
-        const cumpleContrato = !contrato || oferta.tipoContrato === contrato;
-
-        // Filtro de salario mínimo
-        const cumpleSalario = oferta.salarioMax >= salarioMin;
-
-        return cumpleBusqueda && cumpleUbicacion && cumpleModalidad &&
-            cumpleContrato && cumpleSalario;
-    });
+// Recargar desde el servidor al cambiar búsqueda o filtros (debounce mientras se escribe)
+function programarBusqueda() {
+    clearTimeout(busquedaTimer);
+    busquedaTimer = setTimeout(() => cargarOfertas(true), 250);
+}
 
+// Función para aplicar filtros: el servidor ya los aplicó, solo se muestra el resultado
+function aplicarFiltros() {
+    ofertasFiltradas = todasLasOfertas;
     mostrarOfertas();
+    btnCargarMas.style.display = siguienteCursor ? 'block' : 'none';
 }
 
 // Función para mostrar las ofertas filtradas
@@ -212,11 +297,12 @@ function formatearNumero(numero) {
 }
 
 // Event listeners para filtros en tiempo real
-busquedaInput.addEventListener('input', aplicarFiltros);
-filtroUbicacion.addEventListener('input', aplicarFiltros);
-filtroModalidad.addEventListener('change', aplicarFiltros);
-filtroContrato.addEventListener('change', aplicarFiltros);
-filtroSalarioMin.addEventListener('input', aplicarFiltros);
+busquedaInput.addEventListener('input', programarBusqueda);
+filtroUbicacion.addEventListener('input', programarBusqueda);
+filtroModalidad.addEventListener('change', programarBusqueda);
+filtroContrato.addEventListener('change', programarBusqueda);
+if (filtroRadio) filtroRadio.addEventListener('change', programarBusqueda);
+filtroSalarioMin.addEventListener('input', programarBusqueda);
 
 // Agregar ofertas de ejemplo si no hay ninguna (solo para demostración)
 window.addEventListener('DOMContentLoaded', function() {
@@ -256,340 +342,3 @@ async function applyToJob(jobId) {
         alert('Error al procesar la postulación. Intenta de nuevo.');
     }
 }
-
-// ----------------------
-// Minimal emergency loader
-// ----------------------
-console.log('🚀 INICIANDO CARGA DE OFERTAS (loader alternativo)...');
-// If you want to force using the provided sample JSON instead of fetching from the API,
-// set FORCE_SAMPLE = true. Default is false to use live API data from `/api/ofertas`.
-const FORCE_SAMPLE = false;
-
-// Sample data provided by the user (9 ofertas) - used when FORCE_SAMPLE=true
-const SAMPLE_DATA = {
-    "ofertas": [
-        {
-            "id": 6,
-            "titulo": "Desarrollador Frontend React",
-            "empresa": "Tech Solutions SAS",
-            "sector": "Tecnología",
-            "descripcion": "Buscamos desarrollador frontend con experiencia en React para unirse a nuestro equipo de innovación.",
-            "funciones": "Desarrollar interfaces de usuario, colaborar con equipo backend, optimizar performance",
-            "requisitos": "Experiencia mínima 1 año en React, conocimientos en JavaScript ES6+",
-            "habilidadesRequeridas": [
-                "React",
-                "JavaScript",
-                "CSS",
-                "HTML",
-                "Git"
-            ],
-            "ubicacion": "Bogotá",
-            "modalidad": "Hibrido",
-            "tipoContrato": "Término Indefinido",
-            "jornada": "Tiempo Completo",
-            "salarioMin": 2800000.0,
-            "salarioMax": 3500000.0,
-            "fechaPublicacion": "2025-11-20 18:48:40",
-            "fechaCierre": null
-        },
-        {
-            "id": 7,
-            "titulo": "Programador de software",
-            "empresa": "Tech Solutions SAS",
-            "sector": "Tecnología",
-            "descripcion": "Desarrollo de aplicaciones web y móviles para clientes internacionales",
-            "funciones": "Desarrollar features, escribir tests, participar en code reviews",
-            "requisitos": "Conocimientos en patrones de diseño, bases de datos, APIs REST",
-            "habilidadesRequeridas": [
-                "Java",
-                "Spring Boot",
-                "SQL",
-                "AWS"
-            ],
-            "ubicacion": "Bogotá",
-            "modalidad": "Remoto",
-            "tipoContrato": "Término Indefinido",
-            "jornada": "Tiempo Completo",
-            "salarioMin": 2500000.0,
-            "salarioMax": 3000000.0,
-            "fechaPublicacion": "2025-11-20 18:48:40",
-            "fechaCierre": null
-        },
-        {
-            "id": 8,
-            "titulo": "Desarrollador FullStack Python",
-            "empresa": "Innovación Digital Ltda",
-            "sector": "Desarrollo Software",
-            "descripcion": "Desarrollo de aplicaciones web completas con Django y React",
-            "funciones": "Desarrollo backend con Django, frontend con React, deployment en cloud",
-            "requisitos": "Experiencia con Django REST Framework, React, bases de datos relacionales",
-            "habilidadesRequeridas": [
-                "Python",
-                "Django",
-                "React",
-                "PostgreSQL",
-                "Docker"
-            ],
-            "ubicacion": "Medellín",
-            "modalidad": "Presencial",
-            "tipoContrato": "Término Fijo",
-            "jornada": "Tiempo Completo",
-            "salarioMin": 3000000.0,
-            "salarioMax": 4000000.0,
-            "fechaPublicacion": "2025-11-20 18:48:40",
-            "fechaCierre": null
-        },
-        {
-            "id": 9,
-            "titulo": "Analista de Datos Junior",
-            "empresa": "Desarrollo Web Colombia",
-            "sector": "Tecnología",
-            "descripcion": "Análisis de datos empresariales y creación de reportes",
-            "funciones": "Extraer y analizar datos, crear dashboards, reportes ejecutivos",
-            "requisitos": "Conocimientos en SQL, Excel, Python para análisis de datos",
-            "habilidadesRequeridas": [
-                "SQL",
-                "Python",
-                "Excel",
-                "Power BI",
-                "Estadística"
-            ],
-            "ubicacion": "Cali",
-            "modalidad": "Hibrido",
-            "tipoContrato": "Término Indefinido",
-            "jornada": "Medio Tiempo",
-            "salarioMin": 1800000.0,
-            "salarioMax": 2200000.0,
-            "fechaPublicacion": "2025-11-20 18:48:40",
-            "fechaCierre": null
-        },
-        {
-            "id": 5,
-            "titulo": "barredor",
-            "empresa": "Tech Solutions SAS",
-            "sector": "Tecnología",
-            "descripcion": "barrer",
-            "funciones": "barrer",
-            "requisitos": "escoba",
-            "habilidadesRequeridas": [],
-            "ubicacion": "Bogota, Colombia",
-            "modalidad": "Presencial",
-            "tipoContrato": "Termino indefinido",
-            "jornada": "Tiempo Completo",
-            "salarioMin": 1000000.0,
-            "salarioMax": 50000000.0,
-            "fechaPublicacion": "2025-10-29 01:17:54",
-            "fechaCierre": null
-        },
-        {
-            "id": 1,
-            "titulo": "Desarrollador Frontend React",
-            "empresa": "Tech Solutions SAS",
-            "sector": "Tecnología",
-            "descripcion": "Buscamos desarrollador frontend con experiencia en React para unirse a nuestro equipo de innovación.",
-            "funciones": "Desarrollar interfaces de usuario, colaborar con equipo backend, optimizar performance",
-            "requisitos": "Experiencia mínima 1 año en React, conocimientos en JavaScript ES6+",
-            "habilidadesRequeridas": [
-                "React",
-                "JavaScript",
-                "CSS",
-                "HTML",
-                "Git"
-            ],
-            "ubicacion": "Bogotá",
-            "modalidad": "Hibrido",
-            "tipoContrato": "Término Indefinido",
-            "jornada": "Tiempo Completo",
-            "salarioMin": 2800000.0,
-            "salarioMax": 3500000.0,
-            "fechaPublicacion": "2025-10-27 01:51:21",
-            "fechaCierre": null
-        },
-        {
-            "id": 2,
-            "titulo": "Programador de software",
-            "empresa": "Tech Solutions SAS",
-            "sector": "Tecnología",
-            "descripcion": "Desarrollo de aplicaciones web y móviles para clientes internacionales",
-            "funciones": "Desarrollar features, escribir tests, participar en code reviews",
-            "requisitos": "Conocimientos en patrones de diseño, bases de datos, APIs REST",
-            "habilidadesRequeridas": [
-                "Java",
-                "Spring Boot",
-                "SQL",
-                "AWS"
-            ],
-            "ubicacion": "Bogotá",
-            "modalidad": "Remoto",
-            "tipoContrato": "Término Indefinido",
-            "jornada": "Tiempo Completo",
-            "salarioMin": 2500000.0,
-            "salarioMax": 3000000.0,
-            "fechaPublicacion": "2025-10-27 01:51:21",
-            "fechaCierre": null
-        },
-        {
-            "id": 3,
-            "titulo": "Desarrollador FullStack Python",
-            "empresa": "Innovación Digital Ltda",
-            "sector": "Desarrollo Software",
-            "descripcion": "Desarrollo de aplicaciones web completas con Django y React",
-            "funciones": "Desarrollo backend con Django, frontend con React, deployment en cloud",
-            "requisitos": "Experiencia con Django REST Framework, React, bases de datos relacionales",
-            "habilidadesRequeridas": [
-                "Python",
-                "Django",
-                "React",
-                "PostgreSQL",
-                "Docker"
-            ],
-            "ubicacion": "Medellín",
-            "modalidad": "Presencial",
-            "tipoContrato": "Término Fijo",
-            "jornada": "Tiempo Completo",
-            "salarioMin": 3000000.0,
-            "salarioMax": 4000000.0,
-            "fechaPublicacion": "2025-10-27 01:51:21",
-            "fechaCierre": null
-        },
-        {
-            "id": 4,
-            "titulo": "Analista de Datos Junior",
-            "empresa": "Desarrollo Web Colombia",
-            "sector": "Tecnología",
-            "descripcion": "Análisis de datos empresariales y creación de reportes",
-            "funciones": "Extraer y analizar datos, crear dashboards, reportes ejecutivos",
-            "requisitos": "Conocimientos en SQL, Excel, Python para análisis de datos",
-            "habilidadesRequeridas": [
-                "SQL",
-                "Python",
-                "Excel",
-                "Power BI",
-                "Estadística"
-            ],
-            "ubicacion": "Cali",
-            "modalidad": "Hibrido",
-            "tipoContrato": "Término Indefinido",
-            "jornada": "Medio Tiempo",
-            "salarioMin": 1800000.0,
-            "salarioMax": 2200000.0,
-            "fechaPublicacion": "2025-10-27 01:51:21",
-            "fechaCierre": null
-        }
-    ],
-    "total": 9
-};
-
-async function loadAllJobOffers() {
-    console.log('1. 📡 Cargando ofertas (FORCE_SAMPLE=' + (FORCE_SAMPLE ? 'true' : 'false') + ')...');
-    try {
-        let ofertas = [];
-        if (FORCE_SAMPLE) {
-            ofertas = SAMPLE_DATA.ofertas || [];
-            console.log('2. ✅ Usando SAMPLE_DATA con', ofertas.length, 'ofertas');
-            if (ofertas.length > 0) console.log('3. 📋 Primera oferta (SAMPLE):', ofertas[0]);
-            displayJobOffers(ofertas);
-            return;
-        }
-
-        // Default: fetch from API
-        const response = await fetch('/api/ofertas');
-        console.log('2. ✅ Respuesta recibida:', response.status);
-        if (!response.ok) {
-            throw new Error('Error HTTP: ' + response.status);
-        }
-        const data = await response.json();
-        ofertas = data.ofertas || [];
-        console.log('3. 📊 Datos recibidos:', ofertas.length, 'ofertas');
-        if (ofertas.length > 0) console.log('4. 📋 Primera oferta:', ofertas[0]);
-
-        // Mostrar en el HTML (contenedor crítico)
-        displayJobOffers(ofertas);
-    } catch (error) {
-        console.error('❌ ERROR CRÍTICO al cargar ofertas:', error);
-        showErrorMessage('Error al cargar ofertas: ' + (error.message || error));
-    }
-}
-
-function displayJobOffers(ofertas) {
-    console.log('5. 🎨 Renderizando ofertas en HTML...');
-    const container = document.getElementById('job-offers-container');
-    const noResultsEl = document.getElementById('no-results-message');
-    if (!container) {
-        console.error('❌ NO SE ENCUENTRA EL CONTENEDOR job-offers-container');
-        return;
-    }
-
-    if (!ofertas || ofertas.length === 0) {
-        console.log('6. ℹ️ No hay ofertas para mostrar');
-        container.innerHTML = '';
-        if (noResultsEl) noResultsEl.style.display = 'block';
-        return;
-    }
-
-    if (noResultsEl) noResultsEl.style.display = 'none';
-
-    container.innerHTML = ofertas.map(oferta => `
-        <div class="job-card" data-offer-id="${oferta.id}">
-          <div class="job-header">
-            <h3 class="job-title">${escapeHtml(oferta.titulo || '')}</h3>
-            <p class="company-name">${escapeHtml(oferta.empresa || oferta.empresa_nombre || '')}</p>
-          </div>
-          <p class="job-description">${escapeHtml(oferta.descripcion || '')}</p>
-          <div class="job-details">
-            <div class="detail-item"><strong>📍 Ubicación:</strong> ${escapeHtml(oferta.ubicacion || '')}</div>
-            <div class="detail-item"><strong>🏢 Modalidad:</strong> ${escapeHtml(oferta.modalidad || oferta.modalidad)}</div>
-            <div class="detail-item"><strong>📄 Contrato:</strong> ${escapeHtml(oferta.tipoContrato || oferta.tipo_contrato || '')}</div>
-            <div class="detail-item"><strong>💰 Salario:</strong> $${Number(oferta.salarioMin || oferta.salario_min || 0).toLocaleString()} - $${Number(oferta.salarioMax || oferta.salario_max || 0).toLocaleString()}</div>
-          </div>
-          <div class="job-skills"><strong>🛠️ Habilidades:</strong><div class="skills-tags">${Array.isArray(oferta.habilidadesRequeridas) ? oferta.habilidadesRequeridas.map(s => `<span class="skill-tag">${escapeHtml(s)}</span>`).join('') : (oferta.habilidadesRequeridas ? escapeHtml(oferta.habilidadesRequeridas) : '<span>No especificadas</span>')}</div></div>
-                    <div class="job-footer">
-                        <span class="publish-date">Publicado: ${formatDate(oferta.fechaPublicacion || oferta.fecha_publicacion || oferta.fecha_publicacion)}</span>
-                        <button class="view-details-btn" data-offer-id="${oferta.id}">Ver Detalle de la Oferta</button>
-                    </div>
-        </div>
-    `).join('');
-
-    // Attach click handlers to detail buttons to navigate to the detail page
-    try {
-        const detailButtons = document.querySelectorAll('.view-details, .view-details-btn');
-        detailButtons.forEach(btn => {
-            // avoid double-binding
-            if (btn.__detailAttached) return;
-            btn.__detailAttached = true;
-            btn.addEventListener('click', (e) => {
-                const id = btn.getAttribute('data-offer-id') || btn.dataset.offerId || btn.getAttribute('data-id');
-                if (id) {
-                    window.location.href = '/ofertas/' + id;
-                } else {
-                    console.warn('Detalle: id no encontrado en el botón', btn);
-                }
-            });
-        });
-    } catch (err) {
-        console.warn('No se pudieron attach handlers de detalle:', err);
-    }
-
-    console.log('8. ✅ OFERTAS MOSTRADAS CORRECTAMENTE EN EL HTML');
-}
-
-function formatDate(dateString) {
-    if (!dateString) return 'Fecha no disponible';
-    const d = new Date(dateString);
-    if (isNaN(d.getTime())) return dateString;
-    return d.toLocaleDateString('es-ES');
-}
-
-function showErrorMessage(message) {
-    const container = document.getElementById('job-offers-container');
-    if (container) container.innerHTML = `<div class="error-message">${escapeHtml(message)}</div>`;
-}
-
-function viewOfferDetails(id) {
-    window.location.href = `/ofertas/${id}`;
-}
-
-document.addEventListener('DOMContentLoaded', function() {
-    console.log('🎯 PÁGINA CARGADA - Ejecutando loadAllJobOffers()');
-    loadAllJobOffers();
-});
\ No newline at end of file
@@ -5,7 +5,9 @@ document.addEventListener('DOMContentLoaded', () => {
         // Clear simple cookies set by login.js
         document.cookie = 'user_id=; Max-Age=0; path=/';
         document.cookie = 'rol=; Max-Age=0; path=/';
-        // redirect to home/login
-        window.location.href = '/';
+        // The signed session cookie is HttpOnly, so the server clears it
+        fetch('/api/logout', { method: 'POST', credentials: 'same-origin' })
+            .catch(() => {})
+            .finally(() => { window.location.href = '/'; });
     });
 });
@@ -16,7 +16,9 @@ async function cargarCursos() {
     try {
         mostrarCargando(true);
 
-        const response = await fetch(`${API_URL}/api/cursos`);
+        // Solo los campos de la tarjeta: objetivos y temario se ven en el detalle
+        const campos = 'id,titulo,empresa,descripcion,nivel_dificultad,duracion_estimada,sector,formato_contenido';
+        const response = await fetch(`${API_URL}/api/cursos?fields=${campos}`);
         
         if (!response.ok) {
             throw new Error(`Error HTTP: ${response.status}`);
@@ -52,7 +52,7 @@ async function cargarDetalleCurso(cursoId, usuarioId) {
         const curso = await response.json();
         
         // Cargar información de la inscripción del usuario
-        const perfilResponse = await fetch(`${API_URL}/api/perfiles/${usuarioId}`);
+        const perfilResponse = await fetch(`${API_URL}/api/perfiles/${usuarioId}?fields=inscripciones`);
         let inscripcionData = null;
         
         if (perfilResponse.ok) {
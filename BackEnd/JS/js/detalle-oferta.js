@@ -41,6 +41,7 @@ async function cargarDetalleOferta() {
         }
 
         mostrarDetalleOferta(oferta);
+        cargarOfertasSimilares();
 
     } catch (error) {
         console.error('Error al cargar oferta:', error);
@@ -132,6 +133,31 @@ function mostrarDetalleOferta(oferta) {
     `;
 }
 
+// Función para mostrar ofertas parecidas a la actual (el panel queda oculto si no hay)
+async function cargarOfertasSimilares() {
+    const seccion = document.getElementById('ofertasSimilares');
+    const lista = document.getElementById('listaSimilares');
+    if (!seccion || !lista) return;
+    try {
+        const resp = await fetch(`/api/ofertas/${encodeURIComponent(idOferta)}/similares?limit=4`);
+        if (!resp.ok) return;
+        const json = await resp.json();
+        const items = (json && json.data) || [];
+        if (!items.length) return;
+        lista.innerHTML = items.map(it => `
+            <div class="oferta-card">
+                <div class="oferta-empresa">${it.empresa || ''}</div>
+                <h3>${it.titulo}</h3>
+                <div class="oferta-info">${it.ubicacion || ''} · ${it.modalidad || ''}</div>
+                <div class="detalle-actions"><a class="btn btn-primary" href="/ofertas/${it.id}">Ver Oferta</a></div>
+            </div>
+        `).join('');
+        seccion.style.display = 'block';
+    } catch (err) {
+        console.error('Error cargando ofertas similares', err);
+    }
+}
+
 // Función para formatear números con comas
 function formatearNumero(numero) {
     return numero.toLocaleString('es-ES');
@@ -45,8 +45,10 @@ document.addEventListener('DOMContentLoaded', function () {
         sessionStorage.removeItem('userId');
         // borrar cookie user_id intentando expulsarla
         document.cookie = 'user_id=; Path=/; Expires=Thu, 01 Jan 1970 00:00:01 GMT;';
-        // redirigir al login
-        window.location.href = '/';
+        // la cookie de sesión firmada es HttpOnly: la borra el servidor
+        fetch('/api/logout', { method: 'POST', credentials: 'same-origin' })
+            .catch(() => {})
+            .finally(() => { window.location.href = '/'; });
     }
 
     function fetchProfileAndRender() {
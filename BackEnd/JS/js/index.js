@@ -207,7 +207,7 @@ document.addEventListener('DOMContentLoaded', function () {
         quick.querySelectorAll('button[data-href]').forEach(b=>b.addEventListener('click',()=>{ window.location.href = b.getAttribute('data-href'); }));
 
         // cargar alertas (simples: últimas 3 ofertas)
-        fetch('/api/ofertas')
+        fetch('/api/ofertas?limit=3&fields=titulo,empresa,ubicacion,modalidad')
             .then(r=>r.json())
             .then(j=>{
                 const alerts = (j.ofertas || []).slice(0,3);
@@ -24,13 +24,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 return null;
             }
 
-            // Guardar información de sesión en sessionStorage y cookie ligera
+            // Guardar información de sesión en sessionStorage; la sesión en sí
+            // es la cookie firmada (HttpOnly) que emite el servidor
             try {
                 const session = data.session || {};
-                if (session.user_id) {
-                    // cookie ligera para compatibilidad con shims existentes
-                    document.cookie = `user_id=${session.user_id}; path=/`;
-                }
                 // almacenar tipo de usuario en sessionStorage (o localStorage si prefieres persistencia)
                 if (session.rol) sessionStorage.setItem('userType', session.rol);
                 if (session.user_id) sessionStorage.setItem('userId', session.user_id);
@@ -1,14 +1,7 @@
 document.addEventListener('DOMContentLoaded', function () {
-    // Try to get userId from sessionStorage, then cookie, then /api/session
-    function getCookie(name) {
-        const m = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
-        return m ? decodeURIComponent(m[1]) : null;
-    }
-
+    // Try to get userId from sessionStorage, then /api/session
     async function loadSession() {
-        let uid = sessionStorage.getItem('userId');
-        if (uid) return uid;
-        uid = getCookie('user_id');
+        const uid = sessionStorage.getItem('userId');
         if (uid) return uid;
 
         try {
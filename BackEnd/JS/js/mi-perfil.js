@@ -1,15 +1,11 @@
 document.addEventListener('DOMContentLoaded', () => {
-    // Try to load session user_id from cookie
-    function getCookie(name) {
-        const m = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
-        return m ? decodeURIComponent(m[1]) : null;
-    }
-
-    const uid = getCookie('user_id');
-    if (!uid) return;
-
-    // Fetch profile and render basic info
-    fetch(`/api/perfiles/${uid}`)
+    // Load the signed session from the server, then the profile
+    fetch('/api/session')
+        .then(r => r.json())
+        .then(j => {
+            if (!j.logged || !j.session) throw new Error('Sin sesión');
+            return fetch(`/api/perfiles/${j.session.id}?fields=nombre,email`);
+        })
         .then(r => r.json())
         .then(data => {
             const elName = document.getElementById('perfil-nombre');
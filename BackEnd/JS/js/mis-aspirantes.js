@@ -1,24 +1,57 @@
 // mis-aspirantes.js
 const empresaId = 3; // TechSolutions SAS (hardcoded per requirement)
 
-async function loadAspirantes() {
+const ASPIRANTES_POR_PAGINA = 50;
+// Cursor de la siguiente página (null = no hay más)
+let siguienteCursor = null;
+
+// Filtros del panel como parámetros de la API
+function parametrosAspirantes(cursor) {
+    const params = new URLSearchParams({ limit: ASPIRANTES_POR_PAGINA });
+    const estado = document.getElementById('filtroEstado');
+    const desde = document.getElementById('filtroDesde');
+    const hasta = document.getElementById('filtroHasta');
+    if (estado && estado.value) params.set('estado', estado.value);
+    if (desde && desde.value) params.set('desde', desde.value);
+    if (hasta && hasta.value) params.set('hasta', hasta.value);
+    if (cursor) params.set('cursor', cursor);
+    return params;
+}
+
+// Enlace de descarga con los mismos filtros que la tabla (todas las páginas)
+function actualizarEnlaceExportar() {
+    const enlace = document.getElementById('aspirantes-exportar');
+    if (!enlace) return;
+    const params = parametrosAspirantes(null);
+    params.delete('limit');
+    params.set('format', 'csv');
+    enlace.href = `/api/empresa/${empresaId}/postulaciones/export?${params}`;
+}
+
+// Carga la primera página, o agrega la siguiente si `masResultados` es true
+async function loadAspirantes(masResultados = false) {
+    const btnMas = document.getElementById('aspirantes-mas');
     try {
-        const resp = await fetch(`/api/empresa/${empresaId}/aspirantes`);
+        const cursor = masResultados ? siguienteCursor : null;
+        const resp = await fetch(`/api/empresa/${empresaId}/aspirantes?${parametrosAspirantes(cursor)}`);
         if (!resp.ok) throw new Error('Error fetching aspirantes: ' + resp.status);
         const json = await resp.json();
         const list = json.aspirantes || [];
-        renderAspirantes(list);
+        siguienteCursor = json.siguiente_cursor || null;
+        renderAspirantes(list, masResultados);
+        if (btnMas) btnMas.style.display = siguienteCursor ? 'inline-block' : 'none';
     } catch (err) {
         console.error('Error cargando aspirantes:', err);
-        createSampleApplicants();
+        if (btnMas) btnMas.style.display = 'none';
+        if (!masResultados) createSampleApplicants();
     }
 }
 
-function renderAspirantes(list) {
+function renderAspirantes(list, agregar = false) {
     const tbody = document.getElementById('aspirantes-body');
     const empty = document.getElementById('aspirantes-empty');
-    tbody.innerHTML = '';
-    if (!list || list.length === 0) {
+    if (!agregar) tbody.innerHTML = '';
+    if (!agregar && (!list || list.length === 0)) {
         empty.style.display = 'block';
         return;
     }
@@ -26,6 +59,7 @@ function renderAspirantes(list) {
     list.forEach(a => {
         const tr = document.createElement('tr');
         tr.innerHTML = `
+            <td style="border:1px solid #ddd;padding:8px"><input type="checkbox" class="aspirante-check" value="${a.postulacion_id}"></td>
             <td style="border:1px solid #ddd;padding:8px">${escapeHtml(a.nombres || '')} ${escapeHtml(a.apellidos || '')}</td>
             <td style="border:1px solid #ddd;padding:8px">${escapeHtml(a.email || '')}</td>
             <td style="border:1px solid #ddd;padding:8px">${escapeHtml(a.puesto_aplicado || '')}</td>
@@ -66,6 +100,35 @@ async function cambiarEstado(postulacionId, nuevoEstado) {
     }
 }
 
+// Cambia el estado de todas las postulaciones marcadas con una sola petición
+async function aplicarEstadoLote() {
+    const nuevoEstado = document.getElementById('loteEstado').value;
+    const cambios = Array.from(document.querySelectorAll('.aspirante-check:checked'))
+        .map(c => ({ postulacion_id: Number(c.value), nuevo_estado: nuevoEstado, observaciones: 'Cambio desde panel empresa' }));
+    if (!cambios.length) {
+        alert('Selecciona al menos un aspirante');
+        return;
+    }
+    try {
+        const resp = await fetch(`/api/empresa/${empresaId}/postulaciones/estado`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ cambios, usuario: 'empresa' })
+        });
+        const data = await resp.json();
+        if (!resp.ok) {
+            alert('Error cambiando estados: ' + (data.detail || JSON.stringify(data)));
+            return;
+        }
+        const errores = data.resultados.filter(r => !r.ok).map(r => `#${r.postulacion_id}: ${r.error}`);
+        alert(`Estados actualizados: ${data.aplicados}` + (errores.length ? `\nNo aplicados:\n${errores.join('\n')}` : ''));
+        loadAspirantes();
+    } catch (err) {
+        console.error('Error al cambiar estados:', err);
+        alert('Error al cambiar estados');
+    }
+}
+
 function createSampleApplicants() {
     const sample = [
         { nombres: 'Ana', apellidos: 'López', email: 'ana.lopez@email.com', puesto_aplicado: 'Desarrollador Frontend React', fecha_postulacion: '2024-01-15', estado:'pendiente', usuario_id: 101, postulacion_id: 1001 },
@@ -76,4 +139,19 @@ function createSampleApplicants() {
 
 function escapeHtml(s) { if (!s) return ''; return String(s).replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;').replace(/"/g,'&quot;').replace(/'/g,'&#039;'); }
 
-window.addEventListener('DOMContentLoaded', loadAspirantes);
+window.addEventListener('DOMContentLoaded', () => {
+    loadAspirantes();
+    actualizarEnlaceExportar();
+    ['filtroEstado', 'filtroDesde', 'filtroHasta'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) el.addEventListener('change', () => { loadAspirantes(); actualizarEnlaceExportar(); });
+    });
+    const btnMas = document.getElementById('aspirantes-mas');
+    if (btnMas) btnMas.addEventListener('click', () => loadAspirantes(true));
+    const btnLote = document.getElementById('btnAplicarLote');
+    if (btnLote) btnLote.addEventListener('click', aplicarEstadoLote);
+    const todos = document.getElementById('seleccionarTodos');
+    if (todos) todos.addEventListener('change', () => {
+        document.querySelectorAll('.aspirante-check').forEach(c => { c.checked = todos.checked; });
+    });
+});
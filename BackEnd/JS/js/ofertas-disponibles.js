@@ -4,12 +4,30 @@ document.addEventListener('DOMContentLoaded', function () {
     const countEl = document.getElementById('ofertasCount');
     const noEl = document.getElementById('noOfertas');
 
-    async function loadOfertas() {
+    // Paginación por cursor: cada "Cargar más" trae la siguiente página
+    let ofertas = [];
+    let siguienteCursor = null;
+    const btnMas = document.createElement('button');
+    btnMas.className = 'btn btn-secondary';
+    btnMas.textContent = 'Cargar más ofertas';
+    btnMas.style.display = 'none';
+    btnMas.addEventListener('click', () => loadOfertas(siguienteCursor));
+    if (grid) grid.insertAdjacentElement('afterend', btnMas);
+
+    async function loadOfertas(cursor = null) {
         try {
-            const resp = await fetch('/api/ofertas');
+            const params = new URLSearchParams({
+                limit: 20,
+                fields: 'id,titulo,empresa,descripcion,ubicacion,modalidad,tipoContrato,habilidadesRequeridas'
+            });
+            if (cursor) params.set('cursor', cursor);
+            btnMas.disabled = true;
+            const resp = await fetch('/api/ofertas?' + params);
             if (!resp.ok) throw new Error('HTTP ' + resp.status);
             const data = await resp.json();
-            const ofertas = data.ofertas || [];
+            ofertas = cursor ? ofertas.concat(data.ofertas || []) : (data.ofertas || []);
+            siguienteCursor = data.siguiente_cursor || null;
+            btnMas.style.display = siguienteCursor ? 'block' : 'none';
 
             if (!ofertas.length) {
                 if (countEl) countEl.textContent = '0 ofertas disponibles';
@@ -47,6 +65,8 @@ document.addEventListener('DOMContentLoaded', function () {
             if (countEl) countEl.textContent = 'Error cargando ofertas';
             if (noEl) noEl.style.display = 'block';
             if (grid) grid.innerHTML = '';
+        } finally {
+            btnMas.disabled = false;
         }
     }
 
@@ -1,14 +1,11 @@
 document.addEventListener('DOMContentLoaded', () => {
     // Simple loader for empresa profile page — mirrors mi-perfil behavior
-    function getCookie(name) {
-        const m = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
-        return m ? decodeURIComponent(m[1]) : null;
-    }
-
-    const uid = getCookie('user_id');
-    if (!uid) return;
-
-    fetch(`/api/perfiles/empresa/${uid}`)
+    fetch('/api/session')
+        .then(r => r.json())
+        .then(j => {
+            if (!j.logged || !j.session) throw new Error('Sin sesión');
+            return fetch(`/api/perfiles/empresa/${j.session.id}`);
+        })
         .then(r => {
             if (!r.ok) throw new Error('No autorizado o perfil no encontrado');
             return r.json();
@@ -0,0 +1,155 @@
+"""Benchmark: cargas concurrentes de perfiles contra el event loop.
+
+Copia CEO.db a un directorio temporal, le agrega insignias al usuario para
+que su perfil sea pesado y lanza N GET /api/perfiles/{id} a la vez, vía
+httpx.ASGITransport (sin servidor). Mientras tanto un ticker de asyncio mide
+cuánto se atrasa el event loop.
+
+Se mide dos veces: con `ejecutar_en_db` como está (executor) y con las
+mismas consultas corriendo en el propio loop, como antes de `ejecutar_en_db`.
+En el segundo caso el loop queda bloqueado toda la ráfaga. El script termina
+con código 1 si, con el executor, el atraso típico (mediana) del loop supera
+la cuarta parte de lo que tardan las N cargas en serie, es decir, si las
+cargas vuelven a bloquear el loop.
+
+El tiempo total de la ráfaga depende de los núcleos: con uno solo el trabajo
+de CPU de los perfiles no se paraleliza y el total se parece al de en serie;
+lo que cambia es que el loop sigue atendiendo entre medio. El máximo puede
+seguir alto con un núcleo: los hilos del executor se reparten el GIL con el
+loop y a veces lo dejan esperando, por eso se compara la mediana.
+
+Uso (desde BackEnd/):
+    python bench/perfiles_concurrentes.py [-n 16] [--insignias 2000] [--usuario 1]
+"""
+
+import argparse
+import asyncio
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preparar_base(destino: str, usuario_id: int, insignias: int) -> None:
+    shutil.copy(os.path.join(BACKEND, 'CEO.db'), destino)
+    conn = sqlite3.connect(destino)
+    try:
+        curso = conn.execute('SELECT MIN(id) FROM cursos').fetchone()[0]
+        conn.executemany(
+            "INSERT INTO insignias (usuario_id, curso_id, nombre, descripcion) VALUES (?, ?, ?, 'bench')",
+            [(usuario_id, curso, f'insignia {i}') for i in range(insignias)]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def entorno(backend) -> str:
+    return (
+        f"Python {platform.python_version()} ({platform.python_implementation()}), "
+        f"{platform.system()} {platform.release()} {platform.machine()}, "
+        f"{os.cpu_count()} CPU, SQLite {sqlite3.sqlite_version}, "
+        f"db_executor {backend.db_executor._max_workers} hilos, pool {backend.DB_POOL_SIZE} conexiones"
+    )
+
+
+async def rafaga(app, ruta: str, concurrentes: int) -> dict:
+    """Una carga de calentamiento, N en serie y N a la vez; devuelve las medidas."""
+    import httpx
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url='http://bench') as cliente:
+        primera = await cliente.get(ruta)
+        primera.raise_for_status()
+
+        t0 = time.perf_counter()
+        for _ in range(concurrentes):
+            (await cliente.get(ruta)).raise_for_status()
+        en_serie = time.perf_counter() - t0
+
+        atrasos = []
+        activo = True
+
+        async def ticker():
+            while activo:
+                t = time.perf_counter()
+                await asyncio.sleep(0.001)
+                atrasos.append(time.perf_counter() - t - 0.001)
+
+        tarea = asyncio.create_task(ticker())
+        t0 = time.perf_counter()
+        respuestas = await asyncio.gather(*[cliente.get(ruta) for _ in range(concurrentes)])
+        concurrente = time.perf_counter() - t0
+        activo = False
+        await tarea
+
+    return {
+        'bytes': len(primera.content),
+        'estados': sorted({r.status_code for r in respuestas}),
+        'en_serie': en_serie,
+        'concurrente': concurrente,
+        'atraso_mediana': statistics.median(atrasos) if atrasos else concurrente,
+        'atraso_max': max(atrasos, default=concurrente),
+    }
+
+
+def imprimir(titulo: str, m: dict) -> None:
+    print(f'{titulo}:')
+    print(f'  en serie:     {m["en_serie"] * 1000:8.0f} ms')
+    print(f'  concurrentes: {m["concurrente"] * 1000:8.0f} ms  (estados {m["estados"]})')
+    print(f'  atraso del event loop: mediana {m["atraso_mediana"] * 1000:.1f} ms, '
+          f'máximo {m["atraso_max"] * 1000:.0f} ms')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--concurrentes', type=int, default=16)
+    parser.add_argument('--insignias', type=int, default=2000)
+    parser.add_argument('--usuario', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_db = os.path.join(tmp, 'CEO.db')
+        preparar_base(ruta_db, args.usuario, args.insignias)
+        # main.py lee la configuración al importarse
+        os.environ['CEO_DB_PATH'] = ruta_db
+        os.environ.setdefault('CEO_SESSION_EPHEMERAL_KEY', '1')
+        sys.path.insert(0, BACKEND)
+        import main as backend
+
+        backend.inicializar_base_datos()
+        ruta = f'/api/perfiles/{args.usuario}'
+        print(entorno(backend))
+
+        ejecutar_en_db = backend.ejecutar_en_db
+
+        async def en_el_loop(funcion, *fargs):
+            return backend._ejecutar_con_conexion(funcion, fargs)
+
+        backend.ejecutar_en_db = en_el_loop
+        try:
+            bloqueante = asyncio.run(rafaga(backend.app, ruta, args.concurrentes))
+        finally:
+            backend.ejecutar_en_db = ejecutar_en_db
+        medida = asyncio.run(rafaga(backend.app, ruta, args.concurrentes))
+
+    print(f'{ruta}: {args.concurrentes} peticiones de {medida["bytes"]} bytes')
+    imprimir('consultas en el event loop (como antes)', bloqueante)
+    imprimir('consultas en db_executor', medida)
+
+    umbral = medida['en_serie'] / 4
+    if medida['atraso_mediana'] > umbral:
+        print(f'FALLA: la mediana del atraso ({medida["atraso_mediana"] * 1000:.1f} ms) supera '
+              f'{umbral * 1000:.0f} ms; las cargas de perfil están bloqueando el event loop')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,43 @@
-from fastapi import FastAPI, HTTPException, status, Depends
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, BackgroundTasks, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import asyncio
+import base64
+import csv
+import hmac
+import io
+import pathlib
+import re
+import secrets
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+import anyio
 import sqlite3
 import json
-from datetime import datetime
+import queue
+import threading
+import time
+import heapq
+import itertools
+import logging
+import math
+import multiprocessing
+import unicodedata
+import zlib
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from json.encoder import encode_basestring
+from email.utils import formatdate, parsedate_to_datetime
 #from BackEnd.models.models import Postulacion, PostulacionCreate, CambioEstadoRequest, EstadoPostulacion
 
 app = FastAPI(title="Sistema de Postulaciones CEO")
+logger = logging.getLogger(__name__)
 
 # Configurar CORS para permitir peticiones desde el frontend
 app.add_middleware(
@@ -28,6 +55,14 @@ app.add_middleware(
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.getenv("CEO_DB_PATH", os.path.join(BASE_DIR, "CEO.db"))
 
+# Ajustes de SQLite aplicados a cada conexión (ver `configurar_conexion`)
+DB_JOURNAL_MODE = os.getenv("CEO_DB_JOURNAL_MODE", "WAL").upper()
+DB_SYNCHRONOUS = os.getenv("CEO_DB_SYNCHRONOUS", "NORMAL").upper()
+DB_MMAP_SIZE = int(os.getenv("CEO_DB_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+DB_CACHE_SIZE = int(os.getenv("CEO_DB_CACHE_SIZE", "-65536"))  # negativo = KiB (64 MiB)
+DB_TEMP_STORE = os.getenv("CEO_DB_TEMP_STORE", "MEMORY").upper()
+DB_BUSY_TIMEOUT = int(os.getenv("CEO_DB_BUSY_TIMEOUT", "5000"))  # ms
+
 # --- Servir archivos estáticos / HTML del FrontEnd y del propio BackEnd ---
 # Project root (para que las rutas absolutas como /Sprint1/FrontEnd/... funcionen)
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, os.pardir))
@@ -46,6 +81,421 @@ if os.path.isdir(FRONTEND_DIR):
 app.mount("/BackEnd", StaticFiles(directory=BASE_DIR), name="backend_static")
 
 
+# ================================
+# Pool de conexiones SQLite (solo lectura)
+# ================================
+
+# Los endpoints GET leen desde conexiones `mode=ro` + `query_only`; todas las
+# escrituras pasan por `db_writer`. En WAL los lectores no bloquean al escritor,
+# así que este pool se dimensiona según la concurrencia de lectura.
+# CEO_DB_POOL_SIZE se mantiene como alias del nombre anterior.
+DB_POOL_SIZE = int(os.getenv("CEO_DB_READ_POOL_SIZE", os.getenv("CEO_DB_POOL_SIZE", "8")))
+DB_POOL_TIMEOUT = float(os.getenv("CEO_DB_POOL_TIMEOUT", "5"))
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def configurar_conexion(conn: sqlite3.Connection, solo_lectura: bool = False) -> sqlite3.Connection:
+    """Aplica los PRAGMA de rendimiento configurados por variables de entorno.
+
+    Con `solo_lectura` no se toca `journal_mode` (es persistente y lo fija el
+    arranque) y se activa `query_only` como segunda barrera ante escrituras.
+    """
+    if DB_JOURNAL_MODE not in _JOURNAL_MODES:
+        raise ValueError(f"CEO_DB_JOURNAL_MODE inválido: {DB_JOURNAL_MODE}")
+    if DB_SYNCHRONOUS not in _SYNCHRONOUS:
+        raise ValueError(f"CEO_DB_SYNCHRONOUS inválido: {DB_SYNCHRONOUS}")
+    if DB_TEMP_STORE not in _TEMP_STORES:
+        raise ValueError(f"CEO_DB_TEMP_STORE inválido: {DB_TEMP_STORE}")
+    # busy_timeout primero: cambiar journal_mode puede necesitar esperar un lock
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT}")
+    if solo_lectura:
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = {DB_CACHE_SIZE}")
+    conn.execute(f"PRAGMA temp_store = {DB_TEMP_STORE}")
+    return conn
+
+
+class SQLitePool:
+    """Pool acotado de conexiones SQLite reutilizables entre peticiones.
+
+    Las conexiones se abren bajo demanda hasta `size`. Cuando todas están en uso,
+    `acquire` espera como máximo `timeout` segundos a que se libere alguna.
+    Con `solo_lectura` se abren en modo URI `mode=ro`.
+    """
+
+    def __init__(self, db_path: str, size: int, timeout: float, solo_lectura: bool = False):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.solo_lectura = solo_lectura
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._creadas = 0
+        self._en_uso = 0
+        self._adquisiciones = 0
+        self._esperas = 0
+        self._timeouts = 0
+        self._descartadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    def _conectar(self) -> sqlite3.Connection:
+        # Las conexiones viajan entre hilos del threadpool de FastAPI, pero nunca
+        # se usan desde dos hilos a la vez: el pool garantiza un solo dueño.
+        if self.solo_lectura:
+            destino = f"{pathlib.Path(self.db_path).resolve().as_uri()}?mode=ro"
+        else:
+            destino = self.db_path
+        conn = sqlite3.connect(
+            destino, timeout=DB_BUSY_TIMEOUT / 1000, check_same_thread=False,
+            uri=self.solo_lectura
+        )
+        conn.row_factory = sqlite3.Row
+        return configurar_conexion(conn, self.solo_lectura)
+
+    def acquire(self) -> sqlite3.Connection:
+        inicio = time.monotonic()
+        try:
+            conn = self._libres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                crear = self._creadas < self.size
+                if crear:
+                    self._creadas += 1
+                else:
+                    self._esperas += 1
+            if crear:
+                try:
+                    conn = self._conectar()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._creadas -= 1
+                    raise
+            else:
+                try:
+                    conn = self._libres.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise TimeoutError(
+                        f"No hay conexiones libres tras esperar {self.timeout}s"
+                    )
+        espera = time.monotonic() - inicio
+        with self._lock:
+            self._en_uso += 1
+            self._adquisiciones += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        # Una transacción abierta significa que el handler falló antes del commit
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._en_uso -= 1
+                self._creadas -= 1
+                self._descartadas += 1
+            return
+        with self._lock:
+            self._en_uso -= 1
+        self._libres.put(conn)
+
+    def conexion_aparte(self) -> sqlite3.Connection:
+        """Conexión con la misma configuración pero fuera del pool; la cierra quien la pide.
+
+        Para lecturas largas (exportaciones) que no deben ocupar un hueco del pool.
+        """
+        return self._conectar()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._creadas -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "timeout_s": self.timeout,
+                "solo_lectura": self.solo_lectura,
+                "abiertas": self._creadas,
+                "en_uso": self._en_uso,
+                "libres": self._creadas - self._en_uso,
+                "adquisiciones": self._adquisiciones,
+                "esperas": self._esperas,
+                "timeouts": self._timeouts,
+                "descartadas": self._descartadas,
+                "espera_promedio_ms": round(1000 * self._espera_total / self._adquisiciones, 3) if self._adquisiciones else 0.0,
+                "espera_max_ms": round(1000 * self._espera_max, 3),
+            }
+
+
+db_pool = SQLitePool(DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, solo_lectura=True)
+
+
+def get_db():
+    """Dependencia de FastAPI: presta una conexión de lectura durante la petición."""
+    try:
+        conn = db_pool.acquire()
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos ocupada, intenta de nuevo"
+        )
+    try:
+        yield conn
+    finally:
+        db_pool.release(conn)
+
+
+# Executor propio para las consultas que lanzan los endpoints `async def`:
+# así el driver síncrono de sqlite3 nunca bloquea el event loop y estas tareas
+# no compiten con el threadpool que FastAPI usa para los endpoints síncronos.
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="ceo-db")
+
+
+def _ejecutar_con_conexion(funcion, args):
+    try:
+        conn = db_pool.acquire()
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Base de datos ocupada, intenta de nuevo"
+        )
+    try:
+        return funcion(conn, *args)
+    finally:
+        db_pool.release(conn)
+
+
+async def ejecutar_en_db(funcion, *args):
+    """Ejecuta `funcion(conn, *args)` en `db_executor` con una conexión del pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, _ejecutar_con_conexion, funcion, args)
+
+
+def como_json(funcion):
+    """Envuelve `funcion` para que su resultado también se serialice en el executor.
+
+    Los endpoints `async def` serializan la respuesta en el event loop; con
+    perfiles grandes eso bloquea tanto como la propia consulta.
+    """
+    def envoltura(conn, *args):
+        return JSONResponse(funcion(conn, *args))
+    return envoltura
+
+
+# ================================
+# Escritor único con group commit
+# ================================
+
+DB_WRITER_BATCH_MAX = int(os.getenv("CEO_DB_WRITER_BATCH_MAX", "64"))
+DB_WRITER_FLUSH_MS = float(os.getenv("CEO_DB_WRITER_FLUSH_MS", "2"))
+DB_WRITER_TIMEOUT = float(os.getenv("CEO_DB_WRITER_TIMEOUT", "10"))
+
+
+class EscritorSQLite:
+    """Hilo dueño de la única conexión de escritura.
+
+    Los endpoints encolan operaciones `funcion(conn, *args)`; el hilo las agrupa
+    en lotes de hasta `batch_max` (esperando como mucho `flush_ms` a que llegue
+    más trabajo) y confirma cada lote con un solo COMMIT. Cada operación corre
+    dentro de un SAVEPOINT: si lanza una excepción solo se deshace ella y el
+    error le llega a quien la envió; el resto del lote se confirma igual.
+    Las operaciones no deben llamar a `conn.commit()`.
+    """
+
+    def __init__(self, db_path: str, batch_max: int, flush_ms: float):
+        self.db_path = db_path
+        self.batch_max = max(1, batch_max)
+        self.flush_s = max(0.0, flush_ms) / 1000
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._lotes = 0
+        self._operaciones = 0
+        self._fallidas = 0
+        self._lote_max = 0
+        self._commit_total = 0.0
+        self._al_confirmar = []
+
+    def al_confirmar(self, funcion) -> None:
+        """Registra `funcion(conn)`, que corre en el hilo tras cada COMMIT y antes
+        de entregar los resultados del lote a quienes esperan."""
+        self._al_confirmar.append(funcion)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="ceo-db-writer", daemon=True)
+            self._hilo.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._cola.put(None)
+            hilo.join()
+
+    def submit(self, funcion, *args) -> Future:
+        self.start()
+        futuro = Future()
+        self._cola.put((funcion, args, futuro))
+        return futuro
+
+    def _conectar(self) -> sqlite3.Connection:
+        # isolation_level=None: las transacciones las abre y cierra el propio bucle
+        conn = sqlite3.connect(
+            self.db_path, timeout=DB_BUSY_TIMEOUT / 1000,
+            isolation_level=None, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        return configurar_conexion(conn)
+
+    def _bucle(self) -> None:
+        conn = self._conectar()
+        try:
+            activo = True
+            while activo:
+                item = self._cola.get()
+                if item is None:
+                    break
+                lote = [item]
+                limite = time.monotonic() + self.flush_s
+                while len(lote) < self.batch_max:
+                    try:
+                        restante = limite - time.monotonic()
+                        item = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        activo = False
+                        break
+                    lote.append(item)
+                self._procesar(conn, lote)
+        finally:
+            conn.close()
+
+    def _procesar(self, conn: sqlite3.Connection, lote) -> None:
+        resultados = []
+        inicio = time.monotonic()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for funcion, args, futuro in lote:
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT operacion")
+                try:
+                    valor = funcion(conn, *args)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO operacion")
+                    conn.execute("RELEASE operacion")
+                    resultados.append((futuro, None, exc))
+                else:
+                    conn.execute("RELEASE operacion")
+                    resultados.append((futuro, valor, None))
+            conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            # Falló el BEGIN o el COMMIT: nada del lote quedó escrito
+            if conn.in_transaction:
+                conn.rollback()
+            # Incluye las que no llegaron a empezar; si no, esperarían hasta el timeout
+            for _, _, futuro in lote:
+                if futuro.done():
+                    continue
+                if futuro.running() or futuro.set_running_or_notify_cancel():
+                    futuro.set_exception(exc)
+            with self._lock:
+                self._fallidas += len(lote)
+            return
+        duracion = time.monotonic() - inicio
+        with self._lock:
+            self._lotes += 1
+            self._operaciones += len(resultados)
+            self._fallidas += sum(1 for _, _, exc in resultados if exc is not None)
+            self._lote_max = max(self._lote_max, len(resultados))
+            self._commit_total += duracion
+        for funcion in self._al_confirmar:
+            try:
+                funcion(conn)
+            except sqlite3.Error:
+                pass
+        for futuro, valor, exc in resultados:
+            if exc is not None:
+                futuro.set_exception(exc)
+            else:
+                futuro.set_result(valor)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "batch_max": self.batch_max,
+                "flush_ms": self.flush_s * 1000,
+                "activo": self._hilo is not None and self._hilo.is_alive(),
+                "pendientes": self._cola.qsize(),
+                "lotes": self._lotes,
+                "operaciones": self._operaciones,
+                "fallidas": self._fallidas,
+                "lote_max": self._lote_max,
+                "lote_promedio": round(self._operaciones / self._lotes, 2) if self._lotes else 0.0,
+                "lote_ms_promedio": round(1000 * self._commit_total / self._lotes, 3) if self._lotes else 0.0,
+            }
+
+
+db_writer = EscritorSQLite(DB_PATH, DB_WRITER_BATCH_MAX, DB_WRITER_FLUSH_MS)
+
+
+def escribir(funcion, *args):
+    """Envía `funcion(conn, *args)` al escritor y espera su resultado.
+
+    Las excepciones de la operación (HTTPException incluida) se relanzan tal cual.
+    Si pasa `DB_WRITER_TIMEOUT` y la operación sigue en cola se cancela (503, se
+    puede reintentar sin duplicar); si ya empezó se espera su resultado.
+    """
+    futuro = db_writer.submit(funcion, *args)
+    try:
+        return futuro.result(timeout=DB_WRITER_TIMEOUT)
+    except FutureTimeoutError:
+        if not futuro.cancel():
+            return futuro.result()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="La escritura tardó demasiado, intenta de nuevo"
+        )
+
+
+@app.on_event("shutdown")
+def cerrar_pool():
+    db_writer.stop()
+    db_executor.shutdown(wait=True)
+    db_pool.close_all()
+
+
 # ================================
 # Modelos Pydantic (request bodies)
 # ================================
@@ -71,7 +521,7 @@ class OfertaCreate(BaseModel):
 
 class CambioEstadoRequest(BaseModel):
     nuevo_estado: str
-    usuario: Optional[str] = "usuario"  # 'usuario' | 'empresa' | 'sistema'
+    usuario: Optional[str] = "usuario"  # ignorado: el historial toma el rol de la sesión
     observaciones: Optional[str] = None
 
 
@@ -97,200 +547,764 @@ def oferta_detalle_page(oferta_id: int):
 
 
 
-@app.get("/create-db/")
-def create_db():
-
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Tabla de usuarios (buscadores de empleo)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                nombre TEXT NOT NULL,
-                tipo_usuario TEXT CHECK(tipo_usuario IN ('buscador', 'empresa')) NOT NULL,
-                fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                activo BOOLEAN DEFAULT 1
-            )
-        ''')
-        
-        # Tabla de perfiles de buscadores de empleo
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS perfiles_buscadores (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario_id INTEGER NOT NULL,
-                identidad_genero TEXT,
-                condicion_discapacidad TEXT,
-                informacion_academica TEXT,
-                experiencia_laboral TEXT,
-                habilidades TEXT,  -- JSON con lista de habilidades
-                cv_filename TEXT,
-                fecha_nacimiento DATE,
-                telefono TEXT,
-                ubicacion TEXT,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Tabla de empresas/empleadores
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS empresas (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario_id INTEGER NOT NULL,
-                razon_social TEXT NOT NULL,
-                nit TEXT UNIQUE NOT NULL,
-                rut TEXT,
-                sector TEXT,
-                direccion TEXT,
-                telefono TEXT,
-                sitio_web TEXT,
-                redes_sociales TEXT,  -- JSON con enlaces
-                actividad_economica TEXT,
-                tamano_empresa TEXT,
-                verificada BOOLEAN DEFAULT 0,
-                fecha_verificacion DATETIME,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Tabla de ofertas de empleo
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ofertas_empleo (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empresa_id INTEGER NOT NULL,
-                titulo TEXT NOT NULL,
-                descripcion TEXT NOT NULL,
-                funciones TEXT,
-                requisitos TEXT,
-                habilidades_requeridas TEXT,  -- JSON con lista de habilidades
-                ubicacion TEXT,
-                modalidad TEXT CHECK(modalidad IN ('presencial', 'remoto', 'hibrido')),
-                tipo_contrato TEXT,
-                jornada TEXT,
-                salario_min REAL,
-                salario_max REAL,
-                fecha_publicacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                fecha_cierre DATETIME,
-                activa BOOLEAN DEFAULT 1,
-                FOREIGN KEY (empresa_id) REFERENCES empresas (id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Tabla de postulaciones (RF3.3, RF3.4, RF3.5)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS postulaciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario_id INTEGER NOT NULL,
-                oferta_id INTEGER NOT NULL,
-                empresa TEXT NOT NULL,
-                puesto TEXT NOT NULL,
-                descripcion TEXT,
-                estado_actual TEXT CHECK(estado_actual IN (
-                    'Registrada', 'En progreso', 'Aprobada', 'Rechazada', 'Cancelada'
-                )) DEFAULT 'Registrada',
-                fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                salario TEXT,
-                ubicacion TEXT,
-                tags TEXT,  -- JSON con etiquetas
-                FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE,
-                FOREIGN KEY (oferta_id) REFERENCES ofertas_empleo (id) ON DELETE CASCADE
-            )
+def crear_esquema(cursor: sqlite3.Cursor) -> None:
+    """Crea las tablas del sistema si no existen (idempotente)."""
+    # Tabla de usuarios (buscadores de empleo)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            nombre TEXT NOT NULL,
+            tipo_usuario TEXT CHECK(tipo_usuario IN ('buscador', 'empresa')) NOT NULL,
+            fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            activo BOOLEAN DEFAULT 1
+        )
+    ''')
+    
+    # Tabla de perfiles de buscadores de empleo
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS perfiles_buscadores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            identidad_genero TEXT,
+            condicion_discapacidad TEXT,
+            informacion_academica TEXT,
+            experiencia_laboral TEXT,
+            habilidades TEXT,  -- JSON con lista de habilidades
+            cv_filename TEXT,
+            fecha_nacimiento DATE,
+            telefono TEXT,
+            ubicacion TEXT,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Tabla de empresas/empleadores
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS empresas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            razon_social TEXT NOT NULL,
+            nit TEXT UNIQUE NOT NULL,
+            rut TEXT,
+            sector TEXT,
+            direccion TEXT,
+            telefono TEXT,
+            sitio_web TEXT,
+            redes_sociales TEXT,  -- JSON con enlaces
+            actividad_economica TEXT,
+            tamano_empresa TEXT,
+            verificada BOOLEAN DEFAULT 0,
+            fecha_verificacion DATETIME,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Tabla de ofertas de empleo
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ofertas_empleo (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empresa_id INTEGER NOT NULL,
+            titulo TEXT NOT NULL,
+            descripcion TEXT NOT NULL,
+            funciones TEXT,
+            requisitos TEXT,
+            habilidades_requeridas TEXT,  -- JSON con lista de habilidades
+            ubicacion TEXT,
+            modalidad TEXT CHECK(modalidad IN ('presencial', 'remoto', 'hibrido')),
+            tipo_contrato TEXT,
+            jornada TEXT,
+            salario_min REAL,
+            salario_max REAL,
+            fecha_publicacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_publicacion_ts INTEGER,  -- epoch de fecha_publicacion (trigger)
+            fecha_cierre DATETIME,
+            fecha_actualizacion DATETIME,
+            activa BOOLEAN DEFAULT 1,
+            FOREIGN KEY (empresa_id) REFERENCES empresas (id) ON DELETE CASCADE
+        )
+    ''')
+    # `actualizar_oferta` la escribe; las bases anteriores no la tenían
+    asegurar_columna(cursor, 'ofertas_empleo', 'fecha_actualizacion', 'DATETIME')
+    
+    # Tabla de postulaciones (RF3.3, RF3.4, RF3.5)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS postulaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            oferta_id INTEGER NOT NULL,
+            empresa TEXT NOT NULL,
+            puesto TEXT NOT NULL,
+            descripcion TEXT,
+            estado_actual TEXT CHECK(estado_actual IN (
+                'Registrada', 'En progreso', 'Aprobada', 'Rechazada', 'Cancelada'
+            )) DEFAULT 'Registrada',
+            fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_creacion_ts INTEGER,  -- epoch de fecha_creacion (trigger)
+            fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            salario TEXT,
+            ubicacion TEXT,
+            tags TEXT,  -- JSON con etiquetas
+            empresa_id INTEGER,  -- copia de ofertas_empleo.empresa_id (trigger)
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE,
+            FOREIGN KEY (oferta_id) REFERENCES ofertas_empleo (id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Tabla de historial de estados (RF3.4 - Seguimiento)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historial_estados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            postulacion_id INTEGER NOT NULL,
+            estado_anterior TEXT,
+            estado_nuevo TEXT NOT NULL,
+            fecha_cambio DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_cambio_ts INTEGER,  -- epoch de fecha_cambio (trigger)
+            usuario_cambio TEXT NOT NULL,  -- 'usuario' o 'empresa' o 'sistema'
+            observaciones TEXT,
+            FOREIGN KEY (postulacion_id) REFERENCES postulaciones (id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Tabla de cursos (RF3.5, RF4.x)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cursos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empresa_id INTEGER NOT NULL,
+            titulo TEXT NOT NULL,
+            descripcion TEXT,
+            objetivos TEXT,
+            temario TEXT,
+            duracion_estimada INTEGER,  -- en horas
+            nivel_dificultad TEXT CHECK(nivel_dificultad IN ('basico', 'intermedio', 'avanzado')),
+            formato_contenido TEXT,  -- JSON con tipos de contenido
+            visibilidad TEXT CHECK(visibilidad IN ('publico', 'privado')) DEFAULT 'publico',
+            oferta_asociada INTEGER,
+            fecha_publicacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_publicacion_ts INTEGER,  -- epoch de fecha_publicacion (trigger)
+            activo BOOLEAN DEFAULT 1,
+            FOREIGN KEY (empresa_id) REFERENCES empresas (id) ON DELETE CASCADE,
+            FOREIGN KEY (oferta_asociada) REFERENCES ofertas_empleo (id) ON DELETE SET NULL
+        )
+    ''')
+    
+    # Tabla de inscripciones a cursos
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS inscripciones_cursos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            curso_id INTEGER NOT NULL,
+            fecha_inscripcion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_inscripcion_ts INTEGER,  -- epoch de fecha_inscripcion (trigger)
+            progreso REAL DEFAULT 0,  -- 0 a 100
+            estado TEXT CHECK(estado IN ('no_iniciado', 'en_progreso', 'completado')) DEFAULT 'no_iniciado',
+            fecha_completado DATETIME,
+            puntaje_test REAL,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE,
+            FOREIGN KEY (curso_id) REFERENCES cursos (id) ON DELETE CASCADE,
+            UNIQUE(usuario_id, curso_id)
+        )
+    ''')
+    
+    # Tabla de insignias digitales (RF4.6)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS insignias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario_id INTEGER NOT NULL,
+            curso_id INTEGER NOT NULL,
+            nombre TEXT NOT NULL,
+            descripcion TEXT,
+            fecha_obtencion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            fecha_obtencion_ts INTEGER,  -- epoch de fecha_obtencion (trigger)
+            codigo_verificacion TEXT UNIQUE,
+            imagen_url TEXT,
+            FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE,
+            FOREIGN KEY (curso_id) REFERENCES cursos (id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Tabla de evaluaciones/post-test (RF4.5)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS evaluaciones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            curso_id INTEGER NOT NULL,
+            titulo TEXT NOT NULL,
+            descripcion TEXT,
+            preguntas TEXT,  -- JSON con array de preguntas
+            puntaje_minimo REAL DEFAULT 60,
+            numero_intentos INTEGER DEFAULT 1,
+            obligatorio BOOLEAN DEFAULT 1,
+            fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+            activo BOOLEAN DEFAULT 1,
+            FOREIGN KEY (curso_id) REFERENCES cursos (id) ON DELETE CASCADE
+        )
+    ''')
+
+    migrar_fechas_ts(cursor)
+    migrar_emails(cursor)
+    migrar_empresa_postulaciones(cursor)
+    crear_cambios_ofertas(cursor)
+    crear_puntajes_postulacion(cursor)
+    crear_habilidades(cursor)
+    migrar_municipios(cursor)
+    crear_indices(cursor)
+    crear_busqueda_ofertas(cursor)
+    crear_versiones_tablas(cursor)
+    crear_meta_base(cursor)
+
+
+# Fechas por las que se ordena: (tabla, columna). Cada una tiene una gemela
+# `<columna>_ts` con el epoch en segundos, mantenida por triggers, para que los
+# ORDER BY recorran un índice en vez de evaluar datetime() fila por fila.
+COLUMNAS_FECHA_TS = [
+    ('ofertas_empleo', 'fecha_publicacion'),
+    ('cursos', 'fecha_publicacion'),
+    ('postulaciones', 'fecha_creacion'),
+    ('historial_estados', 'fecha_cambio'),
+    ('inscripciones_cursos', 'fecha_inscripcion'),
+    ('insignias', 'fecha_obtencion'),
+]
+
+
+def asegurar_columna(cursor: sqlite3.Cursor, tabla: str, columna: str, definicion: str) -> bool:
+    """Agrega `columna` a `tabla` si aún no existe. Devuelve True si la creó."""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    if any(row[1] == columna for row in cursor.fetchall()):
+        return False
+    cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+    return True
+
+
+def migrar_fechas_ts(cursor: sqlite3.Cursor) -> None:
+    """Crea las columnas `*_ts`, sus triggers y rellena las filas existentes.
+
+    Una fecha vacía o que strftime no entiende queda en 0 y no en NULL: las
+    columnas `*_ts` son clave de los cursores de paginación, y una comparación
+    con NULL dejaría esas filas fuera de todas las páginas siguientes.
+    """
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    existentes = dict(cursor.fetchall())
+    for tabla, columna in COLUMNAS_FECHA_TS:
+        ts = f"{columna}_ts"
+        asegurar_columna(cursor, tabla, ts, "INTEGER")
+        epoch = f"COALESCE(CAST(strftime('%s', NEW.{columna}) AS INTEGER), 0)"
+        triggers = {
+            f"trg_{tabla}_{ts}_insert": f'''CREATE TRIGGER trg_{tabla}_{ts}_insert
+            AFTER INSERT ON {tabla}
+            WHEN NEW.{ts} IS NULL
+            BEGIN
+                UPDATE {tabla} SET {ts} = {epoch} WHERE id = NEW.id;
+            END''',
+            f"trg_{tabla}_{ts}_update": f'''CREATE TRIGGER trg_{tabla}_{ts}_update
+            AFTER UPDATE OF {columna} ON {tabla}
+            BEGIN
+                UPDATE {tabla} SET {ts} = {epoch} WHERE id = NEW.id;
+            END''',
+        }
+        # Las bases creadas antes guardan triggers que dejaban NULL: se reemplazan
+        for nombre, sql in triggers.items():
+            if existentes.get(nombre) != sql:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+                cursor.execute(sql)
+        cursor.execute(f'''
+            UPDATE {tabla} SET {ts} = COALESCE(CAST(strftime('%s', {columna}) AS INTEGER), 0)
+            WHERE {ts} IS NULL
         ''')
-        
-        # Tabla de historial de estados (RF3.4 - Seguimiento)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS historial_estados (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                postulacion_id INTEGER NOT NULL,
-                estado_anterior TEXT,
-                estado_nuevo TEXT NOT NULL,
-                fecha_cambio DATETIME DEFAULT CURRENT_TIMESTAMP,
-                usuario_cambio TEXT NOT NULL,  -- 'usuario' o 'empresa' o 'sistema'
-                observaciones TEXT,
-                FOREIGN KEY (postulacion_id) REFERENCES postulaciones (id) ON DELETE CASCADE
-            )
+
+
+def migrar_empresa_postulaciones(cursor: sqlite3.Cursor) -> None:
+    """Mantiene `postulaciones.empresa_id` igual al `empresa_id` de su oferta.
+
+    Con la empresa en la propia fila, los listados del panel de empresa filtran
+    y ordenan con `idx_postulaciones_empresa*` sin recorrer todas sus ofertas.
+    """
+    asegurar_columna(cursor, 'postulaciones', 'empresa_id', 'INTEGER')
+    empresa_de_oferta = "(SELECT empresa_id FROM ofertas_empleo WHERE id = NEW.oferta_id)"
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_postulaciones_empresa_insert
+        AFTER INSERT ON postulaciones
+        WHEN NEW.empresa_id IS NULL
+        BEGIN
+            UPDATE postulaciones SET empresa_id = {empresa_de_oferta} WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_postulaciones_empresa_update
+        AFTER UPDATE OF oferta_id ON postulaciones
+        BEGIN
+            UPDATE postulaciones SET empresa_id = {empresa_de_oferta} WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_ofertas_empleo_empresa_update
+        AFTER UPDATE OF empresa_id ON ofertas_empleo
+        BEGIN
+            UPDATE postulaciones SET empresa_id = NEW.empresa_id WHERE oferta_id = NEW.id;
+        END
+    ''')
+    cursor.execute('''
+        UPDATE postulaciones
+        SET empresa_id = (SELECT empresa_id FROM ofertas_empleo WHERE id = postulaciones.oferta_id)
+        WHERE empresa_id IS NULL
+    ''')
+
+
+def migrar_municipios(cursor: sqlite3.Cursor) -> None:
+    """Agrega `municipio_id` (código DIVIPOLA de la `ubicacion`) a ofertas y
+    perfiles y resuelve las filas que aún no lo tienen.
+
+    Los endpoints lo guardan al escribir; esto cubre las filas anteriores y las
+    escritas por fuera de la API. Si se amplía el nomenclátor, basta poner en
+    NULL los `municipio_id = 0` para que se vuelvan a resolver.
+    """
+    for tabla in TABLAS_MUNICIPIO:
+        asegurar_columna(cursor, tabla, 'municipio_id', 'INTEGER')
+    resolver_municipios_pendientes(cursor)
+
+
+# Índices secundarios gestionados: (nombre, tabla, columnas). Coinciden con los
+# WHERE/ORDER BY de los endpoints más consultados (ver tests/test_planes_consultas.py);
+# `crear_indices` recrea los que hayan cambiado de definición.
+INDICES = [
+    ('idx_postulaciones_usuario', 'postulaciones', 'usuario_id, fecha_creacion_ts'),
+    ('idx_postulaciones_oferta', 'postulaciones', 'oferta_id, fecha_creacion_ts'),
+    ('idx_postulaciones_empresa', 'postulaciones', 'empresa_id, fecha_creacion_ts'),
+    ('idx_postulaciones_empresa_estado', 'postulaciones', 'empresa_id, estado_actual, fecha_creacion_ts'),
+    ('idx_ofertas_empresa', 'ofertas_empleo', 'empresa_id, activa, fecha_publicacion_ts'),
+    ('idx_ofertas_activa_fecha', 'ofertas_empleo', 'activa, fecha_publicacion_ts'),
+    ('idx_ofertas_municipio', 'ofertas_empleo', 'municipio_id, activa, fecha_publicacion_ts'),
+    ('idx_historial_postulacion', 'historial_estados', 'postulacion_id, fecha_cambio_ts'),
+    ('idx_inscripciones_usuario', 'inscripciones_cursos', 'usuario_id, fecha_inscripcion_ts'),
+    ('idx_insignias_usuario', 'insignias', 'usuario_id, fecha_obtencion_ts'),
+    ('idx_cursos_empresa', 'cursos', 'empresa_id, visibilidad, activo'),
+    ('idx_cursos_publicos', 'cursos', 'visibilidad, activo, fecha_publicacion_ts'),
+    ('idx_perfiles_usuario', 'perfiles_buscadores', 'usuario_id'),
+    ('idx_empresas_usuario', 'empresas', 'usuario_id'),
+    ('idx_ofertas_cambios_seq', 'ofertas_cambios', 'seq'),
+    ('idx_puntajes_oferta', 'puntajes_postulacion', 'oferta_id, puntaje, postulacion_id'),
+    ('idx_oferta_habilidades_habilidad', 'oferta_habilidades', 'habilidad_id, oferta_id'),
+    ('idx_perfil_habilidades_habilidad', 'perfil_habilidades', 'habilidad_id, perfil_id'),
+]
+
+
+# Índices únicos gestionados, mismo formato que `INDICES`.
+INDICES_UNICOS = [
+    # Login y chequeos de duplicados sin distinguir mayúsculas (ver `buscar_usuario_por_email`)
+    ('idx_usuarios_email_nocase', 'usuarios', 'email COLLATE NOCASE'),
+]
+
+
+# Índices que se dejaron de usar: `crear_indices` los elimina si siguen en la base.
+# Los demás índices que no figuren en estas listas (p. ej. creados a mano) no se tocan.
+INDICES_RETIRADOS: List[str] = []
+
+
+def _hay_duplicados(cursor: sqlite3.Cursor, tabla: str, columnas: str) -> bool:
+    """True si alguna combinación de `columnas` se repite en `tabla`."""
+    cursor.execute(f"SELECT 1 FROM {tabla} GROUP BY {columnas} HAVING COUNT(*) > 1 LIMIT 1")
+    return cursor.fetchone() is not None
+
+
+def crear_indices(cursor: sqlite3.Cursor) -> None:
+    """Sincroniza los índices de `INDICES` e `INDICES_UNICOS` y borra los de `INDICES_RETIRADOS`.
+
+    Si hay duplicados que impiden un índice único, se crea sin UNIQUE con el mismo
+    nombre para no perder la búsqueda indexada; ese índice provisional se conserva
+    mientras los duplicados sigan ahí y se reemplaza por el único cuando desaparecen.
+    """
+    esperados = {
+        nombre: (f"CREATE INDEX {nombre} ON {tabla} ({columnas})", None)
+        for nombre, tabla, columnas in INDICES
+    }
+    esperados.update({
+        nombre: (f"CREATE UNIQUE INDEX {nombre} ON {tabla} ({columnas})", (tabla, columnas))
+        for nombre, tabla, columnas in INDICES_UNICOS
+    })
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index'")
+    existentes = dict(cursor.fetchall())
+    for nombre in INDICES_RETIRADOS:
+        if nombre in existentes:
+            cursor.execute(f"DROP INDEX {nombre}")
+    for nombre, (sql, unico) in esperados.items():
+        actual = existentes.get(nombre)
+        if actual == sql:
+            continue
+        provisional = sql.replace("CREATE UNIQUE INDEX ", "CREATE INDEX ", 1)
+        if unico and actual == provisional and _hay_duplicados(cursor, *unico):
+            continue
+        if actual is not None:
+            cursor.execute(f"DROP INDEX {nombre}")
+        try:
+            cursor.execute(sql)
+        except sqlite3.IntegrityError:
+            cursor.execute(provisional)
+
+
+# Columnas de `ofertas_empleo` indexadas en `ofertas_fts`, en orden, con su peso
+# para bm25(): un acierto en el título pesa más que uno en la descripción.
+COLUMNAS_FTS_OFERTAS = [
+    ('titulo', 10.0),
+    ('descripcion', 1.0),
+    ('requisitos', 2.0),
+    ('habilidades_requeridas', 5.0),
+]
+
+
+def crear_busqueda_ofertas(cursor: sqlite3.Cursor) -> None:
+    """Crea el índice FTS5 de ofertas y los triggers que lo mantienen al día.
+
+    `ofertas_fts` es external content sobre `ofertas_empleo` (no duplica el
+    texto). `remove_diacritics 2` hace que "programacion" encuentre
+    "programación". Si el índice es nuevo se reconstruye desde la tabla.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ofertas_fts'")
+    existia = cursor.fetchone() is not None
+    columnas = ', '.join(c for c, _ in COLUMNAS_FTS_OFERTAS)
+    nuevos = ', '.join(f"NEW.{c}" for c, _ in COLUMNAS_FTS_OFERTAS)
+    viejos = ', '.join(f"OLD.{c}" for c, _ in COLUMNAS_FTS_OFERTAS)
+    cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS ofertas_fts USING fts5(
+            {columnas},
+            content='ofertas_empleo', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ofertas_fts_insert
+        AFTER INSERT ON ofertas_empleo
+        BEGIN
+            INSERT INTO ofertas_fts (rowid, {columnas}) VALUES (NEW.id, {nuevos});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ofertas_fts_delete
+        AFTER DELETE ON ofertas_empleo
+        BEGIN
+            INSERT INTO ofertas_fts (ofertas_fts, rowid, {columnas}) VALUES ('delete', OLD.id, {viejos});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_ofertas_fts_update
+        AFTER UPDATE OF {columnas} ON ofertas_empleo
+        BEGIN
+            INSERT INTO ofertas_fts (ofertas_fts, rowid, {columnas}) VALUES ('delete', OLD.id, {viejos});
+            INSERT INTO ofertas_fts (rowid, {columnas}) VALUES (NEW.id, {nuevos});
+        END
+    ''')
+    if not existia:
+        cursor.execute("INSERT INTO ofertas_fts (ofertas_fts) VALUES ('rebuild')")
+
+
+# Letras que la clave de una habilidad lleva a minúscula sin tilde, además de
+# A-Z. SQLite `lower()` solo conoce ASCII, así que la clave se arma con
+# `replace()` en SQL y con la misma tabla en Python (`clave_habilidad`).
+TILDES_CLAVE_HABILIDAD = {
+    'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u', 'ü': 'u',
+    'Á': 'a', 'É': 'e', 'Í': 'i', 'Ó': 'o', 'Ú': 'u', 'Ü': 'u', 'Ñ': 'ñ',
+}
+_TRADUCCION_CLAVE_HABILIDAD = str.maketrans({
+    **TILDES_CLAVE_HABILIDAD,
+    **{chr(c): chr(c + 32) for c in range(ord('A'), ord('Z') + 1)},
+})
+
+
+def clave_habilidad(nombre: str) -> str:
+    """Clave con la que se interna una habilidad: "  Comunicación " -> "comunicacion"."""
+    return nombre.translate(_TRADUCCION_CLAVE_HABILIDAD).strip(' ')
+
+
+def sql_clave_habilidad(expresion: str) -> str:
+    """La misma clave que `clave_habilidad`, como expresión SQL sobre `expresion`.
+
+    La cadena de `replace()` solo se evalúa si el texto tiene algún carácter
+    fuera de ASCII imprimible; es lo que más pesa en los triggers.
+    """
+    sin_tildes = expresion
+    for origen, destino in TILDES_CLAVE_HABILIDAD.items():
+        sin_tildes = f"replace({sin_tildes}, '{origen}', '{destino}')"
+    return f"lower(trim(CASE WHEN {expresion} GLOB '*[^ -~]*' THEN {sin_tildes} ELSE {expresion} END))"
+
+
+# (tabla, columna JSON, tabla puente, columna del id en el puente)
+HABILIDADES_PUENTE = [
+    ('ofertas_empleo', 'habilidades_requeridas', 'oferta_habilidades', 'oferta_id'),
+    ('perfiles_buscadores', 'habilidades', 'perfil_habilidades', 'perfil_id'),
+]
+
+
+def crear_habilidades(cursor: sqlite3.Cursor) -> None:
+    """Crea el diccionario `habilidades` y las tablas puente con ofertas y perfiles.
+
+    La columna JSON sigue siendo la fuente (conserva orden y grafía para la
+    API); los triggers internan cada habilidad y rehacen las filas puente en
+    cada INSERT o UPDATE de la columna, de modo que filtrar por habilidad es
+    una búsqueda indexada. Si las tablas son nuevas se llenan desde el JSON.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'habilidades'")
+    existia = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS habilidades (
+            id INTEGER PRIMARY KEY,
+            clave TEXT NOT NULL UNIQUE,
+            nombre TEXT NOT NULL  -- primera grafía con que se registró
+        )
+    ''')
+    clave = sql_clave_habilidad('j.value')
+    for tabla, columna, puente, id_puente in HABILIDADES_PUENTE:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {puente} (
+                {id_puente} INTEGER NOT NULL,
+                habilidad_id INTEGER NOT NULL,
+                PRIMARY KEY ({id_puente}, habilidad_id)
+            ) WITHOUT ROWID
         ''')
-        
-        # Tabla de cursos (RF3.5, RF4.x)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cursos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                empresa_id INTEGER NOT NULL,
-                titulo TEXT NOT NULL,
-                descripcion TEXT,
-                objetivos TEXT,
-                temario TEXT,
-                duracion_estimada INTEGER,  -- en horas
-                nivel_dificultad TEXT CHECK(nivel_dificultad IN ('basico', 'intermedio', 'avanzado')),
-                formato_contenido TEXT,  -- JSON con tipos de contenido
-                visibilidad TEXT CHECK(visibilidad IN ('publico', 'privado')) DEFAULT 'publico',
-                oferta_asociada INTEGER,
-                fecha_publicacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                activo BOOLEAN DEFAULT 1,
-                FOREIGN KEY (empresa_id) REFERENCES empresas (id) ON DELETE CASCADE,
-                FOREIGN KEY (oferta_asociada) REFERENCES ofertas_empleo (id) ON DELETE SET NULL
-            )
+
+        def lista(fila: str) -> str:
+            # json_each falla con JSON inválido: se toma como lista vacía
+            return f"json_each(CASE WHEN json_valid({fila}.{columna}) THEN {fila}.{columna} ELSE '[]' END) j"
+
+        def internar(fila: str, origen: str = '') -> List[str]:
+            return [
+                f'''INSERT OR IGNORE INTO habilidades (clave, nombre)
+                SELECT {clave}, trim(j.value) FROM {origen}{lista(fila)}
+                WHERE j.type = 'text' AND trim(j.value) <> '' ''',
+                f'''INSERT OR IGNORE INTO {puente} ({id_puente}, habilidad_id)
+                SELECT {fila}.id, h.id FROM {origen}{lista(fila)}
+                JOIN habilidades h ON h.clave = {clave}
+                WHERE j.type = 'text' ''',
+            ]
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{puente}_insert
+            AFTER INSERT ON {tabla}
+            BEGIN
+                {'; '.join(internar('NEW'))};
+            END
         ''')
-        
-        # Tabla de inscripciones a cursos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS inscripciones_cursos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario_id INTEGER NOT NULL,
-                curso_id INTEGER NOT NULL,
-                fecha_inscripcion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                progreso REAL DEFAULT 0,  -- 0 a 100
-                estado TEXT CHECK(estado IN ('no_iniciado', 'en_progreso', 'completado')) DEFAULT 'no_iniciado',
-                fecha_completado DATETIME,
-                puntaje_test REAL,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE,
-                FOREIGN KEY (curso_id) REFERENCES cursos (id) ON DELETE CASCADE,
-                UNIQUE(usuario_id, curso_id)
-            )
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{puente}_update
+            AFTER UPDATE OF {columna} ON {tabla}
+            BEGIN
+                DELETE FROM {puente} WHERE {id_puente} = NEW.id;
+                {'; '.join(internar('NEW'))};
+            END
         ''')
-        
-        # Tabla de insignias digitales (RF4.6)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS insignias (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                usuario_id INTEGER NOT NULL,
-                curso_id INTEGER NOT NULL,
-                nombre TEXT NOT NULL,
-                descripcion TEXT,
-                fecha_obtencion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                codigo_verificacion TEXT UNIQUE,
-                imagen_url TEXT,
-                FOREIGN KEY (usuario_id) REFERENCES usuarios (id) ON DELETE CASCADE,
-                FOREIGN KEY (curso_id) REFERENCES cursos (id) ON DELETE CASCADE
-            )
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{puente}_delete
+            AFTER DELETE ON {tabla}
+            BEGIN
+                DELETE FROM {puente} WHERE {id_puente} = OLD.id;
+            END
         ''')
-        
-        # Tabla de evaluaciones/post-test (RF4.5)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS evaluaciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                curso_id INTEGER NOT NULL,
-                titulo TEXT NOT NULL,
-                descripcion TEXT,
-                preguntas TEXT,  -- JSON con array de preguntas
-                puntaje_minimo REAL DEFAULT 60,
-                numero_intentos INTEGER DEFAULT 1,
-                obligatorio BOOLEAN DEFAULT 1,
-                fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
-                activo BOOLEAN DEFAULT 1,
-                FOREIGN KEY (curso_id) REFERENCES cursos (id) ON DELETE CASCADE
-            )
+        if not existia:
+            for sql in internar('t', f'{tabla} t, '):
+                cursor.execute(sql)
+
+
+# Tablas cuya versión de cambios se lleva en `tabla_versiones`. Los endpoints
+# del catálogo derivan de ellas su ETag y su Last-Modified, y `cache_entidades`
+# descarta con ellas las entradas obsoletas.
+TABLAS_VERSIONADAS = ['ofertas_empleo', 'cursos', 'empresas', 'usuarios']
+
+
+def crear_versiones_tablas(cursor: sqlite3.Cursor) -> None:
+    """Crea `tabla_versiones` y los triggers que suben la versión de cada tabla
+    de `TABLAS_VERSIONADAS` en cualquier INSERT, UPDATE o DELETE."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tabla_versiones (
+            tabla TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            modificado_ts INTEGER NOT NULL
+        )
+    ''')
+    ahora = "CAST(strftime('%s', 'now') AS INTEGER)"
+    for tabla in TABLAS_VERSIONADAS:
+        cursor.execute(
+            f"INSERT OR IGNORE INTO tabla_versiones (tabla, version, modificado_ts) VALUES (?, 1, {ahora})",
+            (tabla,)
+        )
+        for evento in ('insert', 'update', 'delete'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{tabla}_version_{evento}
+                AFTER {evento.upper()} ON {tabla}
+                BEGIN
+                    UPDATE tabla_versiones SET version = version + 1, modificado_ts = {ahora}
+                    WHERE tabla = '{tabla}';
+                END
+            ''')
+
+
+def crear_meta_base(cursor: sqlite3.Cursor) -> None:
+    """Crea `base_meta` (clave -> valor) con un `id` aleatorio propio de esta base.
+
+    Lo que se guarda fuera de SQLite (p. ej. el índice de similares) anota ese
+    id para reconocer si el archivo corresponde a otra base.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS base_meta (
+            clave TEXT PRIMARY KEY,
+            valor TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO base_meta (clave, valor) VALUES ('id', ?)", (secrets.token_hex(16),))
+
+
+def identidad_base(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """Ruta real de `DB_PATH` y el id de `base_meta`."""
+    fila = conn.execute("SELECT valor FROM base_meta WHERE clave = 'id'").fetchone()
+    return {'ruta': os.path.realpath(DB_PATH), 'id': fila[0] if fila else None}
+
+
+def crear_cambios_ofertas(cursor: sqlite3.Cursor) -> None:
+    """Crea `ofertas_cambios`: la última secuencia de cambio de cada oferta.
+
+    Los triggers la actualizan en cada INSERT, UPDATE o DELETE de
+    `ofertas_empleo`, de modo que los índices en memoria (ver
+    `IndiceHabilidades`) se ponen al día leyendo solo las ofertas con
+    `seq` mayor a la última que aplicaron, vengan de este proceso o de otro.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ofertas_cambios (
+            oferta_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+    ''')
+    siguiente = "COALESCE((SELECT MAX(seq) FROM ofertas_cambios), 0) + 1"
+    for evento, fila in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_ofertas_cambios_{evento}
+            AFTER {evento.upper()} ON ofertas_empleo
+            BEGIN
+                INSERT OR REPLACE INTO ofertas_cambios (oferta_id, seq) VALUES ({fila}.id, {siguiente});
+            END
         ''')
-        
-        
-        
+
+
+def crear_puntajes_postulacion(cursor: sqlite3.Cursor) -> None:
+    """Crea `puntajes_postulacion`: la afinidad perfil-oferta de cada postulación.
+
+    `puntaje` NULL significa pendiente. Los triggers lo anulan (y suben
+    `version`) cuando cambia lo que entra en el cálculo: las habilidades,
+    experiencia o ubicación del perfil, o las habilidades, requisitos,
+    ubicación o modalidad de la oferta. El ranking recalcula solo esas filas.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS puntajes_postulacion (
+            postulacion_id INTEGER PRIMARY KEY,
+            oferta_id INTEGER NOT NULL,
+            puntaje REAL,
+            coincidencias TEXT,  -- JSON con las habilidades requeridas que cumple
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    pendiente = "puntaje = NULL, coincidencias = NULL, version = version + 1"
+    del_usuario = "postulacion_id IN (SELECT id FROM postulaciones WHERE usuario_id = {}.usuario_id)"
+    triggers = {
+        'trg_puntajes_postulacion_insert': f'''
+            AFTER INSERT ON postulaciones
+            BEGIN
+                INSERT OR REPLACE INTO puntajes_postulacion (postulacion_id, oferta_id) VALUES (NEW.id, NEW.oferta_id);
+            END''',
+        'trg_puntajes_postulacion_update': f'''
+            AFTER UPDATE OF oferta_id, usuario_id ON postulaciones
+            BEGIN
+                UPDATE puntajes_postulacion SET oferta_id = NEW.oferta_id, {pendiente} WHERE postulacion_id = NEW.id;
+            END''',
+        'trg_puntajes_postulacion_delete': '''
+            AFTER DELETE ON postulaciones
+            BEGIN
+                DELETE FROM puntajes_postulacion WHERE postulacion_id = OLD.id;
+            END''',
+        'trg_puntajes_oferta_update': f'''
+            AFTER UPDATE OF habilidades_requeridas, requisitos, ubicacion, modalidad ON ofertas_empleo
+            BEGIN
+                UPDATE puntajes_postulacion SET {pendiente} WHERE oferta_id = NEW.id;
+            END''',
+        'trg_puntajes_perfil_insert': f'''
+            AFTER INSERT ON perfiles_buscadores
+            BEGIN
+                UPDATE puntajes_postulacion SET {pendiente} WHERE {del_usuario.format('NEW')};
+            END''',
+        'trg_puntajes_perfil_update': f'''
+            AFTER UPDATE OF habilidades, experiencia_laboral, ubicacion, usuario_id ON perfiles_buscadores
+            BEGIN
+                UPDATE puntajes_postulacion SET {pendiente}
+                WHERE {del_usuario.format('NEW')} OR {del_usuario.format('OLD')};
+            END''',
+        'trg_puntajes_perfil_delete': f'''
+            AFTER DELETE ON perfiles_buscadores
+            BEGIN
+                UPDATE puntajes_postulacion SET {pendiente} WHERE {del_usuario.format('OLD')};
+            END''',
+    }
+    for nombre, cuerpo in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}")
+    # Postulaciones anteriores a la tabla: quedan pendientes
+    cursor.execute('''
+        INSERT OR IGNORE INTO puntajes_postulacion (postulacion_id, oferta_id)
+        SELECT id, oferta_id FROM postulaciones
+    ''')
+
+
+def migrar_emails(cursor: sqlite3.Cursor) -> None:
+    """Guarda los emails existentes en minúsculas y sin espacios.
+
+    OR IGNORE deja intactas las filas que chocarían con otra cuenta que solo
+    difiere en mayúsculas; siguen encontrándose gracias al índice NOCASE.
+    """
+    cursor.execute('''
+        UPDATE OR IGNORE usuarios SET email = LOWER(TRIM(email))
+        WHERE email <> LOWER(TRIM(email))
+    ''')
+
+
+SQL_USUARIO_POR_EMAIL = 'SELECT * FROM usuarios WHERE email = ? COLLATE NOCASE'
+
+
+def buscar_usuario_por_email(conn: sqlite3.Connection, email: str) -> Optional[sqlite3.Row]:
+    """Busca un usuario por email sin distinguir mayúsculas (usa idx_usuarios_email_nocase)."""
+    cursor = conn.execute(SQL_USUARIO_POR_EMAIL, ((email or '').strip().lower(),))
+    return cursor.fetchone()
+
+
+TABLAS_ESQUEMA = [
+    'usuarios', 'perfiles_buscadores', 'empresas', 'ofertas_empleo', 'postulaciones',
+    'historial_estados', 'cursos', 'inscripciones_cursos', 'insignias', 'evaluaciones',
+    'tabla_versiones', 'ofertas_cambios', 'puntajes_postulacion',
+    'habilidades', 'oferta_habilidades', 'perfil_habilidades', 'base_meta'
+]
+
+
+@app.on_event("startup")
+def inicializar_base_datos():
+    """Crea o verifica el esquema al arrancar, antes de atender peticiones."""
+    conn = configurar_conexion(sqlite3.connect(DB_PATH, timeout=DB_BUSY_TIMEOUT / 1000))
+    try:
+        crear_esquema(conn.cursor())
         conn.commit()
+        existentes = {
+            row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+        faltantes = [t for t in TABLAS_ESQUEMA if t not in existentes]
+        if faltantes:
+            raise RuntimeError(f"Esquema incompleto en {DB_PATH}: faltan {', '.join(faltantes)}")
+        conn.execute("PRAGMA optimize")
+    finally:
         conn.close()
+    db_writer.start()
+    with db_pool.connection() as conn:
+        indice_habilidades.reconstruir(conn)
+        contador_facetas.reconstruir(conn)
+    threading.Thread(target=construir_indice_similares, name="indice-similares", daemon=True).start()
+
+
+@app.get("/create-db/")
+def create_db():
+
+    try:
+        escribir(lambda conn: crear_esquema(conn.cursor()))
         
         return {"message": "Database created successfully", "db_path": DB_PATH}, status.HTTP_201_CREATED
         
@@ -300,129 +1314,131 @@ def create_db():
             "detalle": str(e)
         }, status.HTTP_500_INTERNAL_SERVER_ERROR
     
+def _insertar_datos_ejemplo(conn: sqlite3.Connection):
+    """Operación de escritura de `insertar_datos_ejemplo` (corre en `db_writer`)."""
+    cursor = conn.cursor()
+    
+    # Insertar usuarios de ejemplo
+    cursor.execute('''
+        INSERT OR IGNORE INTO usuarios (email, password, nombre, tipo_usuario) 
+        VALUES 
+        ('buscador1@ejemplo.com', 'password123', 'Ana García', 'buscador'),
+        ('buscador2@ejemplo.com', 'password123', 'Carlos Rodríguez', 'buscador'),
+        ('empresa1@ejemplo.com', 'password123', 'Tech Solutions SAS', 'empresa'),
+        ('empresa2@ejemplo.com', 'password123', 'Innovación Digital Ltda', 'empresa'),
+        ('empresa3@ejemplo.com', 'password123', 'Desarrollo Web Colombia', 'empresa')
+    ''')
+    
+    # Insertar empresas de ejemplo
+    cursor.execute('''
+        INSERT OR IGNORE INTO empresas (usuario_id, razon_social, nit, sector, direccion, telefono, verificada) 
+        VALUES 
+        (3, 'Tech Solutions SAS', '900123456-1', 'Tecnología', 'Calle 123 #45-67, Bogotá', '6011234567', 1),
+        (4, 'Innovación Digital Ltda', '900789012-2', 'Desarrollo Software', 'Av. Siempre Viva 742, Medellín', '6049876543', 1),
+        (5, 'Desarrollo Web Colombia', '900345678-3', 'Tecnología', 'Cra 50 #80-10, Cali', '6024567890', 0)
+    ''')
+    
+    # Insertar perfiles de buscadores
+    cursor.execute('''
+        INSERT OR IGNORE INTO perfiles_buscadores (usuario_id, identidad_genero, informacion_academica, experiencia_laboral, habilidades, telefono, ubicacion) 
+        VALUES 
+        (1, 'Femenino', 'Ingeniera de Sistemas - Universidad Nacional', '2 años como desarrolladora frontend', '["JavaScript", "React", "CSS", "HTML"]', '3001234567', 'Bogotá'),
+        (2, 'Masculino', 'Tecnólogo en Desarrollo de Software - SENA', '1 año como desarrollador fullstack', '["Python", "Django", "PostgreSQL", "JavaScript"]', '3109876543', 'Medellín')
+    ''')
+    
+    # Insertar ofertas de empleo
+    cursor.execute('''
+        INSERT OR IGNORE INTO ofertas_empleo (empresa_id, titulo, descripcion, funciones, requisitos, habilidades_requeridas, ubicacion, modalidad, tipo_contrato, jornada, salario_min, salario_max) 
+        VALUES 
+        (1, 'Desarrollador Frontend React', 'Buscamos desarrollador frontend con experiencia en React para unirse a nuestro equipo de innovación.', 'Desarrollar interfaces de usuario, colaborar con equipo backend, optimizar performance', 'Experiencia mínima 1 año en React, conocimientos en JavaScript ES6+', '["React", "JavaScript", "CSS", "HTML", "Git"]', 'Bogotá', 'hibrido', 'Término Indefinido', 'Tiempo Completo', 2800000, 3500000),
+        (1, 'Programador de software', 'Desarrollo de aplicaciones web y móviles para clientes internacionales', 'Desarrollar features, escribir tests, participar en code reviews', 'Conocimientos en patrones de diseño, bases de datos, APIs REST', '["Java", "Spring Boot", "SQL", "AWS"]', 'Bogotá', 'remoto', 'Término Indefinido', 'Tiempo Completo', 2500000, 3000000),
+        (2, 'Desarrollador FullStack Python', 'Desarrollo de aplicaciones web completas con Django y React', 'Desarrollo backend con Django, frontend con React, deployment en cloud', 'Experiencia con Django REST Framework, React, bases de datos relacionales', '["Python", "Django", "React", "PostgreSQL", "Docker"]', 'Medellín', 'presencial', 'Término Fijo', 'Tiempo Completo', 3000000, 4000000),
+        (3, 'Analista de Datos Junior', 'Análisis de datos empresariales y creación de reportes', 'Extraer y analizar datos, crear dashboards, reportes ejecutivos', 'Conocimientos en SQL, Excel, Python para análisis de datos', '["SQL", "Python", "Excel", "Power BI", "Estadística"]', 'Cali', 'hibrido', 'Término Indefinido', 'Medio Tiempo', 1800000, 2200000)
+    ''')
+    
+    resolver_municipios_pendientes(cursor)
+
+    # Insertar postulaciones
+    cursor.execute('''
+        INSERT OR IGNORE INTO postulaciones (usuario_id, oferta_id, empresa, puesto, descripcion, estado_actual, salario, ubicacion, tags) 
+        VALUES 
+        (1, 1, 'Tech Solutions SAS', 'Desarrollador Frontend React', 'Postulación para puesto de desarrollador frontend con React', 'En progreso', '$2,8 a $3,5 millones', 'Bogotá', '["react", "javascript", "frontend", "desarrollador"]'),
+        (1, 2, 'Tech Solutions SAS', 'Programador de software', 'Interesado en el puesto de programador de software', 'Registrada', '$2,5 a $3 millones', 'Bogotá', '["java", "spring", "backend", "programador"]'),
+        (2, 3, 'Innovación Digital Ltda', 'Desarrollador FullStack Python', 'Postulación para fullstack developer con Python y Django', 'Aprobada', '$3 a $4 millones', 'Medellín', '["python", "django", "react", "fullstack"]'),
+        (2, 1, 'Tech Solutions SAS', 'Desarrollador Frontend React', 'Postulación para puesto frontend', 'Rechazada', '$2,8 a $3,5 millones', 'Bogotá', '["react", "frontend", "javascript"]')
+    ''')
+    
+    # Insertar historial de estados
+    cursor.execute('''
+        INSERT OR IGNORE INTO historial_estados (postulacion_id, estado_anterior, estado_nuevo, usuario_cambio, observaciones) 
+        VALUES 
+        (1, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
+        (1, 'Registrada', 'En progreso', 'empresa', 'CV en revisión por el equipo de RH'),
+        (2, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
+        (3, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
+        (3, 'Registrada', 'En progreso', 'empresa', 'Candidato pasa a siguiente fase'),
+        (3, 'En progreso', 'Aprobada', 'empresa', 'Candidato seleccionado para el puesto'),
+        (4, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
+        (4, 'Registrada', 'Rechazada', 'empresa', 'Perfil no coincide con los requisitos del puesto')
+    ''')
+    
+    # Insertar cursos
+    cursor.execute('''
+        INSERT OR IGNORE INTO cursos (empresa_id, titulo, descripcion, objetivos, temario, duracion_estimada, nivel_dificultad, formato_contenido, visibilidad, oferta_asociada) 
+        VALUES 
+        (1, 'React desde Cero', 'Curso completo de React para desarrolladores frontend', 'Aprender los fundamentos de React y hooks avanzados', 'Introducción, Componentes, Hooks, Estado, Efectos', 20, 'intermedio', '["video", "documentos", "ejercicios"]', 'publico', 1),
+        (2, 'Django REST Framework', 'Desarrollo de APIs REST con Django', 'Crear APIs robustas y seguras con Django REST Framework', 'Serializers, Views, Authentication, Testing', 25, 'avanzado', '["video", "codigo", "proyectos"]', 'publico', 3),
+        (1, 'Introducción a Java Spring', 'Fundamentos de Spring Boot para desarrollo backend', 'Aprender a crear aplicaciones empresariales con Spring', 'Spring Core, Spring Boot, Spring Data JPA', 30, 'basico', '["video", "ejemplos", "quices"]', 'privado', 2)
+    ''')
+    
+    # Insertar inscripciones a cursos
+    cursor.execute('''
+        INSERT OR IGNORE INTO inscripciones_cursos (usuario_id, curso_id, progreso, estado, puntaje_test) 
+        VALUES 
+        (1, 1, 75.5, 'en_progreso', NULL),
+        (2, 2, 100.0, 'completado', 85.0),
+        (1, 3, 0.0, 'no_iniciado', NULL)
+    ''')
+    
+    # Insertar insignias
+    cursor.execute('''
+        INSERT OR IGNORE INTO insignias (usuario_id, curso_id, nombre, descripcion, codigo_verificacion) 
+        VALUES 
+        (2, 2, 'Desarrollador API Django', 'Certificación en desarrollo de APIs con Django REST Framework', 'DJREST-2024-001')
+    ''')
+    
+    # Insertar evaluaciones
+    cursor.execute('''
+        INSERT OR IGNORE INTO evaluaciones (curso_id, titulo, descripcion, preguntas, puntaje_minimo, numero_intentos) 
+        VALUES 
+        (1, 'Evaluación Final React', 'Test de conocimientos adquiridos en el curso de React', '[{"pregunta": "¿Qué es un Hook en React?", "tipo": "seleccion_multiple", "opciones": ["Función nativa de JavaScript", "Función que te permite usar estado y otras características", "Componente de React", "Librería externa"], "respuesta_correcta": "Función que te permite usar estado y otras características", "puntaje": 20}, {"pregunta": "useState es un Hook", "tipo": "verdadero_falso", "respuesta_correcta": "true", "puntaje": 10}]', 70.0, 2)
+    ''')
+    
+    # Contar registros insertados
+    counts = {}
+    tablas = ['usuarios', 'empresas', 'perfiles_buscadores', 'ofertas_empleo', 
+             'postulaciones', 'historial_estados', 'cursos', 'inscripciones_cursos', 
+             'insignias', 'evaluaciones']
+    
+    for tabla in tablas:
+        cursor.execute(f'SELECT COUNT(*) as count FROM {tabla}')
+        counts[tabla] = cursor.fetchone()[0]
+    
+    return {
+        "message": "Datos de ejemplo insertados correctamente en CEO.db",
+        "database": DB_PATH,
+        "registros_insertados": counts,
+        "total_registros": sum(counts.values())
+    }
+
+
 @app.get("/datos-example/")
 def insertar_datos_ejemplo():
     """
     Inserta datos de ejemplo en la base de datos CEO.db para testing
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Insertar usuarios de ejemplo
-        cursor.execute('''
-            INSERT OR IGNORE INTO usuarios (email, password, nombre, tipo_usuario) 
-            VALUES 
-            ('buscador1@ejemplo.com', 'password123', 'Ana García', 'buscador'),
-            ('buscador2@ejemplo.com', 'password123', 'Carlos Rodríguez', 'buscador'),
-            ('empresa1@ejemplo.com', 'password123', 'Tech Solutions SAS', 'empresa'),
-            ('empresa2@ejemplo.com', 'password123', 'Innovación Digital Ltda', 'empresa'),
-            ('empresa3@ejemplo.com', 'password123', 'Desarrollo Web Colombia', 'empresa')
-        ''')
-        
-        # Insertar empresas de ejemplo
-        cursor.execute('''
-            INSERT OR IGNORE INTO empresas (usuario_id, razon_social, nit, sector, direccion, telefono, verificada) 
-            VALUES 
-            (3, 'Tech Solutions SAS', '900123456-1', 'Tecnología', 'Calle 123 #45-67, Bogotá', '6011234567', 1),
-            (4, 'Innovación Digital Ltda', '900789012-2', 'Desarrollo Software', 'Av. Siempre Viva 742, Medellín', '6049876543', 1),
-            (5, 'Desarrollo Web Colombia', '900345678-3', 'Tecnología', 'Cra 50 #80-10, Cali', '6024567890', 0)
-        ''')
-        
-        # Insertar perfiles de buscadores
-        cursor.execute('''
-            INSERT OR IGNORE INTO perfiles_buscadores (usuario_id, identidad_genero, informacion_academica, experiencia_laboral, habilidades, telefono, ubicacion) 
-            VALUES 
-            (1, 'Femenino', 'Ingeniera de Sistemas - Universidad Nacional', '2 años como desarrolladora frontend', '["JavaScript", "React", "CSS", "HTML"]', '3001234567', 'Bogotá'),
-            (2, 'Masculino', 'Tecnólogo en Desarrollo de Software - SENA', '1 año como desarrollador fullstack', '["Python", "Django", "PostgreSQL", "JavaScript"]', '3109876543', 'Medellín')
-        ''')
-        
-        # Insertar ofertas de empleo
-        cursor.execute('''
-            INSERT OR IGNORE INTO ofertas_empleo (empresa_id, titulo, descripcion, funciones, requisitos, habilidades_requeridas, ubicacion, modalidad, tipo_contrato, jornada, salario_min, salario_max) 
-            VALUES 
-            (1, 'Desarrollador Frontend React', 'Buscamos desarrollador frontend con experiencia en React para unirse a nuestro equipo de innovación.', 'Desarrollar interfaces de usuario, colaborar con equipo backend, optimizar performance', 'Experiencia mínima 1 año en React, conocimientos en JavaScript ES6+', '["React", "JavaScript", "CSS", "HTML", "Git"]', 'Bogotá', 'hibrido', 'Término Indefinido', 'Tiempo Completo', 2800000, 3500000),
-            (1, 'Programador de software', 'Desarrollo de aplicaciones web y móviles para clientes internacionales', 'Desarrollar features, escribir tests, participar en code reviews', 'Conocimientos en patrones de diseño, bases de datos, APIs REST', '["Java", "Spring Boot", "SQL", "AWS"]', 'Bogotá', 'remoto', 'Término Indefinido', 'Tiempo Completo', 2500000, 3000000),
-            (2, 'Desarrollador FullStack Python', 'Desarrollo de aplicaciones web completas con Django y React', 'Desarrollo backend con Django, frontend con React, deployment en cloud', 'Experiencia con Django REST Framework, React, bases de datos relacionales', '["Python", "Django", "React", "PostgreSQL", "Docker"]', 'Medellín', 'presencial', 'Término Fijo', 'Tiempo Completo', 3000000, 4000000),
-            (3, 'Analista de Datos Junior', 'Análisis de datos empresariales y creación de reportes', 'Extraer y analizar datos, crear dashboards, reportes ejecutivos', 'Conocimientos en SQL, Excel, Python para análisis de datos', '["SQL", "Python", "Excel", "Power BI", "Estadística"]', 'Cali', 'hibrido', 'Término Indefinido', 'Medio Tiempo', 1800000, 2200000)
-        ''')
-        
-        # Insertar postulaciones
-        cursor.execute('''
-            INSERT OR IGNORE INTO postulaciones (usuario_id, oferta_id, empresa, puesto, descripcion, estado_actual, salario, ubicacion, tags) 
-            VALUES 
-            (1, 1, 'Tech Solutions SAS', 'Desarrollador Frontend React', 'Postulación para puesto de desarrollador frontend con React', 'En progreso', '$2,8 a $3,5 millones', 'Bogotá', '["react", "javascript", "frontend", "desarrollador"]'),
-            (1, 2, 'Tech Solutions SAS', 'Programador de software', 'Interesado en el puesto de programador de software', 'Registrada', '$2,5 a $3 millones', 'Bogotá', '["java", "spring", "backend", "programador"]'),
-            (2, 3, 'Innovación Digital Ltda', 'Desarrollador FullStack Python', 'Postulación para fullstack developer con Python y Django', 'Aprobada', '$3 a $4 millones', 'Medellín', '["python", "django", "react", "fullstack"]'),
-            (2, 1, 'Tech Solutions SAS', 'Desarrollador Frontend React', 'Postulación para puesto frontend', 'Rechazada', '$2,8 a $3,5 millones', 'Bogotá', '["react", "frontend", "javascript"]')
-        ''')
-        
-        # Insertar historial de estados
-        cursor.execute('''
-            INSERT OR IGNORE INTO historial_estados (postulacion_id, estado_anterior, estado_nuevo, usuario_cambio, observaciones) 
-            VALUES 
-            (1, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
-            (1, 'Registrada', 'En progreso', 'empresa', 'CV en revisión por el equipo de RH'),
-            (2, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
-            (3, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
-            (3, 'Registrada', 'En progreso', 'empresa', 'Candidato pasa a siguiente fase'),
-            (3, 'En progreso', 'Aprobada', 'empresa', 'Candidato seleccionado para el puesto'),
-            (4, NULL, 'Registrada', 'sistema', 'Postulación creada automáticamente'),
-            (4, 'Registrada', 'Rechazada', 'empresa', 'Perfil no coincide con los requisitos del puesto')
-        ''')
-        
-        # Insertar cursos
-        cursor.execute('''
-            INSERT OR IGNORE INTO cursos (empresa_id, titulo, descripcion, objetivos, temario, duracion_estimada, nivel_dificultad, formato_contenido, visibilidad, oferta_asociada) 
-            VALUES 
-            (1, 'React desde Cero', 'Curso completo de React para desarrolladores frontend', 'Aprender los fundamentos de React y hooks avanzados', 'Introducción, Componentes, Hooks, Estado, Efectos', 20, 'intermedio', '["video", "documentos", "ejercicios"]', 'publico', 1),
-            (2, 'Django REST Framework', 'Desarrollo de APIs REST con Django', 'Crear APIs robustas y seguras con Django REST Framework', 'Serializers, Views, Authentication, Testing', 25, 'avanzado', '["video", "codigo", "proyectos"]', 'publico', 3),
-            (1, 'Introducción a Java Spring', 'Fundamentos de Spring Boot para desarrollo backend', 'Aprender a crear aplicaciones empresariales con Spring', 'Spring Core, Spring Boot, Spring Data JPA', 30, 'basico', '["video", "ejemplos", "quices"]', 'privado', 2)
-        ''')
-        
-        # Insertar inscripciones a cursos
-        cursor.execute('''
-            INSERT OR IGNORE INTO inscripciones_cursos (usuario_id, curso_id, progreso, estado, puntaje_test) 
-            VALUES 
-            (1, 1, 75.5, 'en_progreso', NULL),
-            (2, 2, 100.0, 'completado', 85.0),
-            (1, 3, 0.0, 'no_iniciado', NULL)
-        ''')
-        
-        # Insertar insignias
-        cursor.execute('''
-            INSERT OR IGNORE INTO insignias (usuario_id, curso_id, nombre, descripcion, codigo_verificacion) 
-            VALUES 
-            (2, 2, 'Desarrollador API Django', 'Certificación en desarrollo de APIs con Django REST Framework', 'DJREST-2024-001')
-        ''')
-        
-        # Insertar evaluaciones
-        cursor.execute('''
-            INSERT OR IGNORE INTO evaluaciones (curso_id, titulo, descripcion, preguntas, puntaje_minimo, numero_intentos) 
-            VALUES 
-            (1, 'Evaluación Final React', 'Test de conocimientos adquiridos en el curso de React', '[{"pregunta": "¿Qué es un Hook en React?", "tipo": "seleccion_multiple", "opciones": ["Función nativa de JavaScript", "Función que te permite usar estado y otras características", "Componente de React", "Librería externa"], "respuesta_correcta": "Función que te permite usar estado y otras características", "puntaje": 20}, {"pregunta": "useState es un Hook", "tipo": "verdadero_falso", "respuesta_correcta": "true", "puntaje": 10}]', 70.0, 2)
-        ''')
-        
-        conn.commit()
-        
-        # Contar registros insertados
-        counts = {}
-        tablas = ['usuarios', 'empresas', 'perfiles_buscadores', 'ofertas_empleo', 
-                 'postulaciones', 'historial_estados', 'cursos', 'inscripciones_cursos', 
-                 'insignias', 'evaluaciones']
-        
-        for tabla in tablas:
-            cursor.execute(f'SELECT COUNT(*) as count FROM {tabla}')
-            counts[tabla] = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        return {
-            "message": "Datos de ejemplo insertados correctamente en CEO.db",
-            "database": DB_PATH,
-            "registros_insertados": counts,
-            "total_registros": sum(counts.values())
-        }
+        return escribir(_insertar_datos_ejemplo)
         
     except sqlite3.Error as e:
         return {
@@ -448,6 +1464,20 @@ def db_info():
             })
     except Exception as ex:
         info["warning"] = f"No se pudieron obtener estadísticas del archivo: {ex}"
+    info["pool"] = db_pool.stats()
+    info["writer"] = db_writer.stats()
+    info["cache_entidades"] = cache_entidades.stats()
+    info["indice_habilidades"] = indice_habilidades.stats()
+    info["contador_facetas"] = contador_facetas.stats()
+    info["indice_similares"] = indice_similares.stats()
+    try:
+        with db_pool.connection() as conn:
+            info["pragmas"] = {
+                nombre: conn.execute(f"PRAGMA {nombre}").fetchone()[0]
+                for nombre in ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout", "query_only")
+            }
+    except (sqlite3.Error, TimeoutError) as ex:
+        info["warning"] = f"No se pudieron leer los PRAGMA: {ex}"
     return info
 
 
@@ -455,71 +1485,557 @@ def db_info():
 # ENDPOINTS PARA OFERTAS DE EMPLEO
 # ============================================
 
-@app.get("/api/ofertas")
-def obtener_todas_las_ofertas():
+# Sparse fieldsets (`?fields=a,b`): cada recurso declara sus campos de salida como
+# {nombre: (expresión SQL, conversión del valor)}. Solo los campos pedidos entran
+# en el SELECT y en el JSON. Una expresión None marca un campo que el endpoint
+# arma con otra consulta (p. ej. el historial), que se omite si no se pide.
+def campos_solicitados(fields: Optional[str], definicion: Dict[str, tuple], recurso: str,
+                       obligatorios: tuple = ('id',)) -> List[str]:
+    """Valida `fields` contra la lista blanca del recurso; sin `fields` devuelve todos."""
+    if not fields or not fields.strip():
+        return list(definicion)
+    pedidos = {c.strip() for c in fields.split(',') if c.strip()}
+    desconocidos = sorted(pedidos - definicion.keys())
+    if desconocidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos no permitidos para {recurso}: {', '.join(desconocidos)}. "
+                   f"Permitidos: {', '.join(definicion)}"
+        )
+    pedidos.update(obligatorios)
+    return [c for c in definicion if c in pedidos]
+
+
+def select_campos(definicion: Dict[str, tuple], campos: List[str]) -> str:
+    columnas = []
+    for c in campos:
+        expresion, conversion = definicion[c]
+        if not expresion:
+            continue
+        if conversion is _lista_json:
+            # SQLite la devuelve compacta (sin espacios), lista para incrustarla
+            expresion = f"CASE WHEN json_valid({expresion}) THEN json({expresion}) END"
+        columnas.append(f'{expresion} AS "{c}"')
+    return ', '.join(columnas)
+
+
+def proyectar_fila(definicion: Dict[str, tuple], campos: List[str], row: sqlite3.Row) -> Dict[str, Any]:
+    datos = {}
+    for c in campos:
+        expresion, conversion = definicion[c]
+        if expresion is None:
+            continue
+        datos[c] = conversion(row[c]) if conversion else row[c]
+    return datos
+
+
+def _lista_json(valor):
+    """Decodifica una columna JSON con lista; vacía o inválida -> []."""
+    if not valor:
+        return []
+    if not isinstance(valor, str):
+        return valor
+    try:
+        return json.loads(valor)
+    except ValueError:
+        return []
+
+
+# ---- Serialización directa de filas a JSON ----
+# Los listados grandes no arman un dict por fila ni pasan por jsonable_encoder:
+# cada fila se escribe como texto JSON con las mismas claves, orden y formato
+# (compacto, sin escapar no-ASCII) que produce JSONResponse, y las columnas JSON
+# guardadas se incrustan tal como las devuelve SQLite.
+
+_codificar_json = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode
+
+
+def _json_valor(valor) -> str:
+    if valor is None:
+        return 'null'
+    if type(valor) is str:
+        return encode_basestring(valor)
+    if type(valor) is int:
+        return str(valor)
+    return _codificar_json(valor)
+
+
+def _json_incrustado(valor) -> str:
+    """Columna ya pasada por json() en `select_campos` (NULL si era vacía o inválida)."""
+    if not valor:
+        return '[]'
+    if '\\' in valor:
+        # Los escapes (\u00f3, \/) se guardan tal cual; se recodifican para que
+        # el texto coincida con el de json.dumps
+        return _codificar_json(json.loads(valor))
+    return valor
+
+
+def codificador_filas(definicion: Dict[str, tuple], campos: List[str], descripcion):
+    """Devuelve `codificar(row) -> str` con el JSON de `proyectar_fila(...)` para esa fila.
+
+    Las posiciones de las columnas se resuelven una vez con `cursor.description`.
+    """
+    posiciones = {d[0]: i for i, d in enumerate(descripcion)}
+    partes = []
+    for c in campos:
+        expresion, conversion = definicion[c]
+        if expresion is None:
+            continue
+        if conversion is _lista_json:
+            codificar = _json_incrustado
+        elif conversion:
+            codificar = lambda v, conversion=conversion: _json_valor(conversion(v))
+        else:
+            codificar = _json_valor
+        partes.append((posiciones[c], encode_basestring(c) + ':', codificar))
+
+    def codificar_fila(row) -> str:
+        return '{' + ','.join([clave + codificar(row[i]) for i, clave, codificar in partes]) + '}'
+    return codificar_fila
+
+
+class JSONCodificado(str):
+    """Cuerpo JSON ya serializado; `RespuestaJSON` lo envía sin volver a codificarlo."""
+
+
+class RespuestaJSON(JSONResponse):
+    """`response_class` de los endpoints que pueden devolver `JSONCodificado`."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, JSONCodificado):
+            return content.encode('utf-8')
+        return super().render(content)
+
+
+def json_listado(clave: str, filas: List[str], **extra) -> JSONCodificado:
+    """Arma `{"<clave>": [filas...], **extra}` a partir de filas ya codificadas."""
+    partes = [encode_basestring(clave), ':[', ','.join(filas), ']']
+    for nombre, valor in extra.items():
+        partes += [',', encode_basestring(nombre), ':', _json_valor(valor)]
+    return JSONCodificado('{' + ''.join(partes) + '}')
+
+
+# Campos de los listados públicos de ofertas (`/api/ofertas` y `/api/ofertas/buscar`),
+# en el formato que espera el frontend.
+CAMPOS_OFERTA = {
+    'id': ('o.id', None),
+    'titulo': ('o.titulo', None),
+    'empresa': ('e.razon_social', None),
+    'sector': ('e.sector', None),
+    'descripcion': ('o.descripcion', None),
+    'funciones': ('o.funciones', None),  # Este es "responsabilidades" en el frontend
+    'requisitos': ('o.requisitos', None),
+    'habilidadesRequeridas': ('o.habilidades_requeridas', _lista_json),
+    'ubicacion': ('o.ubicacion', None),
+    'modalidad': ('o.modalidad', lambda v: v.capitalize() if v else 'No especificado'),
+    'tipoContrato': ('o.tipo_contrato', lambda v: v if v else 'No especificado'),
+    'jornada': ('o.jornada', lambda v: v if v else 'No especificado'),
+    'salarioMin': ('o.salario_min', lambda v: v if v else 0),
+    'salarioMax': ('o.salario_max', lambda v: v if v else 0),
+    'fechaPublicacion': ('o.fecha_publicacion', None),
+    'fechaCierre': ('o.fecha_cierre', None),
+}
+
+
+OFERTAS_PAGINA_DEFECTO = 20
+OFERTAS_PAGINA_MAX = 100
+
+
+def filtros_ofertas(ubicacion: Optional[str], modalidad: Optional[str],
+                    tipo_contrato: Optional[str], salario_min: Optional[float],
+                    habilidad: Optional[str] = None, radio_km: Optional[float] = None):
+    """Condiciones SQL (sobre el alias `o`) y parámetros nombrados de los filtros de ofertas.
+
+    Reproduce los filtros que antes aplicaba buscar-empleo.js en el navegador.
+    `habilidad` admite varias separadas por coma; la oferta debe pedirlas todas.
+    Si `ubicacion` nombra un municipio se filtra por `municipio_id` (y, con
+    `radio_km`, por los municipios a esa distancia); si no, por subcadena.
+    """
+    condiciones = []
+    params: Dict[str, Any] = {}
+    if ubicacion and ubicacion.strip():
+        municipio = nomenclator.resolver(ubicacion)
+        if municipio:
+            if radio_km and radio_km > 0:
+                municipios = nomenclator.cercanos(municipio, min(radio_km, RADIO_MAX_KM))
+            else:
+                municipios = [municipio]
+            condiciones.append(f"o.municipio_id IN ({', '.join(map(str, municipios))})")
+        else:
+            patron = clave_habilidad(ubicacion.strip()).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            condiciones.append(f"{sql_clave_habilidad('o.ubicacion')} LIKE :ubicacion ESCAPE '\\'")
+            params['ubicacion'] = f"%{patron}%"
+    # Sin distinguir mayúsculas ni tildes: "Término Fijo" = "termino fijo"
+    if modalidad and modalidad.strip():
+        condiciones.append(f"{sql_clave_habilidad('o.modalidad')} = :modalidad")
+        params['modalidad'] = clave_habilidad(modalidad.strip())
+    if tipo_contrato and tipo_contrato.strip():
+        condiciones.append(f"{sql_clave_habilidad('o.tipo_contrato')} = :tipo_contrato")
+        params['tipo_contrato'] = clave_habilidad(tipo_contrato.strip())
+    if salario_min:
+        # Igual que el filtro del frontend: la oferta puede pagar al menos `salario_min`
+        condiciones.append("COALESCE(o.salario_max, o.salario_min) >= :salario_min")
+        params['salario_min'] = salario_min
+    claves = dict.fromkeys(c for c in (clave_habilidad(h) for h in (habilidad or '').split(',')) if c)
+    for i, clave in enumerate(claves):
+        condiciones.append(f'''o.id IN (
+            SELECT oh.oferta_id FROM oferta_habilidades oh
+            JOIN habilidades h ON h.id = oh.habilidad_id
+            WHERE h.clave = :habilidad_{i})''')
+        params[f'habilidad_{i}'] = clave
+    return condiciones, params
+
+
+def codificar_cursor(*valores) -> str:
+    """Token opaco con la clave de orden de la última fila de una página."""
+    crudo = json.dumps(list(valores), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def cortar_pagina(cursor: sqlite3.Cursor, limite: int, *claves: str):
+    """Lee hasta `limite` filas de una consulta hecha con LIMIT `limite + 1`.
+
+    Devuelve (filas, siguiente_cursor); el cursor es None si no hay más filas.
+    """
+    filas = cursor.fetchmany(limite + 1)
+    if len(filas) <= limite:
+        return filas, None
+    filas = filas[:limite]
+    return filas, codificar_cursor(*(filas[-1][clave] for clave in claves))
+
+
+def decodificar_cursor(token: str, cantidad: int) -> List[Any]:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        valores = None
+    # Solo números: SQLite ordena cualquier texto después de todo número, así
+    # que un string en la clave devolvería otra página en vez de fallar
+    if (not isinstance(valores, list) or len(valores) != cantidad
+            or not all(type(v) is int or (type(v) is float and math.isfinite(v)) for v in valores)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    return valores
+
+
+CATALOGO_VERSION_TTL = float(os.getenv("CEO_CATALOGO_VERSION_TTL", "1"))  # segundos
+
+
+class VersionesCatalogo:
+    """Copia en memoria de `tabla_versiones`.
+
+    `db_writer` la recarga tras cada COMMIT, así que un 304 se decide sin tocar
+    SQLite. El TTL solo acota cuánto tarda en verse una escritura hecha por otro
+    proceso sobre la misma base.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versiones: Dict[str, tuple] = {}
+        self._leido = None
+
+    def cargar(self, conn: sqlite3.Connection) -> None:
+        filas = conn.execute("SELECT tabla, version, modificado_ts FROM tabla_versiones").fetchall()
+        with self._lock:
+            self._versiones = {tabla: (version, ts) for tabla, version, ts in filas}
+            self._leido = time.monotonic()
+
+    def obtener(self, tablas, conn: Optional[sqlite3.Connection] = None) -> List[tuple]:
+        """Devuelve `(version, modificado_ts)` de cada tabla, en el orden pedido.
+
+        Si hay que recargar se usa `conn` cuando se da, para no pedir al pool
+        una segunda conexión mientras se tiene una.
+        """
+        with self._lock:
+            vigente = self._leido is not None and time.monotonic() - self._leido < self.ttl
+        if not vigente:
+            if conn is not None:
+                self.cargar(conn)
+            else:
+                with db_pool.connection() as conn:
+                    self.cargar(conn)
+        with self._lock:
+            return [self._versiones.get(tabla, (0, 0)) for tabla in tablas]
+
+
+versiones_catalogo = VersionesCatalogo(CATALOGO_VERSION_TTL)
+db_writer.al_confirmar(versiones_catalogo.cargar)
+
+
+def _etag_coincide(if_none_match: str, etag: str) -> bool:
+    # If-None-Match usa comparación débil: se ignora el prefijo W/
+    etiquetas = [e.strip() for e in if_none_match.split(',')]
+    return '*' in etiquetas or any(e.removeprefix('W/') == etag for e in etiquetas)
+
+
+def cache_condicional(*tablas: str):
+    """Dependencia para GET cacheables que solo leen `tablas`.
+
+    El ETag (fuerte) se arma con la versión de cada tabla, no con el cuerpo:
+    si el cliente ya tiene la representación vigente (If-None-Match o, en su
+    defecto, If-Modified-Since) se responde 304 antes de pedir una conexión.
+    Debe declararse antes que `get_db` en la firma del endpoint.
+    """
+    def dependencia(request: Request, response: Response):
+        try:
+            versiones = versiones_catalogo.obtener(tablas)
+        except (sqlite3.Error, TimeoutError):
+            return  # sin versiones no hay validadores; se sirve la respuesta completa
+        etag = '"' + '.'.join(f"{version}-{ts}" for version, ts in versiones) + '"'
+        modificado = max(ts for _, ts in versiones)
+        cabeceras = {
+            "ETag": etag,
+            "Last-Modified": formatdate(modificado, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            no_modificado = _etag_coincide(if_none_match, etag)
+        else:
+            no_modificado = False
+            if_modified_since = request.headers.get("if-modified-since")
+            if if_modified_since:
+                try:
+                    no_modificado = modificado <= parsedate_to_datetime(if_modified_since).timestamp()
+                except (TypeError, ValueError):
+                    pass
+        if no_modificado:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+        response.headers.update(cabeceras)
+    return dependencia
+
+
+CACHE_ENTIDADES_MAX = int(os.getenv("CEO_CACHE_ENTIDADES_MAX", "1024"))
+CACHE_ENTIDADES_MAX_BYTES = int(os.getenv("CEO_CACHE_ENTIDADES_MAX_BYTES", str(8 * 1024 * 1024)))
+CACHE_ENTIDADES_TTL = float(os.getenv("CEO_CACHE_ENTIDADES_TTL", "300"))  # segundos
+
+
+class CacheEntidades:
+    """Cache LRU con TTL de las vistas de detalle, por `(tipo, id)`.
+
+    Cada entrada guarda el JSON ya serializado, la huella de frescura con que
+    se armó (ver `huella_entidad`) y las versiones de `versiones_catalogo` con
+    que se validó por última vez. Mientras esas versiones no cambien la entrada
+    se sirve sin tocar la base (`obtener`); si cambiaron, se compara la huella
+    (`revalidar`) y solo se descarta si la entidad cambió. El tamaño es el
+    largo del JSON y se acota tanto en entradas como en bytes.
+    """
+
+    def __init__(self, max_entradas: int, max_bytes: int, ttl: float):
+        self.max_entradas = max(1, max_entradas)
+        self.max_bytes = max(1, max_bytes)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()  # clave -> [valor, huella, versiones, expira, tamano]
+        self._bytes = 0
+        self._aciertos = 0
+        self._fallos = 0
+        self._expulsiones = 0
+        self._invalidaciones = 0
+
+    def _quitar(self, clave) -> None:
+        tamano = self._entradas.pop(clave)[4]
+        self._bytes -= tamano
+
+    def obtener(self, clave, versiones):
+        """El valor si la entrada se validó con estas mismas `versiones`; si no, None
+        (no cuenta como fallo: falta `revalidar`)."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[2] != versiones:
+                return None
+            if time.monotonic() >= entrada[3]:
+                self._quitar(clave)
+                return None
+            self._entradas.move_to_end(clave)
+            self._aciertos += 1
+            return entrada[0]
+
+    def revalidar(self, clave, huella, versiones):
+        """El valor si la entidad no cambió (misma `huella`), anotando las nuevas `versiones`."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if entrada[1] == huella and time.monotonic() < entrada[3]:
+                    entrada[2] = versiones
+                    self._entradas.move_to_end(clave)
+                    self._aciertos += 1
+                    return entrada[0]
+                self._quitar(clave)
+            self._fallos += 1
+            return None
+
+    def guardar(self, clave, huella, versiones, valor: str) -> None:
+        tamano = len(valor)
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = [valor, huella, versiones, time.monotonic() + self.ttl, tamano]
+            self._bytes += tamano
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self._expulsiones += 1
+
+    def invalidar(self, tipo: str, entidad_id=None) -> None:
+        """Descarta la entidad `(tipo, entidad_id)`, o todas las de `tipo` si no se da id."""
+        with self._lock:
+            claves = [(tipo, entidad_id)] if entidad_id is not None else [c for c in self._entradas if c[0] == tipo]
+            for clave in claves:
+                if clave in self._entradas:
+                    self._quitar(clave)
+                    self._invalidaciones += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": round(self._aciertos / consultas, 4) if consultas else 0.0,
+                "expulsiones": self._expulsiones,
+                "invalidaciones": self._invalidaciones,
+            }
+
+
+cache_entidades = CacheEntidades(CACHE_ENTIDADES_MAX, CACHE_ENTIDADES_MAX_BYTES, CACHE_ENTIDADES_TTL)
+
+# Frescura de cada tipo de entidad cacheada: (consulta, tablas). La consulta
+# recibe el id de la entidad y recorre las ofertas de las que se arma; con
+# `ofertas_cambios` devuelve cuántas son, cuántas tienen `seq` y la mayor `seq`,
+# así que cambia si se edita, borra o agrega una de ellas y no con las demás
+# ofertas. Las tablas listadas no tienen seguimiento por fila y entran con su
+# versión completa.
+FRESCURA_ENTIDAD = {
+    'oferta': ('''
+        SELECT COUNT(o.id), COUNT(c.seq), MAX(c.seq)
+        FROM ofertas_empleo o LEFT JOIN ofertas_cambios c ON c.oferta_id = o.id
+        WHERE o.id = ?
+    ''', ('empresas',)),
+    'curso': ('''
+        SELECT COUNT(o.id), COUNT(c.seq), MAX(c.seq)
+        FROM ofertas_empleo o LEFT JOIN ofertas_cambios c ON c.oferta_id = o.id
+        WHERE o.id = (SELECT oferta_asociada FROM cursos WHERE id = ?)
+    ''', ('cursos', 'empresas')),
+    'empresa': ('''
+        SELECT COUNT(o.id), COUNT(c.seq), MAX(c.seq)
+        FROM ofertas_empleo o LEFT JOIN ofertas_cambios c ON c.oferta_id = o.id
+        WHERE o.empresa_id IN (SELECT id FROM empresas WHERE usuario_id = ?)
+    ''', ('empresas', 'cursos', 'usuarios')),
+}
+
+
+def versiones_entidad(tipo: str, conn: Optional[sqlite3.Connection] = None) -> tuple:
+    """Versiones en memoria de las tablas de las que se arma `tipo` (ver `versiones_catalogo`)."""
+    return tuple(versiones_catalogo.obtener(['ofertas_empleo', *FRESCURA_ENTIDAD[tipo][1]], conn))
+
+
+def huella_entidad(conn: sqlite3.Connection, tipo: str, entidad_id: int, versiones: tuple) -> tuple:
+    """Huella de frescura de la entidad: cambia cuando cambia algo de lo que se arma.
+
+    `versiones` es `versiones_entidad(tipo)`. Si alguna de sus ofertas no tiene
+    fila en `ofertas_cambios` (p. ej. escrita antes de que existieran los
+    triggers) se usa la versión de toda la tabla.
+    """
+    sql, _ = FRESCURA_ENTIDAD[tipo]
+    total, con_seq, seq = conn.execute(sql, (entidad_id,)).fetchone()
+    return ((total, seq) if total == con_seq else versiones[0], *versiones[1:])
+
+
+def _entidad_json(conn: sqlite3.Connection, tipo: str, entidad_id: int, cargar) -> JSONCodificado:
+    clave = (tipo, entidad_id)
+    # La huella se lee antes de consultar: si una escritura se cuela durante la
+    # carga, la entrada queda guardada con una huella ya vieja y no se sirve.
+    try:
+        versiones = versiones_entidad(tipo, conn)
+        huella = huella_entidad(conn, tipo, entidad_id, versiones)
+    except sqlite3.Error:
+        huella = None
+    if huella is not None:
+        valor = cache_entidades.revalidar(clave, huella, versiones)
+        if valor is not None:
+            return valor
+    valor = JSONCodificado(_codificar_json(cargar(conn, entidad_id)))
+    if huella is not None:
+        cache_entidades.guardar(clave, huella, versiones, valor)
+    return valor
+
+
+def entidad_cacheada(tipo: str, entidad_id: int, cargar) -> JSONCodificado:
+    """Devuelve el JSON de la entidad desde `cache_entidades` o lo arma con `cargar(conn, entidad_id)`.
+
+    Si ninguna tabla de la que se arma cambió desde que se validó la entrada,
+    se responde sin pedir conexión. El resultado ya viene serializado; los
+    endpoints lo envían con `RespuestaJSON`.
+    """
+    try:
+        valor = cache_entidades.obtener((tipo, entidad_id), versiones_entidad(tipo))
+    except (sqlite3.Error, TimeoutError):
+        valor = None
+    if valor is not None:
+        return valor
+    return _ejecutar_con_conexion(_entidad_json, (tipo, entidad_id, cargar))
+
+
+SQL_OFERTAS_PAGINA = '''
+    SELECT {columnas}, o.fecha_publicacion_ts
+    FROM ofertas_empleo o
+    INNER JOIN empresas e ON o.empresa_id = e.id
+    WHERE {condiciones}
+    ORDER BY o.fecha_publicacion_ts DESC, o.id DESC
+    LIMIT :limite
+'''
+
+
+@app.get("/api/ofertas", response_class=RespuestaJSON)
+def obtener_todas_las_ofertas(
+    fields: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    tipo_contrato: Optional[str] = None,
+    salario_min: Optional[float] = None,
+    habilidad: Optional[str] = None,
+    radio_km: Optional[float] = None,
+    limit: int = OFERTAS_PAGINA_DEFECTO,
+    cursor_pagina: Optional[str] = Query(None, alias="cursor"),
+    _cache: None = Depends(cache_condicional('ofertas_empleo', 'empresas')),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     """
-    Obtiene todas las ofertas de empleo activas con información de la empresa
+    Obtiene las ofertas de empleo activas con información de la empresa, filtradas
+    y paginadas por cursor (más recientes primero). `siguiente_cursor` es None en
+    la última página. `fields` limita los campos devueltos (ver `CAMPOS_OFERTA`).
+    `habilidad` (una o varias separadas por coma) se resuelve con `oferta_habilidades`.
     """
+    campos = campos_solicitados(fields, CAMPOS_OFERTA, 'ofertas')
+    limite = min(max(limit, 1), OFERTAS_PAGINA_MAX)
+    condiciones, params = filtros_ofertas(ubicacion, modalidad, tipo_contrato, salario_min, habilidad, radio_km)
+    if cursor_pagina:
+        # Keyset: continúa justo después de la última fila entregada, sin OFFSET
+        condiciones.append("(o.fecha_publicacion_ts, o.id) < (:cursor_ts, :cursor_id)")
+        params['cursor_ts'], params['cursor_id'] = decodificar_cursor(cursor_pagina, 2)
+    params['limite'] = limite + 1
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row  # Para obtener resultados como diccionarios
         cursor = conn.cursor()
         
         # Query con JOIN para obtener información de la empresa
-        cursor.execute('''
-            SELECT 
-                o.id,
-                o.titulo,
-                o.descripcion,
-                o.funciones,
-                o.requisitos,
-                o.habilidades_requeridas,
-                o.ubicacion,
-                o.modalidad,
-                o.tipo_contrato,
-                o.jornada,
-                o.salario_min,
-                o.salario_max,
-                o.fecha_publicacion,
-                o.fecha_cierre,
-                o.activa,
-                e.razon_social as empresa,
-                e.sector,
-                e.direccion as direccion_empresa
-            FROM ofertas_empleo o
-            INNER JOIN empresas e ON o.empresa_id = e.id
-            WHERE o.activa = 1
-            ORDER BY o.fecha_publicacion DESC
-        ''')
+        cursor.execute(SQL_OFERTAS_PAGINA.format(
+            columnas=select_campos(CAMPOS_OFERTA, campos),
+            condiciones=' AND '.join(['o.activa = 1'] + condiciones)
+        ), params)
         
-        ofertas = []
-        for row in cursor.fetchall():
-            oferta = {
-                'id': row['id'],
-                'titulo': row['titulo'],
-                'empresa': row['empresa'],
-                'sector': row['sector'],
-                'descripcion': row['descripcion'],
-                'funciones': row['funciones'],  # Este es "responsabilidades" en el frontend
-                'requisitos': row['requisitos'],
-                'habilidadesRequeridas': json.loads(row['habilidades_requeridas']) if row['habilidades_requeridas'] else [],
-                'ubicacion': row['ubicacion'],
-                'modalidad': row['modalidad'].capitalize() if row['modalidad'] else 'No especificado',
-                'tipoContrato': row['tipo_contrato'] if row['tipo_contrato'] else 'No especificado',
-                'jornada': row['jornada'] if row['jornada'] else 'No especificado',
-                'salarioMin': row['salario_min'] if row['salario_min'] else 0,
-                'salarioMax': row['salario_max'] if row['salario_max'] else 0,
-                'fechaPublicacion': row['fecha_publicacion'],
-                'fechaCierre': row['fecha_cierre']
-            }
-            ofertas.append(oferta)
-        
-        conn.close()
+        filas, siguiente = cortar_pagina(cursor, limite, 'fecha_publicacion_ts', 'id')
+        codificar = codificador_filas(CAMPOS_OFERTA, campos, cursor.description)
+        ofertas = [codificar(row) for row in filas]
         
-        return {
-            "ofertas": ofertas,
-            "total": len(ofertas)
-        }
+        return json_listado('ofertas', ofertas, total=len(ofertas), siguiente_cursor=siguiente)
     except sqlite3.Error as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -527,56 +2043,1064 @@ def obtener_todas_las_ofertas():
         )
 
 
+# Ranking de `/api/ofertas/buscar`: bm25 (negativo, menor es mejor) se multiplica
+# por 1 + PESO / (1 + edad_dias / VIDA_MEDIA). Entre dos ofertas igual de
+# relevantes gana la más reciente, pero la recencia no rescata a una oferta que
+# apenas coincide con la búsqueda.
+BUSQUEDA_PESO_RECENCIA = float(os.getenv("CEO_BUSQUEDA_PESO_RECENCIA", "0.5"))
+BUSQUEDA_VIDA_MEDIA_DIAS = float(os.getenv("CEO_BUSQUEDA_VIDA_MEDIA_DIAS", "30"))
+BUSQUEDA_MAX_PALABRAS = 10
+BUSQUEDA_MAX_RESULTADOS = 200
+
+SQL_BUSCAR_OFERTAS = f'''
+    SELECT {{columnas}},
+        bm25(ofertas_fts, {', '.join(str(peso) for _, peso in COLUMNAS_FTS_OFERTAS)})
+            * (1 + :peso / (1 + MAX(:ahora - COALESCE(o.fecha_publicacion_ts, 0), 0) / 86400.0 / :vida_media))
+            AS rango
+    FROM ofertas_fts
+    INNER JOIN ofertas_empleo o ON o.id = ofertas_fts.rowid
+    INNER JOIN empresas e ON o.empresa_id = e.id
+    WHERE ofertas_fts MATCH :consulta AND o.activa = 1{{filtros}}
+    ORDER BY rango, o.id DESC
+    LIMIT :limite
+'''
+
+
+def consulta_fts(texto: str) -> Optional[str]:
+    """Convierte texto libre en una consulta FTS5 sin operadores.
+
+    Cada palabra se busca como prefijo ("desarr" encuentra "desarrollador") y
+    todas deben aparecer. Devuelve None si el texto no tiene palabras.
+    """
+    palabras = re.findall(r"\w+", texto)[:BUSQUEDA_MAX_PALABRAS]
+    if not palabras:
+        return None
+    return ' '.join(f'"{p}"*' for p in palabras)
+
+
+@app.get("/api/ofertas/buscar", response_class=RespuestaJSON)
+def buscar_ofertas(
+    q: str = "",
+    fields: Optional[str] = None,
+    ubicacion: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    tipo_contrato: Optional[str] = None,
+    salario_min: Optional[float] = None,
+    habilidad: Optional[str] = None,
+    radio_km: Optional[float] = None,
+    limit: int = 50,
+    conn: sqlite3.Connection = Depends(get_db)
+):
+    """
+    Búsqueda de texto completo sobre las ofertas activas, ordenada por relevancia.
+    Ignora tildes y mayúsculas; busca en título, descripción, requisitos y habilidades.
+    Acepta los mismos filtros y `fields` que `/api/ofertas`.
+    """
+    campos = campos_solicitados(fields, CAMPOS_OFERTA, 'ofertas')
+    consulta = consulta_fts(q)
+    if consulta is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El parámetro q debe contener al menos una palabra"
+        )
+    limite = min(max(limit, 1), BUSQUEDA_MAX_RESULTADOS)
+    condiciones, params = filtros_ofertas(ubicacion, modalidad, tipo_contrato, salario_min, habilidad, radio_km)
+    params.update({
+        'consulta': consulta,
+        'peso': BUSQUEDA_PESO_RECENCIA,
+        'ahora': int(time.time()),
+        'vida_media': BUSQUEDA_VIDA_MEDIA_DIAS,
+        'limite': limite,
+    })
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            SQL_BUSCAR_OFERTAS.format(
+                columnas=select_campos(CAMPOS_OFERTA, campos),
+                filtros=''.join(f" AND {c}" for c in condiciones)
+            ),
+            params
+        )
+        codificar = codificador_filas(CAMPOS_OFERTA, campos, cursor.description)
+        ofertas = [
+            codificar(row)[:-1] + ',"relevancia":' + _json_valor(round(-row['rango'], 4)) + '}'
+            for row in cursor.fetchall()
+        ]
+
+        return json_listado('ofertas', ofertas, total=len(ofertas), q=q)
+    except sqlite3.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar ofertas: {str(e)}"
+        )
+
+
+_MARCAS_COMBINANTES = re.compile(r'[\u0300-\u036f]')
+
+
+def normalizar_texto(valor: Optional[str]) -> str:
+    """Minúsculas, sin tildes ni espacios sobrantes: "  Bogotá " -> "bogota"."""
+    if not valor:
+        return ''
+    valor = str(valor)
+    if not valor.isascii():
+        valor = _MARCAS_COMBINANTES.sub('', unicodedata.normalize('NFKD', valor))
+    return ' '.join(valor.casefold().split())
+
+
+# Todo lo que no sea letra, dígito, '#' o '+' separa palabras ("c++" y "c#" se conservan)
+_SEPARADORES = re.compile(r'[^\w#+]+')
+
+
+def habilidades_normalizadas(valor) -> frozenset:
+    """Conjunto de habilidades normalizadas a partir de una columna JSON con lista."""
+    lista = _lista_json(valor)
+    if not isinstance(lista, list):
+        return frozenset()
+    return frozenset(h for h in (normalizar_texto(x) for x in lista if isinstance(x, str)) if h)
+
+
+# ---- Municipios (nomenclátor sin conexión) ----
+
+MUNICIPIOS_RUTA = os.getenv("CEO_MUNICIPIOS_PATH", os.path.join(BASE_DIR, "data", "municipios_colombia.json"))
+MUNICIPIOS_CELDA_GRADOS = 0.5  # lado de las celdas de la grilla (~55 km)
+MUNICIPIO_NO_RECONOCIDO = 0  # `municipio_id` de una ubicación que no nombra ningún municipio
+RADIO_MAX_KM = 500
+RADIO_TIERRA_KM = 6371.0
+KM_POR_GRADO = 111.2
+
+
+def _palabras_lugar(texto: str) -> List[str]:
+    return re.findall(r'\w+', normalizar_texto(texto))
+
+
+def distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia sobre la superficie terrestre (haversine)."""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Nomenclator:
+    """Municipios de Colombia (código DIVIPOLA, departamento y coordenadas)
+    leídos del archivo que viene con el backend.
+
+    `resolver` lleva una ubicación en texto libre ("Cra 50 #80-10, Cali",
+    "bogota d.c.") al municipio que nombra; `cercanos` recorre solo las celdas
+    de la grilla que toca el radio.
+    """
+
+    def __init__(self, ruta: str):
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        self.version = datos.get('version')
+        self.municipios: Dict[int, Dict[str, Any]] = {}
+        self._departamentos: Dict[int, frozenset] = {}
+        self._nombres: Dict[tuple, List[int]] = {}
+        self._grilla: Dict[tuple, List[int]] = {}
+        self._resueltos: Dict[str, int] = {}
+        for municipio in datos['municipios']:
+            codigo = int(municipio['codigo'])
+            departamento = datos['departamentos'][municipio['codigo'][:2]]
+            self.municipios[codigo] = {
+                'id': codigo,
+                'nombre': municipio['nombre'],
+                'departamento': departamento,
+                'lat': municipio['lat'],
+                'lon': municipio['lon'],
+            }
+            self._departamentos[codigo] = frozenset(_palabras_lugar(departamento))
+            for nombre in (municipio['nombre'], *municipio.get('alias', ())):
+                self._nombres.setdefault(tuple(_palabras_lugar(nombre)), []).append(codigo)
+            self._grilla.setdefault(self._celda(municipio['lat'], municipio['lon']), []).append(codigo)
+        self._max_palabras = max(map(len, self._nombres), default=0)
+
+    @staticmethod
+    def _celda(lat: float, lon: float) -> tuple:
+        return math.floor(lat / MUNICIPIOS_CELDA_GRADOS), math.floor(lon / MUNICIPIOS_CELDA_GRADOS)
+
+    def resolver(self, texto: Optional[str]) -> int:
+        """Código del municipio que nombra `texto`, o `MUNICIPIO_NO_RECONOCIDO`.
+
+        Gana el nombre más largo que aparezca completo y, a igual largo, el
+        último (en "Calle Armenia, Medellín" la ciudad va al final). Si un
+        nombre se repite en varios departamentos, decide el que esté escrito.
+        """
+        if not texto or not texto.strip():
+            return MUNICIPIO_NO_RECONOCIDO
+        codigo = self._resueltos.get(texto)
+        if codigo is not None:
+            return codigo
+        codigo = MUNICIPIO_NO_RECONOCIDO
+        palabras = _palabras_lugar(texto)
+        for largo in range(min(self._max_palabras, len(palabras)), 0, -1):
+            for inicio in range(len(palabras) - largo, -1, -1):
+                codigos = self._nombres.get(tuple(palabras[inicio:inicio + largo]))
+                if codigos:
+                    presentes = set(palabras)
+                    codigo = next((c for c in codigos if self._departamentos[c] <= presentes), codigos[0])
+                    break
+            if codigo:
+                break
+        if len(self._resueltos) >= 10000:
+            self._resueltos.clear()
+        self._resueltos[texto] = codigo
+        return codigo
+
+    def cercanos(self, codigo: int, radio_km: float) -> List[int]:
+        """Códigos de los municipios a `radio_km` o menos de `codigo` (incluido)."""
+        centro = self.municipios[codigo]
+        lat, lon = centro['lat'], centro['lon']
+        dlat = radio_km / KM_POR_GRADO
+        dlon = radio_km / (KM_POR_GRADO * max(math.cos(math.radians(lat)), 0.01))
+        fila_min, col_min = self._celda(lat - dlat, lon - dlon)
+        fila_max, col_max = self._celda(lat + dlat, lon + dlon)
+        encontrados = []
+        for fila in range(fila_min, fila_max + 1):
+            for col in range(col_min, col_max + 1):
+                for otro in self._grilla.get((fila, col), ()):
+                    municipio = self.municipios[otro]
+                    if distancia_km(lat, lon, municipio['lat'], municipio['lon']) <= radio_km:
+                        encontrados.append(otro)
+        return sorted(encontrados)
+
+    def buscar(self, texto: str, limite: int) -> List[Dict[str, Any]]:
+        """Municipios cuyo nombre empieza por `texto`, sin distinguir tildes."""
+        prefijo = ' '.join(_palabras_lugar(texto))
+        encontrados = sorted(
+            (normalizar_texto(m['nombre']), codigo) for codigo, m in self.municipios.items()
+        )
+        return [self.municipios[codigo] for nombre, codigo in encontrados if nombre.startswith(prefijo)][:limite]
+
+
+nomenclator = Nomenclator(MUNICIPIOS_RUTA)
+
+# Tablas con una `ubicacion` en texto libre que se lleva a `municipio_id`
+TABLAS_MUNICIPIO = ['ofertas_empleo', 'perfiles_buscadores']
+
+
+def resolver_municipios_pendientes(cursor: sqlite3.Cursor) -> None:
+    """Llena `municipio_id` en las filas escritas sin él (NULL = aún no resuelto)."""
+    for tabla in TABLAS_MUNICIPIO:
+        filas = cursor.execute(f"SELECT id, ubicacion FROM {tabla} WHERE municipio_id IS NULL").fetchall()
+        cursor.executemany(
+            f"UPDATE {tabla} SET municipio_id = ? WHERE id = ?",
+            [(nomenclator.resolver(ubicacion), fila_id) for fila_id, ubicacion in filas]
+        )
+
+
+@app.get('/api/municipios')
+def buscar_municipios(q: str = "", limit: int = 10):
+    """Municipios cuyo nombre empieza por `q`, para autocompletar la ubicación."""
+    limite = min(max(limit, 1), 50)
+    return {'success': True, 'data': nomenclator.buscar(q, limite) if q.strip() else []}
+
+
+# Pesos del puntaje de recomendación. La parte de habilidades es la fracción de
+# las habilidades de la oferta que el perfil cubre (0..1); ubicación y modalidad
+# suman un bono fijo. A igual puntaje gana la oferta más reciente.
+RECOMENDACION_PESO_HABILIDADES = 1.0
+RECOMENDACION_PESO_UBICACION = 0.3
+RECOMENDACION_PESO_MODALIDAD = 0.2
+RECOMENDACIONES_MAX = 50
+
+
+class IndiceOfertas(ABC):
+    """Base de los índices en memoria sobre las ofertas activas.
+
+    Se construyen al arrancar y, cuando cambia la versión de `ofertas_empleo`,
+    aplican solo las ofertas que `ofertas_cambios` marca como cambiadas desde la
+    última sincronización. Las subclases dicen qué `COLUMNAS` leen y
+    definen `_vaciar`, `_poner` y `_quitar`; `_preparar` transforma las filas
+    fuera del candado (las consultas no esperan a que termine) antes de ponerlas.
+    """
+
+    COLUMNAS: tuple = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sincronizando = threading.Lock()  # una sola sincronización a la vez
+        self._seq = 0
+        self._version = None
+        self._sincronizaciones = 0
+        self.listo = False
+        self._vaciar()
+
+    @abstractmethod
+    def _vaciar(self) -> None:
+        """Deja el índice sin ofertas."""
+
+    @abstractmethod
+    def _poner(self, item) -> None:
+        """Agrega una oferta ya preparada por `_preparar`."""
+
+    @abstractmethod
+    def _quitar(self, oferta_id: int) -> None:
+        """Saca la oferta si está; no falla si no está."""
+
+    def _preparar(self, filas: list) -> list:
+        return filas
+
+    def reconstruir(self, conn: sqlite3.Connection) -> None:
+        version = versiones_catalogo.obtener(['ofertas_empleo'], conn)[0]
+        # La secuencia se lee antes que las ofertas: lo que cambie en medio se
+        # vuelve a aplicar en la próxima sincronización, y aplicarlo es idempotente
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ofertas_cambios").fetchone()[0]
+        columnas = ', '.join(('id',) + self.COLUMNAS)
+        items = list(self._preparar(conn.execute(f"SELECT {columnas} FROM ofertas_empleo WHERE activa = 1").fetchall()))
+        with self._lock:
+            self._vaciar()
+            for item in items:
+                self._poner(item)
+            self._seq = seq
+            self._version = version
+            self.listo = True
+
+    def sincronizar(self, conn: sqlite3.Connection) -> None:
+        """Aplica los cambios pendientes si la versión de `ofertas_empleo` se movió.
+
+        Los cambios se leen y se preparan sin el candado; solo se toma para
+        aplicarlos, y se descartan si mientras tanto se reconstruyó el índice.
+        """
+        version = versiones_catalogo.obtener(['ofertas_empleo'], conn)[0]
+        if not self.listo or version == self._version:
+            return
+        with self._sincronizando:
+            if version == self._version:
+                return
+            desde = self._seq
+            columnas = ', '.join(f'o.{c}' for c in ('id', 'activa') + self.COLUMNAS)
+            cambios = conn.execute(f'''
+                SELECT c.oferta_id, c.seq, {columnas}
+                FROM ofertas_cambios c
+                LEFT JOIN ofertas_empleo o ON o.id = c.oferta_id
+                WHERE c.seq > ?
+            ''', (desde,)).fetchall()
+            items = list(self._preparar([row for row in cambios if row['id'] is not None and row['activa']]))
+            with self._lock:
+                if self._seq != desde:
+                    return
+                for row in cambios:
+                    self._quitar(row['oferta_id'])
+                    self._seq = max(self._seq, row['seq'])
+                for item in items:
+                    self._poner(item)
+                self._version = version
+                self._sincronizaciones += 1
+
+
+class IndiceHabilidades(IndiceOfertas):
+    """Índice invertido habilidad -> ofertas activas.
+
+    Recomendar cuesta lo que suman las listas de las habilidades del perfil,
+    no el total de ofertas.
+    """
+
+    COLUMNAS = ('habilidades_requeridas', 'ubicacion', 'modalidad', 'fecha_publicacion_ts')
+
+    def _vaciar(self) -> None:
+        self._postings: Dict[str, set] = {}
+        # id -> (habilidades, 1/len(habilidades), ubicación normalizada, modalidad, fecha_publicacion_ts)
+        self._ofertas: Dict[int, tuple] = {}
+
+    def _quitar(self, oferta_id: int) -> None:
+        datos = self._ofertas.pop(oferta_id, None)
+        if datos is None:
+            return
+        for habilidad in datos[0]:
+            ofertas = self._postings.get(habilidad)
+            if ofertas is not None:
+                ofertas.discard(oferta_id)
+                if not ofertas:
+                    del self._postings[habilidad]
+
+    def _poner(self, row) -> None:
+        habilidades = habilidades_normalizadas(row['habilidades_requeridas'])
+        self._ofertas[row['id']] = (
+            habilidades,
+            1.0 / len(habilidades) if habilidades else 0.0,
+            normalizar_texto(row['ubicacion']),
+            (row['modalidad'] or '').lower(),
+            row['fecha_publicacion_ts'] or 0,
+        )
+        for habilidad in habilidades:
+            self._postings.setdefault(habilidad, set()).add(row['id'])
+
+    def recomendar(self, habilidades: frozenset, ubicacion: str, modalidad: str,
+                   limite: int) -> List[tuple]:
+        """Top `limite` de (oferta_id, puntaje, habilidades en común) entre las ofertas
+        que comparten al menos una habilidad con el perfil."""
+        with self._lock:
+            coincidencias = Counter()
+            for habilidad in habilidades:
+                ofertas = self._postings.get(habilidad)
+                if ofertas:
+                    coincidencias.update(ofertas)
+            datos = self._ofertas
+            candidatos = []
+            for oferta_id, cantidad in coincidencias.items():
+                _, inverso, ubic, mod, ts = datos[oferta_id]
+                puntaje = RECOMENDACION_PESO_HABILIDADES * cantidad * inverso
+                if ubicacion and (mod == 'remoto' or (ubic and ubicacion in ubic)):
+                    puntaje += RECOMENDACION_PESO_UBICACION
+                if modalidad and mod == modalidad:
+                    puntaje += RECOMENDACION_PESO_MODALIDAD
+                candidatos.append((puntaje, ts, oferta_id))
+            mejores = heapq.nlargest(limite, candidatos)
+            return [(oferta_id, puntaje, datos[oferta_id][0] & habilidades) for puntaje, _, oferta_id in mejores]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ofertas": len(self._ofertas),
+                "habilidades": len(self._postings),
+                "seq": self._seq,
+                "sincronizaciones": self._sincronizaciones,
+            }
+
+
+indice_habilidades = IndiceHabilidades()
+
+
+def resumen_ofertas(cursor: sqlite3.Cursor, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Tarjeta (id, título, empresa, ubicación, salario...) de cada oferta de `ids`, por id."""
+    cursor.execute(f'''
+        SELECT o.id, o.titulo, o.ubicacion, o.modalidad, o.tipo_contrato,
+               o.salario_min, o.salario_max, o.fecha_publicacion, e.razon_social as empresa
+        FROM ofertas_empleo o
+        LEFT JOIN empresas e ON o.empresa_id = e.id
+        WHERE o.id IN ({', '.join('?' * len(ids))})
+    ''', ids)
+    return {
+        row['id']: {
+            'id': row['id'],
+            'titulo': row['titulo'],
+            'empresa': row['empresa'],
+            'ubicacion': row['ubicacion'],
+            'modalidad': row['modalidad'],
+            'tipo_contrato': row['tipo_contrato'],
+            'salarioMin': row['salario_min'],
+            'salarioMax': row['salario_max'],
+            'fechaPublicacion': row['fecha_publicacion']
+        }
+        for row in cursor.fetchall()
+    }
+
+
+# Relleno de `/api/ofertas/recomendadas`: las más recientes fuera de `excluidas`
+SQL_RECOMENDADAS_RELLENO = '''
+    SELECT o.id FROM ofertas_empleo o
+    WHERE o.activa = 1 AND o.id NOT IN ({excluidas})
+    ORDER BY o.fecha_publicacion_ts DESC, o.id DESC
+    LIMIT ?
+'''
+
+
 @app.get('/api/ofertas/recomendadas')
-def obtener_ofertas_recomendadas(user_id: Optional[int] = None, limit: int = 2):
-    """Devuelve ofertas recomendadas para un usuario (simple: últimas `limit` ofertas).
-    Parámetros: user_id (opcional), limit (por defecto 2)
+def obtener_ofertas_recomendadas(
+    request: Request,
+    response: Response,
+    user_id: Optional[int] = None,
+    limit: int = 2,
+    modalidad: Optional[str] = None,
+    conn: sqlite3.Connection = Depends(get_db)
+):
+    """Devuelve ofertas recomendadas para un usuario.
+
+    Ordena por coincidencia entre `perfiles_buscadores.habilidades` y las
+    habilidades requeridas, con bono por ubicación (o trabajo remoto) y por
+    `modalidad` si se indica. Sin `user_id` se usa el de la sesión. Si el perfil
+    no alcanza a llenar `limit`, se completa con las ofertas más recientes.
     """
+    limite = min(max(limit, 1), RECOMENDACIONES_MAX)
+    if user_id is None:
+        try:
+            sesion = usuario_de_sesion(request, response)
+        except HTTPException:
+            sesion = None
+        user_id = sesion['id'] if sesion else None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT o.id, o.titulo, o.descripcion, o.ubicacion, o.modalidad, o.tipo_contrato,
-                   o.salario_min, o.salario_max, o.fecha_publicacion, e.razon_social as empresa
-            FROM ofertas_empleo o
-            LEFT JOIN empresas e ON o.empresa_id = e.id
-            WHERE o.activa = 1
-            ORDER BY datetime(o.fecha_publicacion) DESC
-            LIMIT ?
-        ''', (limit,))
+        ranking = []
+        if user_id is not None:
+            cursor.execute(
+                'SELECT habilidades, ubicacion FROM perfiles_buscadores WHERE usuario_id = ? ORDER BY id LIMIT 1',
+                (user_id,)
+            )
+            perfil = cursor.fetchone()
+            habilidades = habilidades_normalizadas(perfil['habilidades']) if perfil else frozenset()
+            if habilidades:
+                indice_habilidades.sincronizar(conn)
+                ranking = indice_habilidades.recomendar(
+                    habilidades, normalizar_texto(perfil['ubicacion']), (modalidad or '').lower(), limite
+                )
+
+        ids = [oferta_id for oferta_id, _, _ in ranking]
+        if len(ids) < limite:
+            # Completar con las más recientes que no estén ya en la lista
+            cursor.execute(
+                SQL_RECOMENDADAS_RELLENO.format(excluidas=', '.join('?' * len(ids))),
+                (*ids, limite - len(ids))
+            )
+            ranking += [(row['id'], 0.0, frozenset()) for row in cursor.fetchall()]
+            ids = [oferta_id for oferta_id, _, _ in ranking]
 
-        rows = cursor.fetchall()
+        resumenes = resumen_ofertas(cursor, ids)
         ofertas = []
-        for row in rows:
-            ofertas.append({
-                'id': row['id'],
-                'titulo': row['titulo'],
-                'empresa': row['empresa'],
-                'ubicacion': row['ubicacion'],
-                'modalidad': row['modalidad'],
-                'tipo_contrato': row['tipo_contrato'],
-                'salarioMin': row['salario_min'],
-                'salarioMax': row['salario_max'],
-                'fechaPublicacion': row['fecha_publicacion']
-            })
+        for oferta_id, puntaje, comunes in ranking:
+            if oferta_id in resumenes:
+                ofertas.append({
+                    **resumenes[oferta_id],
+                    'puntaje': round(puntaje, 4),
+                    'habilidadesCoincidentes': sorted(comunes)
+                })
 
-        conn.close()
         return { 'success': True, 'data': ofertas, 'total': len(ofertas) }
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=str(e))
         
 
 
-@app.get("/api/ofertas/{oferta_id}")
-def obtener_oferta_por_id(oferta_id: int):
+# ---- Ofertas similares (TF-IDF) ----
+
+SIMILARES_RUTA = os.getenv("CEO_SIMILARES_PATH", os.path.splitext(DB_PATH)[0] + ".similares.json")
+SIMILARES_PROCESOS = int(os.getenv("CEO_SIMILARES_PROCESOS", "0"))  # 0 = os.cpu_count()
+SIMILARES_LOTE = 2000  # ofertas por tarea; con menos se tokeniza sin pool de procesos
+SIMILARES_TERMINOS_OFERTA = 32  # términos que se indexan por oferta (los de más peso tf-idf)
+SIMILARES_TERMINOS_CONSULTA = 32  # términos de más peso de la oferta consultada
+SIMILARES_DF_MAX = 0.05  # términos en más de esta fracción de ofertas no suman candidatos
+SIMILARES_CACHE = 512
+SIMILARES_MAX = 20
+
+# Palabras sin valor para comparar ofertas (ya normalizadas: sin tildes, minúsculas)
+PALABRAS_VACIAS = frozenset('''
+    al algo algun alguna ante como con contra cual de del desde donde el ella en entre era es esa ese
+    esta este esto hay la las le les lo los mas muy no nos o otra otro para pero por que se ser si sin
+    sobre su sus tambien te tiene todo tu un una uno unos y ya
+'''.split())
+
+
+def terminos_oferta(titulo, descripcion, requisitos, habilidades) -> Dict[str, int]:
+    """Frecuencia de cada término de una oferta.
+
+    El título cuenta doble y cada habilidad requerida entra además como término
+    propio (`h:python`), para que compartir habilidades pese más que compartir
+    palabras sueltas.
+    """
+    conteo = Counter()
+    for texto, peso in ((titulo, 2), (descripcion, 1), (requisitos, 1)):
+        for palabra in _SEPARADORES.split(normalizar_texto(texto)):
+            if len(palabra) > 1 and not palabra.isdigit() and palabra not in PALABRAS_VACIAS:
+                conteo[palabra] += peso
+    for habilidad in habilidades_normalizadas(habilidades):
+        conteo['h:' + habilidad] += 2
+    return dict(conteo)
+
+
+def _terminos_lote(filas: List[tuple]) -> List[tuple]:
+    """Tarea del pool de procesos: [(id, titulo, descripcion, requisitos, habilidades)] -> [(id, términos)]."""
+    return [(fila[0], terminos_oferta(*fila[1:])) for fila in filas]
+
+
+class IndiceSimilares(IndiceOfertas):
+    """Índice TF-IDF disperso de las ofertas activas.
+
+    Cada oferta se reduce a sus `SIMILARES_TERMINOS_OFERTA` términos de más
+    peso tf-idf, con peso 1 + log(tf); por término se guardan las ofertas que
+    lo tienen. El IDF se calcula al consultar y las normas se recalculan al
+    reconstruir o cargar (las ofertas que entran después la calculan al
+    usarse). La similitud es el coseno, acumulado solo sobre las listas de los
+    términos de la oferta consultada. Reconstruir tokeniza en un pool de
+    procesos; `guardar`/`cargar` lo persisten en JSON, junto con la identidad
+    de la base (ver `identidad_base`), para no reconstruir en cada arranque.
+    """
+
+    COLUMNAS = ('titulo', 'descripcion', 'requisitos', 'habilidades_requeridas')
+    FORMATO = 2
+
+    def __init__(self):
+        self.error: Optional[str] = None
+        self._seq_guardado = None
+        self._base = None
+        super().__init__()
+
+    def _vaciar(self) -> None:
+        self._conteos: Dict[int, Dict[str, int]] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._normas: Dict[int, float] = {}
+        self._resultados: OrderedDict = OrderedDict()
+
+    def _preparar(self, filas: list) -> list:
+        tuplas = [(row['id'], *(row[c] for c in self.COLUMNAS)) for row in filas]
+        if len(tuplas) <= SIMILARES_LOTE:
+            conteos = _terminos_lote(tuplas)
+        else:
+            lotes = [tuplas[i:i + SIMILARES_LOTE] for i in range(0, len(tuplas), SIMILARES_LOTE)]
+            # spawn: un fork copiaría los hilos del servidor y el estado de SQLite a medio usar
+            with ProcessPoolExecutor(max_workers=SIMILARES_PROCESOS or None,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                conteos = [item for lote in pool.map(_terminos_lote, lotes) for item in lote]
+        if len(conteos) >= len(self._conteos):
+            # Reconstrucción (o un lote mayor que el índice): el DF sale del propio lote
+            df = Counter(termino for _, conteo in conteos for termino in conteo)
+            total, frecuencia = len(conteos), df.__getitem__
+        else:
+            total, frecuencia = len(self._conteos), lambda termino: len(self._postings.get(termino, ()))
+        return [(oferta_id, self._recortar(conteo, frecuencia, total)) for oferta_id, conteo in conteos]
+
+    @staticmethod
+    def _recortar(conteo: Dict[str, int], frecuencia, total: int) -> Dict[str, int]:
+        if len(conteo) <= SIMILARES_TERMINOS_OFERTA:
+            return conteo
+        return dict(heapq.nlargest(
+            SIMILARES_TERMINOS_OFERTA, conteo.items(),
+            key=lambda tn: (1.0 + math.log(tn[1])) * math.log((1 + total) / (1 + frecuencia(tn[0])))
+        ))
+
+    def _poner(self, item) -> None:
+        oferta_id, conteo = item
+        self._conteos[oferta_id] = conteo
+        postings = self._postings
+        for termino, n in conteo.items():
+            peso = 1.0 + math.log(n)
+            ofertas = postings.get(termino)
+            if ofertas is None:
+                postings[termino] = {oferta_id: peso}
+            else:
+                ofertas[oferta_id] = peso
+        if self._resultados:
+            self._resultados.clear()
+
+    def _quitar(self, oferta_id: int) -> None:
+        conteo = self._conteos.pop(oferta_id, None)
+        if conteo is None:
+            return
+        self._normas.pop(oferta_id, None)
+        for termino in conteo:
+            ofertas = self._postings.get(termino)
+            if ofertas is not None:
+                ofertas.pop(oferta_id, None)
+                if not ofertas:
+                    del self._postings[termino]
+        self._resultados.clear()
+
+    def _idf(self, termino: str) -> float:
+        return math.log((1 + len(self._conteos)) / (1 + len(self._postings.get(termino, ())))) + 1.0
+
+    def _norma(self, oferta_id: int) -> float:
+        norma = self._normas.get(oferta_id)
+        if norma is None:
+            postings = self._postings
+            norma = math.sqrt(sum(
+                (postings[t][oferta_id] * self._idf(t)) ** 2 for t in self._conteos[oferta_id]
+            )) or 1.0
+            self._normas[oferta_id] = norma
+        return norma
+
+    def _calcular_normas(self) -> None:
+        total = len(self._conteos)
+        idf = {t: math.log((1 + total) / (1 + len(o))) + 1.0 for t, o in self._postings.items()}
+        normas = {}
+        for termino, ofertas in self._postings.items():
+            factor = idf[termino] ** 2
+            for oferta_id, peso in ofertas.items():
+                normas[oferta_id] = normas.get(oferta_id, 0.0) + peso * peso * factor
+        self._normas = {oferta_id: math.sqrt(suma) or 1.0 for oferta_id, suma in normas.items()}
+
+    def reconstruir(self, conn: sqlite3.Connection) -> None:
+        self._base = identidad_base(conn)
+        super().reconstruir(conn)
+        with self._lock:
+            self._calcular_normas()
+
+    def similares(self, oferta_id: int, conteo: Dict[str, int], limite: int) -> List[tuple]:
+        """Top `limite` de (oferta_id, similitud) para una oferta con términos `conteo`."""
+        if not self.listo:
+            return []
+        with self._lock:
+            clave = (oferta_id, limite)
+            if clave in self._resultados:
+                self._resultados.move_to_end(clave)
+                return self._resultados[clave]
+            consulta = {t: (1.0 + math.log(n)) * self._idf(t) for t, n in conteo.items()}
+            norma_consulta = math.sqrt(sum(w * w for w in consulta.values())) or 1.0
+            tope = max(50, SIMILARES_DF_MAX * len(self._conteos))  # con pocas ofertas no se descarta nada
+            acumulado: Dict[int, float] = {}
+            for termino, peso in heapq.nlargest(SIMILARES_TERMINOS_CONSULTA, consulta.items(), key=lambda tw: tw[1]):
+                ofertas = self._postings.get(termino)
+                if not ofertas or len(ofertas) > tope:
+                    continue
+                factor = peso * self._idf(termino)
+                for otra, peso_otra in ofertas.items():
+                    acumulado[otra] = acumulado.get(otra, 0.0) + factor * peso_otra
+            acumulado.pop(oferta_id, None)
+            mejores = heapq.nlargest(limite, ((s / self._norma(o), o) for o, s in acumulado.items()))
+            # Las normas se fijan con un IDF algo anterior: se acota a 1
+            resultado = [(o, round(min(s / norma_consulta, 1.0), 4)) for s, o in mejores]
+            self._resultados[clave] = resultado
+            if len(self._resultados) > SIMILARES_CACHE:
+                self._resultados.popitem(last=False)
+            return resultado
+
+    def guardar(self, ruta: str) -> None:
+        """Escribe el índice en `ruta` (reemplazo atómico) si cambió desde la última vez.
+
+        Formato: vocabulario en una lista y, por oferta, pares [término, tf] aplanados.
+        """
+        with self._lock:
+            if not self.listo or self._seq == self._seq_guardado:
+                return
+            seq, base = self._seq, self._base
+            terminos = list(self._postings)
+            posicion = {t: i for i, t in enumerate(terminos)}
+            ofertas = {
+                oferta_id: [x for t, n in conteo.items() for x in (posicion[t], n)]
+                for oferta_id, conteo in self._conteos.items()
+            }
+        datos = {'formato': self.FORMATO, 'base': base, 'seq': seq, 'terminos': terminos, 'ofertas': ofertas}
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(datos, ensure_ascii=False, separators=(',', ':')))
+        os.replace(temporal, ruta)
+        self._seq_guardado = seq
+
+    def cargar(self, ruta: str, conn: sqlite3.Connection) -> bool:
+        """Carga un índice guardado y lo pone al día; False si hay que reconstruir
+        (no existe, es de otro formato o de otra base)."""
+        base = identidad_base(conn)
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('formato') != self.FORMATO or datos.get('base') != base:
+                return False
+            seq, terminos, ofertas = int(datos['seq']), datos['terminos'], datos['ofertas']
+            items = [
+                (int(oferta_id), {terminos[i]: n for i, n in zip(pares[::2], pares[1::2])})
+                for oferta_id, pares in ofertas.items()
+            ]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError, IndexError):
+            return False
+        # Misma base pero restaurada de una copia anterior al archivo
+        if seq > conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ofertas_cambios").fetchone()[0]:
+            return False
+        with self._lock:
+            self._vaciar()
+            for item in items:
+                self._poner(item)
+            self._calcular_normas()
+            self._base = base
+            self._seq = self._seq_guardado = seq
+            self._version = None
+            self.listo = True
+        self.sincronizar(conn)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "listo": self.listo,
+                "ofertas": len(self._conteos),
+                "terminos": len(self._postings),
+                "seq": self._seq,
+                "sincronizaciones": self._sincronizaciones,
+                "resultados_en_cache": len(self._resultados),
+                "error": self.error,
+            }
+
+
+indice_similares = IndiceSimilares()
+
+
+def construir_indice_similares() -> None:
+    """Carga el índice de similares guardado o, si no sirve, lo reconstruye y lo
+    guarda; corre en un hilo al arrancar para no demorar el inicio."""
+    try:
+        conn = db_pool.conexion_aparte()
+        try:
+            if not indice_similares.cargar(SIMILARES_RUTA, conn):
+                indice_similares.reconstruir(conn)
+        finally:
+            conn.close()
+        indice_similares.guardar(SIMILARES_RUTA)
+        indice_similares.error = None
+    except (sqlite3.Error, OSError) as e:
+        indice_similares.error = str(e)
+
+
+@app.on_event("shutdown")
+def guardar_indice_similares():
+    try:
+        indice_similares.guardar(SIMILARES_RUTA)
+    except OSError as e:
+        indice_similares.error = str(e)
+
+
+@app.get('/api/ofertas/{oferta_id}/similares')
+def obtener_ofertas_similares(oferta_id: int, limit: int = 4, conn: sqlite3.Connection = Depends(get_db)):
+    """Ofertas activas más parecidas a `oferta_id` por título, descripción, requisitos
+    y habilidades. Mientras el índice se construye devuelve una lista vacía.
+    """
+    limite = min(max(limit, 1), SIMILARES_MAX)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT titulo, descripcion, requisitos, habilidades_requeridas FROM ofertas_empleo WHERE id = ?',
+            (oferta_id,)
+        )
+        oferta = cursor.fetchone()
+        if not oferta:
+            raise HTTPException(status_code=404, detail='Oferta no encontrada')
+
+        indice_similares.sincronizar(conn)
+        ranking = indice_similares.similares(oferta_id, terminos_oferta(*oferta), limite)
+        resumenes = resumen_ofertas(cursor, [otra for otra, _ in ranking]) if ranking else {}
+        ofertas = [
+            {**resumenes[otra], 'similitud': similitud}
+            for otra, similitud in ranking if otra in resumenes
+        ]
+        return {'success': True, 'data': ofertas, 'total': len(ofertas)}
+    except HTTPException:
+        raise
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ---- Facetas de búsqueda ----
+
+FACETAS_MAX_VALORES = 50
+FACETAS_MAX_HABILIDADES = 15
+
+# faceta -> filtros de `filtros_ofertas` que eligen uno de sus valores. Sector no
+# tiene filtro, y las habilidades elegidas se exigen todas, así que su faceta
+# cuenta con el filtro puesto.
+FACETAS_FILTRO = {
+    'modalidad': ('modalidad',),
+    'tipo_contrato': ('tipo_contrato',),
+    'ubicacion': ('ubicacion', 'radio_km'),
+    'sector': (),
+    'habilidades': (),
+}
+
+
+def _valor_faceta(valor) -> Optional[str]:
+    valor = valor.strip() if isinstance(valor, str) else None
+    return valor or None
+
+
+def fusionar_variantes(conteo: Counter) -> Counter:
+    """Junta los valores que solo difieren en mayúsculas o tildes ("Término Fijo",
+    "Termino fijo") bajo la variante más frecuente, con la misma clave que usa
+    `filtros_ofertas` para filtrarlos."""
+    grupos: Dict[str, list] = {}
+    for valor, total in conteo.items():
+        grupos.setdefault(clave_habilidad(valor), []).append((-total, valor))
+    return Counter({min(variantes)[1]: -sum(t for t, _ in variantes) for variantes in grupos.values()})
+
+
+class ContadorFacetas(IndiceOfertas):
+    """Conteos por faceta de todas las ofertas activas.
+
+    Cada oferta guarda sus valores para poder restarlos cuando cambia o se
+    desactiva, así que la búsqueda sin filtros no recorre `ofertas_empleo`.
+    El sector sale de los conteos por empresa y del sector de cada una, y la
+    ubicación es el municipio cuando el nomenclátor la reconoce.
+    """
+
+    COLUMNAS = ('empresa_id', 'modalidad', 'tipo_contrato', 'ubicacion', 'municipio_id', 'habilidades_requeridas')
+    FACETAS = ('empresa', 'modalidad', 'tipo_contrato', 'ubicacion', 'habilidades')
+
+    def _vaciar(self) -> None:
+        # id -> ((faceta, valor), ...)
+        self._ofertas: Dict[int, tuple] = {}
+        self._conteos: Dict[str, Counter] = {faceta: Counter() for faceta in self.FACETAS}
+        self._sectores: tuple = (None, {})
+
+    def _quitar(self, oferta_id: int) -> None:
+        valores = self._ofertas.pop(oferta_id, None)
+        if valores is None:
+            return
+        for faceta, valor in valores:
+            conteo = self._conteos[faceta]
+            conteo[valor] -= 1
+            if conteo[valor] <= 0:
+                del conteo[valor]
+
+    def _poner(self, row) -> None:
+        municipio = nomenclator.municipios.get(row['municipio_id'])
+        valores = [
+            ('empresa', row['empresa_id']),
+            ('modalidad', _valor_faceta(row['modalidad'])),
+            ('tipo_contrato', _valor_faceta(row['tipo_contrato'])),
+            ('ubicacion', municipio['nombre'] if municipio else _valor_faceta(row['ubicacion'])),
+        ]
+        lista = _lista_json(row['habilidades_requeridas'])
+        if isinstance(lista, list):
+            claves = dict.fromkeys(clave_habilidad(h) for h in lista if isinstance(h, str))
+            valores += [('habilidades', clave) for clave in claves if clave]
+        valores = tuple((faceta, valor) for faceta, valor in valores if valor is not None)
+        self._ofertas[row['id']] = valores
+        for faceta, valor in valores:
+            self._conteos[faceta][valor] += 1
+
+    def total(self) -> int:
+        with self._lock:
+            return len(self._ofertas)
+
+    def conteos(self, ids: Optional[List[int]] = None) -> Dict[str, Counter]:
+        """Conteo de cada valor por faceta entre las ofertas `ids` (None = todas)."""
+        with self._lock:
+            if ids is None:
+                return {faceta: Counter(conteo) for faceta, conteo in self._conteos.items()}
+            conteos = {faceta: Counter() for faceta in self.FACETAS}
+            ofertas = self._ofertas
+            for oferta_id in ids:
+                for faceta, valor in ofertas.get(oferta_id, ()):
+                    conteos[faceta][valor] += 1
+            return conteos
+
+    def mas_frecuentes(self, conn: sqlite3.Connection, conteos: Dict[str, Counter],
+                       faceta: str, limite: int) -> List[tuple]:
+        """Los `limite` valores más frecuentes de `faceta` como (valor, total)."""
+        if faceta == 'sector':
+            sectores = self._sector_empresas(conn)
+            conteo = Counter()
+            for empresa_id, total in conteos['empresa'].items():
+                sector = sectores.get(empresa_id)
+                if sector:
+                    conteo[sector] += total
+        else:
+            conteo = conteos[faceta]
+        if faceta != 'habilidades':
+            conteo = fusionar_variantes(conteo)
+        mejores = heapq.nsmallest(limite, conteo.items(), key=lambda par: (-par[1], par[0]))
+        if faceta == 'habilidades' and mejores:
+            # Las claves se muestran con el nombre con que quedaron internadas
+            filas = conn.execute(
+                f"SELECT clave, nombre FROM habilidades WHERE clave IN ({', '.join('?' * len(mejores))})",
+                [clave for clave, _ in mejores]
+            ).fetchall()
+            nombres = {row['clave']: row['nombre'] for row in filas}
+            mejores = [(nombres.get(clave, clave), total) for clave, total in mejores]
+        return mejores
+
+    def _sector_empresas(self, conn: sqlite3.Connection) -> Dict[int, str]:
+        version = versiones_catalogo.obtener(['empresas'], conn)[0]
+        with self._lock:
+            vigente, sectores = self._sectores
+        if vigente != version:
+            sectores = {
+                row['id']: _valor_faceta(row['sector'])
+                for row in conn.execute('SELECT id, sector FROM empresas').fetchall()
+            }
+            with self._lock:
+                self._sectores = (version, sectores)
+        return sectores
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ofertas": len(self._ofertas),
+                "valores": {faceta: len(conteo) for faceta, conteo in self._conteos.items()},
+                "seq": self._seq,
+                "sincronizaciones": self._sincronizaciones,
+            }
+
+
+contador_facetas = ContadorFacetas()
+
+
+@app.get('/api/ofertas/facetas')
+def obtener_facetas_ofertas(
+    q: str = "",
+    ubicacion: Optional[str] = None,
+    modalidad: Optional[str] = None,
+    tipo_contrato: Optional[str] = None,
+    salario_min: Optional[float] = None,
+    habilidad: Optional[str] = None,
+    radio_km: Optional[float] = None,
+    _cache: None = Depends(cache_condicional('ofertas_empleo', 'empresas')),
+    conn: sqlite3.Connection = Depends(get_db)
+):
+    """Cuántas ofertas activas hay por modalidad, tipo de contrato, ubicación,
+    sector y habilidad (las más pedidas).
+
+    Acepta los filtros de `/api/ofertas/buscar`. Cada faceta se cuenta con todos
+    los filtros menos el suyo, para que el usuario vea cuántas habría si cambiara
+    esa opción. Sin filtros se responde desde los conteos en memoria.
+    """
+    filtros = {
+        'ubicacion': ubicacion,
+        'modalidad': modalidad,
+        'tipo_contrato': tipo_contrato,
+        'salario_min': salario_min,
+        'habilidad': habilidad,
+        'radio_km': radio_km,
+    }
+    consulta = consulta_fts(q) if q.strip() else None
+    if q.strip() and consulta is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El parámetro q debe contener al menos una palabra"
+        )
+
+    def ofertas_filtradas(filtros_faceta: Dict[str, Any]) -> List[int]:
+        condiciones, params = filtros_ofertas(**filtros_faceta)
+        if consulta is not None:
+            # Como subconsulta: unida, el planificador repite el MATCH por cada oferta
+            condiciones.append("o.id IN (SELECT rowid FROM ofertas_fts WHERE ofertas_fts MATCH :consulta)")
+            params['consulta'] = consulta
+        donde = ''.join(f" AND {c}" for c in condiciones)
+        return [row[0] for row in conn.execute(f"SELECT o.id FROM ofertas_empleo o WHERE o.activa = 1{donde}", params)]
+
+    # Una lectura de ids por combinación de filtros; los valores de cada oferta
+    # ya están en memoria
+    grupos: Dict[tuple, tuple] = {}
+
+    def contar(filtros_faceta: Dict[str, Any]):
+        clave = tuple(filtros_faceta.items())
+        if clave not in grupos:
+            if consulta is None and not any(filtros_faceta.values()):
+                grupos[clave] = (contador_facetas.total(), contador_facetas.conteos())
+            else:
+                ids = ofertas_filtradas(filtros_faceta)
+                grupos[clave] = (len(ids), contador_facetas.conteos(ids))
+        return grupos[clave]
+
+    try:
+        contador_facetas.sincronizar(conn)
+        total, _ = contar(filtros)
+        facetas = {}
+        for faceta, propios in FACETAS_FILTRO.items():
+            _, conteos = contar({**filtros, **dict.fromkeys(propios)})
+            limite = FACETAS_MAX_HABILIDADES if faceta == 'habilidades' else FACETAS_MAX_VALORES
+            facetas[faceta] = [
+                {'valor': valor, 'total': cantidad}
+                for valor, cantidad in contador_facetas.mas_frecuentes(conn, conteos, faceta, limite)
+            ]
+        return {'success': True, 'total': total, 'facetas': facetas}
+    except sqlite3.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al contar facetas: {str(e)}"
+        )
+
+
+@app.get("/api/ofertas/{oferta_id}", response_class=RespuestaJSON)
+def obtener_oferta_por_id(
+    oferta_id: int,
+    _cache: None = Depends(cache_condicional('ofertas_empleo', 'empresas'))
+):
     """
     Obtiene una oferta de empleo específica por su ID
     """
+    return entidad_cacheada('oferta', oferta_id, _cargar_oferta)
+
+
+def _cargar_oferta(conn: sqlite3.Connection, oferta_id: int) -> Dict[str, Any]:
+    """Consultas de `obtener_oferta_por_id`; el resultado se guarda en `cache_entidades`."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -609,7 +3133,6 @@ def obtener_oferta_por_id(oferta_id: int):
         ''', (oferta_id,))
         
         row = cursor.fetchone()
-        conn.close()
         
         if not row:
             raise HTTPException(
@@ -658,6 +3181,113 @@ def obtener_oferta_por_id(oferta_id: int):
 class PostularRequest(BaseModel):
     usuario_id: int
 
+
+def _registrar_postulacion(conn: sqlite3.Connection, usuario_id: int, oferta_id: int) -> Dict[str, Any]:
+    """Operación de escritura compartida por `postular_a_oferta` y `crear_postulacion`.
+
+    Corre en `db_writer`, así la verificación de duplicados y el INSERT son atómicos.
+    """
+    cursor = conn.cursor()
+    
+    # Verificar que el usuario existe y es un buscador
+    cursor.execute('SELECT id, tipo_usuario FROM usuarios WHERE id = ?', (usuario_id,))
+    usuario = cursor.fetchone()
+    
+    if not usuario:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
+    
+    if usuario['tipo_usuario'] != 'buscador':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios (buscadores de empleo) pueden postularse a ofertas"
+        )
+    
+    # Verificar que la oferta existe y está activa
+    cursor.execute('''
+        SELECT o.id, o.titulo, o.empresa_id, o.ubicacion, o.salario_min, o.salario_max, e.razon_social
+        FROM ofertas_empleo o
+        LEFT JOIN empresas e ON o.empresa_id = e.id
+        WHERE o.id = ? AND o.activa = 1
+    ''', (oferta_id,))
+    oferta = cursor.fetchone()
+    
+    if not oferta:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Oferta no encontrada o no está disponible"
+        )
+    
+    # Verificar si ya está postulado
+    cursor.execute('''
+        SELECT id FROM postulaciones 
+        WHERE usuario_id = ? AND oferta_id = ?
+    ''', (usuario_id, oferta_id))
+    postulacion_existente = cursor.fetchone()
+    
+    if postulacion_existente:
+        return {
+            "message": "Ya estás postulado a esta oferta",
+            "postulacion_id": postulacion_existente['id'],
+            "ya_postulado": True,
+            "oferta_titulo": oferta['titulo']
+        }
+    
+    # Obtener información de la empresa
+    empresa_nombre = oferta['razon_social'] or 'Empresa'
+    
+    # Preparar datos de la postulación
+    salario_str = None
+    if oferta['salario_min'] and oferta['salario_max']:
+        salario_str = f"${oferta['salario_min']:,.0f} - ${oferta['salario_max']:,.0f}"
+    elif oferta['salario_min']:
+        salario_str = f"Desde ${oferta['salario_min']:,.0f}"
+    
+    # Crear la postulación
+    cursor.execute('''
+        INSERT INTO postulaciones (
+            usuario_id, oferta_id, empresa_id, empresa, puesto, descripcion,
+            estado_actual, salario, ubicacion, tags
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        usuario_id,
+        oferta_id,
+        oferta['empresa_id'],
+        empresa_nombre,
+        oferta['titulo'],
+        None,  # descripcion puede ser NULL
+        'Registrada',
+        salario_str,
+        oferta['ubicacion'],
+        json.dumps([])  # tags vacío por defecto
+    ))
+    
+    postulacion_id = cursor.lastrowid
+    
+    # Crear registro inicial en historial de estados
+    cursor.execute('''
+        INSERT INTO historial_estados (
+            postulacion_id, estado_anterior, estado_nuevo, usuario_cambio, observaciones
+        ) VALUES (?, ?, ?, ?, ?)
+    ''', (
+        postulacion_id,
+        None,
+        'Registrada',
+        'usuario',
+        'Postulación creada por el usuario'
+    ))
+    
+    return {
+        "message": "Postulación creada exitosamente",
+        "postulacion_id": postulacion_id,
+        "ya_postulado": False,
+        "oferta_titulo": oferta['titulo'],
+        "empresa": empresa_nombre
+    }
+
+
 @app.post("/api/ofertas/{oferta_id}/postular")
 def postular_a_oferta(oferta_id: int, postulacion: PostularRequest):
     """
@@ -672,113 +3302,7 @@ def postular_a_oferta(oferta_id: int, postulacion: PostularRequest):
                 detail="Se requiere usuario_id para postularse"
             )
         
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Verificar que el usuario existe y es un buscador
-        cursor.execute('SELECT id, tipo_usuario FROM usuarios WHERE id = ?', (usuario_id,))
-        usuario = cursor.fetchone()
-        
-        if not usuario:
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Usuario no encontrado"
-            )
-        
-        if usuario['tipo_usuario'] != 'buscador':
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Solo los usuarios (buscadores de empleo) pueden postularse a ofertas"
-            )
-        
-        # Verificar que la oferta existe y está activa
-        cursor.execute('''
-            SELECT o.id, o.titulo, o.empresa_id, o.ubicacion, o.salario_min, o.salario_max, e.razon_social
-            FROM ofertas_empleo o
-            LEFT JOIN empresas e ON o.empresa_id = e.id
-            WHERE o.id = ? AND o.activa = 1
-        ''', (oferta_id,))
-        oferta = cursor.fetchone()
-        
-        if not oferta:
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Oferta no encontrada o no está disponible"
-            )
-        
-        # Verificar si ya está postulado
-        cursor.execute('''
-            SELECT id FROM postulaciones 
-            WHERE usuario_id = ? AND oferta_id = ?
-        ''', (usuario_id, oferta_id))
-        postulacion_existente = cursor.fetchone()
-        
-        if postulacion_existente:
-            conn.close()
-            return {
-                "message": "Ya estás postulado a esta oferta",
-                "postulacion_id": postulacion_existente['id'],
-                "ya_postulado": True,
-                "oferta_titulo": oferta['titulo']
-            }
-        
-        # Obtener información de la empresa
-        empresa_nombre = oferta['razon_social'] or 'Empresa'
-        
-        # Preparar datos de la postulación
-        salario_str = None
-        if oferta['salario_min'] and oferta['salario_max']:
-            salario_str = f"${oferta['salario_min']:,.0f} - ${oferta['salario_max']:,.0f}"
-        elif oferta['salario_min']:
-            salario_str = f"Desde ${oferta['salario_min']:,.0f}"
-        
-        # Crear la postulación
-        cursor.execute('''
-            INSERT INTO postulaciones (
-                usuario_id, oferta_id, empresa, puesto, descripcion,
-                estado_actual, salario, ubicacion, tags
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            usuario_id,
-            oferta_id,
-            empresa_nombre,
-            oferta['titulo'],
-            None,  # descripcion puede ser NULL
-            'Registrada',
-            salario_str,
-            oferta['ubicacion'],
-            json.dumps([])  # tags vacío por defecto
-        ))
-        
-        postulacion_id = cursor.lastrowid
-        
-        # Crear registro inicial en historial de estados
-        cursor.execute('''
-            INSERT INTO historial_estados (
-                postulacion_id, estado_anterior, estado_nuevo, usuario_cambio, observaciones
-            ) VALUES (?, ?, ?, ?, ?)
-        ''', (
-            postulacion_id,
-            None,
-            'Registrada',
-            'usuario',
-            'Postulación creada por el usuario'
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        return {
-            "message": "Postulación creada exitosamente",
-            "postulacion_id": postulacion_id,
-            "ya_postulado": False,
-            "oferta_titulo": oferta['titulo'],
-            "empresa": empresa_nombre
-        }
+        return escribir(_registrar_postulacion, usuario_id, oferta_id)
         
     except HTTPException:
         raise
@@ -789,70 +3313,259 @@ def postular_a_oferta(oferta_id: int, postulacion: PostularRequest):
         )
 
 
+def _insertar_oferta(conn: sqlite3.Connection, oferta: OfertaCreate, modalidad: Optional[str],
+                     habilidades_requeridas: Optional[str]) -> int:
+    """Operación de escritura de `crear_oferta` (corre en `db_writer`)."""
+    cursor = conn.cursor()
+
+    # Validar que la empresa existe
+    cursor.execute('SELECT id FROM empresas WHERE id = ?', (oferta.empresa_id,))
+    if not cursor.fetchone():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Empresa no encontrada"
+        )
+
+    # Insertar la oferta
+    cursor.execute('''
+        INSERT INTO ofertas_empleo (
+            empresa_id, titulo, descripcion, funciones, requisitos,
+            habilidades_requeridas, ubicacion, municipio_id, modalidad, tipo_contrato,
+            jornada, salario_min, salario_max, fecha_cierre
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''' , (
+        oferta.empresa_id,
+        oferta.titulo,
+        oferta.descripcion,
+        oferta.funciones,
+        oferta.requisitos,
+        habilidades_requeridas,
+        oferta.ubicacion,
+        nomenclator.resolver(oferta.ubicacion),
+        modalidad,
+        oferta.tipo_contrato,
+        oferta.jornada,
+        oferta.salario_min,
+        oferta.salario_max,
+        oferta.fecha_cierre
+    ))
+    return cursor.lastrowid
+
+
+def normalizar_oferta(oferta: OfertaCreate):
+    """Devuelve (modalidad, habilidades_requeridas) como se guardan en `ofertas_empleo`."""
+    modalidad = oferta.modalidad.lower() if oferta.modalidad else None
+    habilidades_value = oferta.habilidades_requeridas
+    if isinstance(habilidades_value, list):
+        try:
+            habilidades_requeridas = json.dumps(habilidades_value, ensure_ascii=False)
+        except Exception:
+            habilidades_requeridas = None
+    else:
+        habilidades_requeridas = habilidades_value  # ya es str o None
+    return modalidad, habilidades_requeridas
+
+
 @app.post("/api/ofertas")
 def crear_oferta(oferta: OfertaCreate):
     """Crea una nueva oferta de empleo a partir de un JSON en el body."""
     try:
         # Normalizar campos
-        modalidad = oferta.modalidad.lower() if oferta.modalidad else None
-        habilidades_value = oferta.habilidades_requeridas
-        if isinstance(habilidades_value, list):
-            try:
-                habilidades_requeridas = json.dumps(habilidades_value, ensure_ascii=False)
-            except Exception:
-                habilidades_requeridas = None
-        else:
-            habilidades_requeridas = habilidades_value  # ya es str o None
+        modalidad, habilidades_requeridas = normalizar_oferta(oferta)
 
-        # Validar que la empresa existe
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        new_id = escribir(_insertar_oferta, oferta, modalidad, habilidades_requeridas)
 
-        cursor.execute('SELECT id FROM empresas WHERE id = ?', (oferta.empresa_id,))
-        if not cursor.fetchone():
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Empresa no encontrada"
+        return {"message": "Oferta creada exitosamente", "oferta_id": new_id}
+
+    except HTTPException:
+        raise
+    except sqlite3.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear la oferta: {str(e)}"
+        )
+
+
+BULK_MAX_OFERTAS = int(os.getenv("CEO_BULK_MAX_OFERTAS", "10000"))
+# Valores del CHECK de `ofertas_empleo.modalidad`; en el bulk se validan antes de
+# insertar para no tener que repetir el lote fila por fila
+MODALIDADES_OFERTA = {'presencial', 'remoto', 'hibrido'}
+
+SQL_INSERTAR_OFERTA = '''
+    INSERT INTO ofertas_empleo (
+        empresa_id, titulo, descripcion, funciones, requisitos,
+        habilidades_requeridas, ubicacion, municipio_id, modalidad, tipo_contrato,
+        jornada, salario_min, salario_max, fecha_cierre
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+'''
+
+
+def _insertar_ofertas_lote(conn: sqlite3.Connection, filas: List[tuple]) -> Dict[int, Any]:
+    """Operación de escritura de `crear_ofertas_bulk` (corre en `db_writer`).
+
+    `filas` son (indice, valores del INSERT). Comprueba todas las empresas con una
+    consulta e inserta las válidas en la misma transacción; cada id sale del
+    RETURNING de su INSERT. Devuelve, por índice, el id creado o el mensaje de error.
+    """
+    empresas = sorted({valores[0] for _, valores in filas})
+    existentes = set()
+    for i in range(0, len(empresas), 500):
+        trozo = empresas[i:i + 500]
+        existentes.update(
+            row[0] for row in conn.execute(
+                f"SELECT id FROM empresas WHERE id IN ({', '.join('?' * len(trozo))})", trozo
             )
+        )
+    resultados: Dict[int, Any] = {}
+    validas = []
+    for indice, valores in filas:
+        if valores[0] in existentes:
+            validas.append((indice, valores))
+        else:
+            resultados[indice] = "Empresa no encontrada"
+    if not validas:
+        return resultados
+
+    # Primero todas de corrido; si alguna viola una restricción que la validación
+    # previa no cubre, se deshace el intento y se insertan una por una, cada una
+    # con su savepoint, para que solo esa fila quede con error
+    conn.execute("SAVEPOINT lote_ofertas")
+    try:
+        for indice, valores in validas:
+            resultados[indice] = conn.execute(SQL_INSERTAR_OFERTA, valores).fetchone()[0]
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO lote_ofertas")
+        for indice, valores in validas:
+            conn.execute("SAVEPOINT fila_oferta")
+            try:
+                resultados[indice] = conn.execute(SQL_INSERTAR_OFERTA, valores).fetchone()[0]
+            except sqlite3.IntegrityError as e:
+                conn.execute("ROLLBACK TO fila_oferta")
+                resultados[indice] = f"Restricción de la base: {e}"
+            conn.execute("RELEASE fila_oferta")
+    conn.execute("RELEASE lote_ofertas")
+    return resultados
+
+
+def _leer_items_bulk(cuerpo: bytes, ndjson: bool) -> List[Any]:
+    """Lista de items del body; en NDJSON una línea inválida queda como excepción en su lugar."""
+    if ndjson:
+        items = []
+        for linea in cuerpo.splitlines():
+            if not linea.strip():
+                continue
+            try:
+                items.append(json.loads(linea))
+            except ValueError as e:
+                items.append(e)
+        return items
+    try:
+        items = json.loads(cuerpo)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El body no es JSON válido")
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Se esperaba un arreglo JSON de ofertas o NDJSON (una oferta por línea)"
+        )
+    return items
 
-        # Insertar la oferta
-        cursor.execute('''
-            INSERT INTO ofertas_empleo (
-                empresa_id, titulo, descripcion, funciones, requisitos,
-                habilidades_requeridas, ubicacion, modalidad, tipo_contrato,
-                jornada, salario_min, salario_max, fecha_cierre
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''' , (
-            oferta.empresa_id,
-            oferta.titulo,
-            oferta.descripcion,
-            oferta.funciones,
-            oferta.requisitos,
-            habilidades_requeridas,
-            oferta.ubicacion,
-            modalidad,
-            oferta.tipo_contrato,
-            oferta.jornada,
-            oferta.salario_min,
-            oferta.salario_max,
-            oferta.fecha_cierre
-        ))
 
-        new_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+def _crear_ofertas_bulk(items: List[Any]) -> Dict[str, Any]:
+    resultados: List[Dict[str, Any]] = [None] * len(items)
+    filas = []
+    for indice, item in enumerate(items):
+        if isinstance(item, Exception):
+            resultados[indice] = {"indice": indice, "ok": False, "error": f"JSON inválido: {item}"}
+            continue
+        try:
+            oferta = OfertaCreate.model_validate(item)
+        except ValidationError as e:
+            detalle = '; '.join(
+                f"{'.'.join(str(p) for p in err['loc']) or 'oferta'}: {err['msg']}" for err in e.errors()
+            )
+            resultados[indice] = {"indice": indice, "ok": False, "error": detalle}
+            continue
+        modalidad, habilidades_requeridas = normalizar_oferta(oferta)
+        if modalidad is not None and modalidad not in MODALIDADES_OFERTA:
+            resultados[indice] = {
+                "indice": indice, "ok": False,
+                "error": f"modalidad: debe ser {', '.join(sorted(MODALIDADES_OFERTA))}"
+            }
+            continue
+        if habilidades_requeridas is not None and not isinstance(habilidades_requeridas, str):
+            resultados[indice] = {
+                "indice": indice, "ok": False,
+                "error": "habilidades_requeridas: debe ser una lista o un texto"
+            }
+            continue
+        filas.append((indice, (
+            oferta.empresa_id, oferta.titulo, oferta.descripcion, oferta.funciones,
+            oferta.requisitos, habilidades_requeridas, oferta.ubicacion,
+            nomenclator.resolver(oferta.ubicacion), modalidad,
+            oferta.tipo_contrato, oferta.jornada, oferta.salario_min, oferta.salario_max,
+            oferta.fecha_cierre
+        )))
+
+    if filas:
+        for indice, valor in escribir(_insertar_ofertas_lote, filas).items():
+            if isinstance(valor, int):
+                resultados[indice] = {"indice": indice, "ok": True, "oferta_id": valor}
+            else:
+                resultados[indice] = {"indice": indice, "ok": False, "error": valor}
+
+    creadas = sum(1 for r in resultados if r["ok"])
+    return {
+        "total": len(resultados),
+        "creadas": creadas,
+        "fallidas": len(resultados) - creadas,
+        "resultados": resultados
+    }
 
-        return {"message": "Oferta creada exitosamente", "oferta_id": new_id}
 
+@app.post("/api/ofertas/bulk")
+async def crear_ofertas_bulk(request: Request):
+    """
+    Crea muchas ofertas en una sola transacción. El body es un arreglo JSON de
+    ofertas (mismo formato que `POST /api/ofertas`) o, con Content-Type
+    `application/x-ndjson`, una oferta por línea. Los items inválidos no frenan
+    a los demás: `resultados` trae, por índice, el `oferta_id` creado o el error.
+    """
+    tipo = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    items = _leer_items_bulk(await request.body(), tipo in ('application/x-ndjson', 'application/ndjson'))
+    if len(items) > BULK_MAX_OFERTAS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {BULK_MAX_OFERTAS} ofertas por petición"
+        )
+    try:
+        # Validar e insertar fuera del event loop: `escribir` bloquea hasta el COMMIT
+        return await run_in_threadpool(_crear_ofertas_bulk, items)
     except HTTPException:
         raise
     except sqlite3.Error as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al crear la oferta: {str(e)}"
+            detail=f"Error al crear las ofertas: {str(e)}"
+        )
+
+
+def _actualizar_oferta(conn: sqlite3.Connection, oferta_id: int, campos_actualizar: List[str], valores: List[Any]) -> None:
+    """Operación de escritura de `actualizar_oferta` (corre en `db_writer`)."""
+    cursor = conn.cursor()
+
+    # Verificar que la oferta existe
+    cursor.execute('SELECT id FROM ofertas_empleo WHERE id = ?', (oferta_id,))
+    if not cursor.fetchone():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Oferta no encontrada"
         )
 
+    query = f"UPDATE ofertas_empleo SET {', '.join(campos_actualizar)} WHERE id = ?"
+    cursor.execute(query, [*valores, oferta_id])
+
 
 @app.put("/api/ofertas/{oferta_id}")
 def actualizar_oferta(
@@ -875,18 +3588,6 @@ def actualizar_oferta(
     Actualiza una oferta de empleo existente
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Verificar que la oferta existe
-        cursor.execute('SELECT id FROM ofertas_empleo WHERE id = ?', (oferta_id,))
-        if not cursor.fetchone():
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Oferta no encontrada"
-            )
-        
         # Construir query de actualización dinámicamente
         campos_actualizar = []
         valores = []
@@ -909,6 +3610,8 @@ def actualizar_oferta(
         if ubicacion is not None:
             campos_actualizar.append('ubicacion = ?')
             valores.append(ubicacion)
+            campos_actualizar.append('municipio_id = ?')
+            valores.append(nomenclator.resolver(ubicacion))
         if modalidad is not None:
             campos_actualizar.append('modalidad = ?')
             valores.append(modalidad.lower())
@@ -932,7 +3635,6 @@ def actualizar_oferta(
             valores.append(1 if activa else 0)
         
         if not campos_actualizar:
-            conn.close()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No se proporcionaron campos para actualizar"
@@ -941,13 +3643,8 @@ def actualizar_oferta(
         # Agregar fecha de actualización
         campos_actualizar.append('fecha_actualizacion = CURRENT_TIMESTAMP')
         
-        valores.append(oferta_id)
-        
-        query = f"UPDATE ofertas_empleo SET {', '.join(campos_actualizar)} WHERE id = ?"
-        cursor.execute(query, valores)
-        
-        conn.commit()
-        conn.close()
+        escribir(_actualizar_oferta, oferta_id, campos_actualizar, valores)
+        cache_entidades.invalidar('oferta', oferta_id)
         
         return {
             "message": "Oferta actualizada exitosamente",
@@ -963,28 +3660,29 @@ def actualizar_oferta(
         )
 
 
+def _desactivar_oferta(conn: sqlite3.Connection, oferta_id: int) -> None:
+    """Operación de escritura de `eliminar_oferta` (corre en `db_writer`)."""
+    cursor = conn.cursor()
+    
+    cursor.execute('SELECT id FROM ofertas_empleo WHERE id = ?', (oferta_id,))
+    if not cursor.fetchone():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Oferta no encontrada"
+        )
+    
+    # Soft delete: marcar como inactiva
+    cursor.execute('UPDATE ofertas_empleo SET activa = 0 WHERE id = ?', (oferta_id,))
+
+
 @app.delete("/api/ofertas/{oferta_id}")
 def eliminar_oferta(oferta_id: int):
     """
     Desactiva una oferta de empleo (soft delete)
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id FROM ofertas_empleo WHERE id = ?', (oferta_id,))
-        if not cursor.fetchone():
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Oferta no encontrada"
-            )
-        
-        # Soft delete: marcar como inactiva
-        cursor.execute('UPDATE ofertas_empleo SET activa = 0 WHERE id = ?', (oferta_id,))
-        
-        conn.commit()
-        conn.close()
+        escribir(_desactivar_oferta, oferta_id)
+        cache_entidades.invalidar('oferta', oferta_id)
         
         return {
             "message": "Oferta eliminada exitosamente",
@@ -1015,6 +3713,165 @@ import hashlib
 def hash_password_sha256(text):
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
+
+# Sesión firmada: la cookie `ceo_session` lleva id, email, nombre, tipo_usuario
+# y expiración, firmados con HMAC-SHA256. Se verifica en memoria, sin consultar
+# `usuarios`, y cualquier worker con las mismas claves la acepta.
+SESION_COOKIE = "ceo_session"
+SESION_TTL = int(os.getenv("CEO_SESSION_TTL", str(8 * 3600)))  # segundos
+SESION_COOKIE_SECURE = os.getenv("CEO_SESSION_COOKIE_SECURE", "0") == "1"
+# Transición: hasta `CEO_SESSION_LEGACY_UNTIL` (fecha ISO, por defecto
+# SESION_LEGADO_DEFECTO) la cookie `user_id` sin firmar que escribían las
+# versiones anteriores de login.js se acepta (con una consulta) y se canjea por
+# una firmada, para no cerrar las sesiones abiertas al desplegar. Cualquiera
+# puede escribir esa cookie: con la variable vacía deja de aceptarse ya.
+SESION_LEGADO_DEFECTO = "2026-12-31"
+
+
+def _fecha_limite(valor: Optional[str]) -> Optional[float]:
+    if not valor:
+        return None
+    limite = datetime.fromisoformat(valor)
+    if limite.tzinfo is None:
+        limite = limite.replace(tzinfo=timezone.utc)
+    return limite.timestamp()
+
+
+SESION_LEGADO_HASTA = _fecha_limite(os.getenv("CEO_SESSION_LEGACY_UNTIL", SESION_LEGADO_DEFECTO))
+
+
+def cargar_claves_sesion(valor: Optional[str]) -> List[tuple]:
+    """Lee `CEO_SESSION_KEYS` ("kid:secreto,kid2:secreto2").
+
+    Firma la primera y verifican todas, así que para rotar se antepone la
+    nueva y se retira la vieja cuando hayan expirado sus sesiones.
+    """
+    claves = []
+    for item in (valor or '').split(','):
+        kid, separador, secreto = item.strip().partition(':')
+        if kid and separador and secreto and '.' not in kid:
+            claves.append((kid, secreto.encode('utf-8')))
+    return claves
+
+
+SESION_CLAVES = cargar_claves_sesion(os.getenv("CEO_SESSION_KEYS"))
+if not SESION_CLAVES:
+    # Sirve con un único proceso: con varios, cada worker tendría su propia
+    # clave y rechazaría las sesiones firmadas por los demás. Además las
+    # sesiones no sobreviven a un reinicio
+    if os.getenv("CEO_SESSION_EPHEMERAL_KEY") != "1":
+        logger.warning(
+            "CEO_SESSION_KEYS no está definida: se firman las sesiones con una clave "
+            "temporal de este proceso. Con varios workers o nodos defínala "
+            "(\"kid:secreto,...\"); CEO_SESSION_EPHEMERAL_KEY=1 omite este aviso."
+        )
+    SESION_CLAVES = [('efimera', secrets.token_bytes(32))]
+
+
+def _firma_sesion(secreto: bytes, mensaje: str) -> str:
+    digest = hmac.new(secreto, mensaje.encode('ascii'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def firmar_sesion(usuario: Dict[str, Any]) -> str:
+    """Token `kid.payload.firma` para `usuario` (id, email, nombre, tipo_usuario)."""
+    kid, secreto = SESION_CLAVES[0]
+    datos = {
+        'id': usuario['id'],
+        'email': usuario['email'],
+        'nombre': usuario['nombre'],
+        'tipo_usuario': usuario['tipo_usuario'],
+        'exp': int(time.time()) + SESION_TTL,
+    }
+    crudo = json.dumps(datos, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    payload = base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+    return f"{kid}.{payload}.{_firma_sesion(secreto, f'{kid}.{payload}')}"
+
+
+def verificar_sesion(token: str) -> Optional[Dict[str, Any]]:
+    """Devuelve el usuario del token si la firma es válida y no expiró; si no, None."""
+    partes = token.split('.')
+    if len(partes) != 3:
+        return None
+    kid, payload, firma = partes
+    secreto = next((s for k, s in SESION_CLAVES if k == kid), None)
+    if secreto is None or not hmac.compare_digest(firma, _firma_sesion(secreto, f'{kid}.{payload}')):
+        return None
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        if int(datos.pop('exp')) <= time.time():
+            return None
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return datos
+
+
+def emitir_cookie_sesion(response: Response, usuario: Dict[str, Any]) -> None:
+    response.set_cookie(
+        SESION_COOKIE, firmar_sesion(usuario), max_age=SESION_TTL, path='/',
+        httponly=True, samesite='lax', secure=SESION_COOKIE_SECURE
+    )
+
+
+def _buscar_usuario_sesion(conn: sqlite3.Connection, uid: int) -> Optional[Dict[str, Any]]:
+    row = conn.execute('SELECT id, email, nombre, tipo_usuario FROM usuarios WHERE id = ?', (uid,)).fetchone()
+    return dict(row) if row else None
+
+
+def usuario_de_sesion(request: Request, response: Response) -> Optional[Dict[str, Any]]:
+    """Usuario autenticado según las cookies, o None si no hay sesión.
+
+    Con la cookie firmada no se toca la base. Con la de legado (solo hasta
+    `SESION_LEGADO_HASTA`) se valida contra `usuarios` (HTTPException 400 si no
+    es un id, 404 si no existe) y se emite la firmada en `response`.
+    """
+    token = request.cookies.get(SESION_COOKIE)
+    if token:
+        usuario = verificar_sesion(token)
+        if usuario is not None:
+            return usuario
+    legado = SESION_LEGADO_HASTA is not None and time.time() < SESION_LEGADO_HASTA
+    user_id = request.cookies.get('user_id') if legado else None
+    if not user_id:
+        return None
+    try:
+        uid = int(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='user_id inválido')
+    try:
+        usuario = _ejecutar_con_conexion(_buscar_usuario_sesion, (uid,))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not usuario:
+        raise HTTPException(status_code=404, detail='Usuario no encontrado')
+    emitir_cookie_sesion(response, usuario)
+    return usuario
+
+
+def _dueno_empresa(conn: sqlite3.Connection, empresa_id: int):
+    return conn.execute('SELECT usuario_id FROM empresas WHERE id = ?', (empresa_id,)).fetchone()
+
+
+def empresa_de_sesion(request: Request, response: Response, empresa_id: int) -> Dict[str, Any]:
+    """Usuario de la sesión, si es el dueño de la empresa `empresa_id`.
+
+    HTTPException 401 si no hay sesión, 404 si la empresa no existe y 403 si
+    pertenece a otro usuario. Toma una conexión del pool solo para la consulta.
+    """
+    usuario = usuario_de_sesion(request, response)
+    if usuario is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='No autenticado')
+    try:
+        fila = _ejecutar_con_conexion(_dueno_empresa, (empresa_id,))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    if not fila:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa no encontrada")
+    if fila['usuario_id'] != usuario['id']:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="La sesión no corresponde a esta empresa")
+    return usuario
+
+
 @app.post("/api/validar-login")
 async def validar_login(request: Request):
     body = await request.json()
@@ -1023,12 +3880,7 @@ async def validar_login(request: Request):
     if not email or len(password) < 8:
         return JSONResponse({"ok": False, "message": "Email y contraseña requeridos."}, status_code=400)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM usuarios WHERE LOWER(email)=LOWER(?)', (email,))
-        user = cursor.fetchone()
-        conn.close()
+        user = await ejecutar_en_db(buscar_usuario_por_email, email)
         if not user:
             return JSONResponse({"ok": False, "message": "Usuario no encontrado."}, status_code=404)
         # Comparar directamente con la columna 'password' (los datos de ejemplo guardan texto plano)
@@ -1040,36 +3892,63 @@ async def validar_login(request: Request):
             "nombre": user['nombre'],
             "email": user['email']
         }
-        return {"ok": True, "session": session}
+        respuesta = JSONResponse({"ok": True, "session": session})
+        emitir_cookie_sesion(respuesta, dict(user))
+        return respuesta
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse({"ok": False, "message": f"Error: {e}"}, status_code=500)
 
+# Campos de `/api/postulaciones`; el historial sale de una segunda consulta
+CAMPOS_POSTULACION = {
+    'id': ('p.id', None),
+    'usuario_id': ('p.usuario_id', None),
+    'oferta_id': ('p.oferta_id', None),
+    'empresa': ('p.empresa', None),
+    'puesto': ('p.puesto', None),
+    'descripcion': ('p.descripcion', None),
+    'estado_actual': ('p.estado_actual', None),
+    'fecha_creacion': ('p.fecha_creacion', None),
+    'fecha_actualizacion': ('p.fecha_actualizacion', None),
+    'salario': ('p.salario', None),
+    'ubicacion': ('p.ubicacion', None),
+    'tags': ('p.tags', _lista_json),
+    'historial': (None, None),
+}
+
+
+SQL_POSTULACIONES_USUARIO = '''
+    SELECT {columnas} FROM postulaciones p
+    WHERE p.usuario_id = ?
+    ORDER BY p.fecha_creacion_ts DESC, p.id DESC
+'''
+
+SQL_HISTORIAL_POSTULACIONES = '''
+    SELECT h.* FROM historial_estados h
+    WHERE h.postulacion_id IN ({ids})
+    ORDER BY h.fecha_cambio_ts DESC, h.id DESC
+'''
+
+
 @app.get("/api/postulaciones")
-def listar_postulaciones(usuario_id: Optional[int] = 1):
-    """Lista las postulaciones de un usuario (por ahora usuario_id genérico=1 si no se envía)."""
+def listar_postulaciones(usuario_id: Optional[int] = 1, fields: Optional[str] = None,
+                         conn: sqlite3.Connection = Depends(get_db)):
+    """Lista las postulaciones de un usuario (por ahora usuario_id genérico=1 si no se envía).
+    `fields` limita los campos devueltos (ver `CAMPOS_POSTULACION`)."""
+    campos = campos_solicitados(fields, CAMPOS_POSTULACION, 'postulaciones')
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT p.* FROM postulaciones p
-            WHERE p.usuario_id = ?
-            ORDER BY p.fecha_creacion DESC
-        ''', (usuario_id,))
+        cursor.execute(SQL_POSTULACIONES_USUARIO.format(columnas=select_campos(CAMPOS_POSTULACION, campos)), (usuario_id,))
 
         filas = cursor.fetchall()
 
         # Traer historial para todas las postulaciones en un solo query
         ids = [row['id'] for row in filas]
         historial_por_postulacion = {pid: [] for pid in ids}
-        if ids:
-            qmarks = ','.join('?' for _ in ids)
-            cursor.execute(f'''
-                SELECT h.* FROM historial_estados h
-                WHERE h.postulacion_id IN ({qmarks})
-                ORDER BY datetime(h.fecha_cambio) DESC
-            ''', ids)
+        if ids and 'historial' in campos:
+            cursor.execute(SQL_HISTORIAL_POSTULACIONES.format(ids=','.join('?' for _ in ids)), ids)
             for h in cursor.fetchall():
                 historial_por_postulacion[h['postulacion_id']].append({
                     'id': h['id'],
@@ -1082,23 +3961,11 @@ def listar_postulaciones(usuario_id: Optional[int] = 1):
 
         postulaciones = []
         for row in filas:
-            postulaciones.append({
-                'id': row['id'],
-                'usuario_id': row['usuario_id'],
-                'oferta_id': row['oferta_id'],
-                'empresa': row['empresa'],
-                'puesto': row['puesto'],
-                'descripcion': row['descripcion'],
-                'estado_actual': row['estado_actual'],
-                'fecha_creacion': row['fecha_creacion'],
-                'fecha_actualizacion': row['fecha_actualizacion'],
-                'salario': row['salario'],
-                'ubicacion': row['ubicacion'],
-                'tags': json.loads(row['tags']) if row['tags'] else [],
-                'historial': historial_por_postulacion.get(row['id'], [])
-            })
+            postulacion = proyectar_fila(CAMPOS_POSTULACION, campos, row)
+            if 'historial' in campos:
+                postulacion['historial'] = historial_por_postulacion.get(row['id'], [])
+            postulaciones.append(postulacion)
 
-        conn.close()
         return {"postulaciones": postulaciones, "total": len(postulaciones)}
 
     except sqlite3.Error as e:
@@ -1106,11 +3973,9 @@ def listar_postulaciones(usuario_id: Optional[int] = 1):
 
 
 @app.get('/api/postulaciones/usuario/{user_id}')
-def listar_postulaciones_por_usuario(user_id: int):
+def listar_postulaciones_por_usuario(user_id: int, conn: sqlite3.Connection = Depends(get_db)):
     """Devuelve las postulaciones de un usuario por su id"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -1119,7 +3984,7 @@ def listar_postulaciones_por_usuario(user_id: int):
             FROM postulaciones p
             LEFT JOIN ofertas_empleo o ON p.oferta_id = o.id
             WHERE p.usuario_id = ?
-            ORDER BY p.fecha_creacion DESC
+            ORDER BY p.fecha_creacion_ts DESC, p.id DESC
         ''', (user_id,))
 
         filas = cursor.fetchall()
@@ -1139,57 +4004,28 @@ def listar_postulaciones_por_usuario(user_id: int):
                 'tags': json.loads(row['tags']) if row['tags'] else []
             })
 
-        conn.close()
         return { 'postulaciones': postulaciones, 'total': len(postulaciones) }
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get('/api/user/profile')
-def api_user_profile(request: Request):
-    """Devuelve un perfil simplificado del usuario a partir de la cookie `user_id`."""
-    user_id = request.cookies.get('user_id')
-    if not user_id:
-        raise HTTPException(status_code=401, detail='No autenticado')
-    try:
-        uid = int(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail='user_id inválido')
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, email, nombre, tipo_usuario FROM usuarios WHERE id = ?', (uid,))
-        row = cursor.fetchone()
-        conn.close()
-        if not row:
-            raise HTTPException(status_code=404, detail='Usuario no encontrado')
-        return dict(row)
-    except sqlite3.Error as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
+@app.get('/api/user/profile')
+def api_user_profile(request: Request, response: Response):
+    """Devuelve un perfil simplificado del usuario a partir de la cookie de sesión."""
+    usuario = usuario_de_sesion(request, response)
+    if usuario is None:
+        raise HTTPException(status_code=401, detail='No autenticado')
+    return usuario
+
 
 @app.get('/api/user/type')
-def api_user_type(request: Request):
-    """Devuelve solo el tipo de usuario (tipo_usuario) usando cookie user_id."""
-    user_id = request.cookies.get('user_id')
-    if not user_id:
-        return {"userType": None}
-    try:
-        uid = int(user_id)
-    except Exception:
-        return {"userType": None}
+def api_user_type(request: Request, response: Response):
+    """Devuelve solo el tipo de usuario (tipo_usuario) usando la cookie de sesión."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT tipo_usuario FROM usuarios WHERE id = ?', (uid,))
-        row = cursor.fetchone()
-        conn.close()
-        if not row:
-            return {"userType": None}
-        return {"userType": row[0]}
-    except sqlite3.Error:
+        usuario = usuario_de_sesion(request, response)
+    except HTTPException:
         return {"userType": None}
+    return {"userType": usuario['tipo_usuario'] if usuario else None}
 
 
 @app.get('/api/dashboard/{userType}')
@@ -1240,81 +4076,138 @@ def api_jobseeker_dashboard():
     return api_dashboard('buscador')
 
 
-@app.get("/api/postulaciones/empresa/{empresa_id}")
-def listar_postulaciones_empresa(empresa_id: int):
+ESTADOS_POSTULACION = {'Registrada', 'En progreso', 'Aprobada', 'Rechazada', 'Cancelada'}
+
+POSTULACIONES_PAGINA_DEFECTO = 50
+POSTULACIONES_PAGINA_MAX = 200
+
+
+def fecha_a_epoch(valor: str, parametro: str, fin_de_dia: bool = False) -> int:
+    """Convierte 'YYYY-MM-DD' o 'YYYY-MM-DDTHH:MM[:SS]' (UTC, como CURRENT_TIMESTAMP) a epoch.
+
+    Con `fin_de_dia`, una fecha sin hora cubre el día completo.
+    """
+    try:
+        fecha = datetime.fromisoformat(valor.strip())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Fecha inválida en {parametro}: use YYYY-MM-DD"
+        )
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    epoch = int(fecha.timestamp())
+    if fin_de_dia and len(valor.strip()) == 10:
+        epoch += 86400 - 1
+    return epoch
+
+
+def filtros_postulaciones_empresa(empresa_id: int, estado: Optional[str], oferta_id: Optional[int],
+                                  desde: Optional[str], hasta: Optional[str],
+                                  cursor_pagina: Optional[str]):
+    """Condiciones SQL (sobre el alias `p`) y parámetros de los listados de aspirantes.
+
+    Todas parten de `p.empresa_id`, así que `idx_postulaciones_empresa*` resuelve
+    el filtro y el orden (fecha_creacion_ts DESC, id DESC) sin ordenar en memoria.
+    """
+    condiciones = ["p.empresa_id = :empresa_id"]
+    params: Dict[str, Any] = {'empresa_id': empresa_id}
+    if estado:
+        if estado not in ESTADOS_POSTULACION:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Estado no permitido")
+        condiciones.append("p.estado_actual = :estado")
+        params['estado'] = estado
+    if oferta_id:
+        condiciones.append("p.oferta_id = :oferta_id")
+        params['oferta_id'] = oferta_id
+    if desde:
+        condiciones.append("p.fecha_creacion_ts >= :desde")
+        params['desde'] = fecha_a_epoch(desde, 'desde')
+    if hasta:
+        condiciones.append("p.fecha_creacion_ts <= :hasta")
+        params['hasta'] = fecha_a_epoch(hasta, 'hasta', fin_de_dia=True)
+    if cursor_pagina:
+        condiciones.append("(p.fecha_creacion_ts, p.id) < (:cursor_ts, :cursor_id)")
+        params['cursor_ts'], params['cursor_id'] = decodificar_cursor(cursor_pagina, 2)
+    return condiciones, params
+
+
+# Campos de `/api/postulaciones/empresa/{empresa_id}`, en el orden de la respuesta
+CAMPOS_POSTULACION_EMPRESA = {
+    'id': ('p.id', None),
+    'usuario_id': ('p.usuario_id', None),
+    'usuario_nombre': ('u.nombre', None),
+    'usuario_email': ('u.email', None),
+    'oferta_id': ('p.oferta_id', None),
+    'oferta_titulo': ('o.titulo', None),
+    'oferta_descripcion': ('o.descripcion', None),
+    'oferta_modalidad': ('o.modalidad', None),
+    'oferta_tipo_contrato': ('o.tipo_contrato', None),
+    'empresa': ('p.empresa', None),
+    'puesto': ('p.puesto', None),
+    'descripcion': ('p.descripcion', None),
+    'estado_actual': ('p.estado_actual', None),
+    'fecha_creacion': ('p.fecha_creacion', None),
+    'fecha_actualizacion': ('p.fecha_actualizacion', None),
+    'salario': ('p.salario', None),
+    'ubicacion': ('p.ubicacion', None),
+    'tags': ('p.tags', _lista_json),
+}
+
+
+SQL_POSTULACIONES_EMPRESA_PAGINA = '''
+    SELECT {columnas}, p.fecha_creacion_ts
+    FROM postulaciones p
+    INNER JOIN ofertas_empleo o ON p.oferta_id = o.id
+    INNER JOIN usuarios u ON p.usuario_id = u.id
+    WHERE {condiciones}
+    ORDER BY p.fecha_creacion_ts DESC, p.id DESC
+    LIMIT :limite
+'''
+
+
+@app.get("/api/postulaciones/empresa/{empresa_id}", response_class=RespuestaJSON)
+def listar_postulaciones_empresa(
+    empresa_id: int,
+    estado: Optional[str] = None,
+    oferta_id: Optional[int] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    limit: int = POSTULACIONES_PAGINA_DEFECTO,
+    cursor_pagina: Optional[str] = Query(None, alias="cursor"),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     """
-    Lista todas las postulaciones a las ofertas de empleo de una empresa específica.
+    Lista las postulaciones a las ofertas de empleo de una empresa específica,
+    de la más reciente a la más antigua, paginadas por cursor.
     Incluye información del usuario postulante y de la oferta.
     """
+    limite = min(max(limit, 1), POSTULACIONES_PAGINA_MAX)
+    condiciones, params = filtros_postulaciones_empresa(empresa_id, estado, oferta_id, desde, hasta, cursor_pagina)
+    params['limite'] = limite + 1
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
         # Verificar que la empresa existe
         cursor.execute('SELECT id FROM empresas WHERE id = ?', (empresa_id,))
         if not cursor.fetchone():
-            conn.close()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Empresa no encontrada"
             )
 
-        # Obtener todas las postulaciones a las ofertas de esta empresa
-        cursor.execute('''
-            SELECT 
-                p.id,
-                p.usuario_id,
-                p.oferta_id,
-                p.empresa,
-                p.puesto,
-                p.descripcion,
-                p.estado_actual,
-                p.fecha_creacion,
-                p.fecha_actualizacion,
-                p.salario,
-                p.ubicacion,
-                p.tags,
-                u.nombre AS usuario_nombre,
-                u.email AS usuario_email,
-                o.titulo AS oferta_titulo,
-                o.descripcion AS oferta_descripcion,
-                o.modalidad AS oferta_modalidad,
-                o.tipo_contrato AS oferta_tipo_contrato
-            FROM postulaciones p
-            INNER JOIN ofertas_empleo o ON p.oferta_id = o.id
-            INNER JOIN usuarios u ON p.usuario_id = u.id
-            WHERE o.empresa_id = ?
-            ORDER BY p.fecha_creacion DESC
-        ''', (empresa_id,))
-
-        filas = cursor.fetchall()
+        # Obtener una página de las postulaciones a las ofertas de esta empresa
+        campos = list(CAMPOS_POSTULACION_EMPRESA)
+        cursor.execute(SQL_POSTULACIONES_EMPRESA_PAGINA.format(
+            columnas=select_campos(CAMPOS_POSTULACION_EMPRESA, campos),
+            condiciones=' AND '.join(condiciones)
+        ), params)
 
-        postulaciones = []
-        for row in filas:
-            postulaciones.append({
-                'id': row['id'],
-                'usuario_id': row['usuario_id'],
-                'usuario_nombre': row['usuario_nombre'],
-                'usuario_email': row['usuario_email'],
-                'oferta_id': row['oferta_id'],
-                'oferta_titulo': row['oferta_titulo'],
-                'oferta_descripcion': row['oferta_descripcion'],
-                'oferta_modalidad': row['oferta_modalidad'],
-                'oferta_tipo_contrato': row['oferta_tipo_contrato'],
-                'empresa': row['empresa'],
-                'puesto': row['puesto'],
-                'descripcion': row['descripcion'],
-                'estado_actual': row['estado_actual'],
-                'fecha_creacion': row['fecha_creacion'],
-                'fecha_actualizacion': row['fecha_actualizacion'],
-                'salario': row['salario'],
-                'ubicacion': row['ubicacion'],
-                'tags': json.loads(row['tags']) if row['tags'] else []
-            })
+        filas, siguiente = cortar_pagina(cursor, limite, 'fecha_creacion_ts', 'id')
+        codificar = codificador_filas(CAMPOS_POSTULACION_EMPRESA, campos, cursor.description)
+        postulaciones = [codificar(row) for row in filas]
 
-        conn.close()
-        return {"postulaciones": postulaciones, "total": len(postulaciones)}
+        return json_listado('postulaciones', postulaciones, total=len(postulaciones), siguiente_cursor=siguiente)
 
     except HTTPException:
         raise
@@ -1325,6 +4218,195 @@ def listar_postulaciones_empresa(empresa_id: int):
         )
 
 
+EXPORT_LOTE = int(os.getenv("CEO_EXPORT_LOTE", "500"))  # filas por fetchmany
+# Exportaciones simultáneas: cada una abre su propia conexión fuera del pool
+EXPORT_CONCURRENTES = int(os.getenv("CEO_EXPORT_CONCURRENTES", "2"))
+EXPORT_REINTENTO_S = 30  # Retry-After cuando no hay cupo
+
+exportaciones_en_curso = threading.BoundedSemaphore(max(1, EXPORT_CONCURRENTES))
+
+# Un texto que empieza así se interpreta como fórmula al abrir el CSV en una
+# hoja de cálculo; se antepone un apóstrofo para que quede como texto.
+CSV_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def celda_csv(valor):
+    """Valor listo para una celda CSV, neutralizando las fórmulas (ver `CSV_INICIO_FORMULA`)."""
+    if isinstance(valor, str) and valor.startswith(CSV_INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+FORMATOS_EXPORT = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def acepta_gzip(accept_encoding: str) -> bool:
+    """True si el Accept-Encoding del cliente admite gzip (y no con q=0)."""
+    for item in accept_encoding.split(','):
+        nombre, _, parametros = item.partition(';')
+        if nombre.strip().lower() == 'gzip':
+            try:
+                return float(parametros.strip().lower().removeprefix('q=') or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def _lineas_export(sql: str, params: Dict[str, Any], formato: str, al_terminar):
+    """Genera el export por lotes de `EXPORT_LOTE` filas, con memoria constante.
+
+    Usa su propia conexión de solo lectura (no ocupa un hueco del pool mientras
+    el cliente descarga) y la cierra al terminar o al cerrarse el generador
+    (`RespuestaExport` lo cierra si el cliente se desconecta); en ese momento
+    llama a `al_terminar()` (libera el cupo de exportación).
+    """
+    campos = list(CAMPOS_POSTULACION_EMPRESA)
+    try:
+        conn = db_pool.conexion_aparte()
+    except BaseException:
+        al_terminar()
+        raise
+    try:
+        cursor = conn.execute(sql, params)
+        if formato == 'ndjson':
+            codificar = codificador_filas(CAMPOS_POSTULACION_EMPRESA, campos, cursor.description)
+        else:
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer, lineterminator='\n')
+            escritor.writerow(campos)
+            yield buffer.getvalue()
+        while True:
+            filas = cursor.fetchmany(EXPORT_LOTE)
+            if not filas:
+                break
+            if formato == 'ndjson':
+                yield ''.join([codificar(row) + '\n' for row in filas])
+            else:
+                buffer.seek(0)
+                buffer.truncate()
+                escritor.writerows(
+                    [[celda_csv(row[c]) if c != 'tags' else row[c] or '[]' for c in campos] for row in filas]
+                )
+                yield buffer.getvalue()
+    finally:
+        conn.close()
+        al_terminar()
+
+
+class ExportEnCurso:
+    """Iterador sobre `_lineas_export` que se puede cerrar desde otro hilo.
+
+    StreamingResponse pide cada parte en el threadpool; si el cliente se
+    desconecta, `close()` espera a que termine la parte en curso y cierra el
+    generador, que devuelve la conexión y el cupo en su `finally`.
+    """
+
+    def __init__(self, lineas):
+        self._lineas = lineas
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._lock:
+            return next(self._lineas)
+
+    def close(self) -> None:
+        with self._lock:
+            self._lineas.close()
+
+
+class RespuestaExport(StreamingResponse):
+    """StreamingResponse que siempre llama a `cerrar()` al terminar, también si el
+    cliente cortó la descarga (sin esperar a que el recolector cierre el generador)."""
+
+    def __init__(self, contenido, cerrar, **kwargs):
+        super().__init__(contenido, **kwargs)
+        self._cerrar = cerrar
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(self._cerrar)
+
+
+def _comprimir_gzip(partes):
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: formato gzip
+    for parte in partes:
+        comprimido = compresor.compress(parte.encode('utf-8'))
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+@app.get("/api/empresa/{empresa_id}/postulaciones/export")
+def exportar_postulaciones_empresa(
+    empresa_id: int,
+    request: Request,
+    response: Response,
+    format: str = 'ndjson',
+    estado: Optional[str] = None,
+    oferta_id: Optional[int] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None
+):
+    """
+    Descarga todas las postulaciones a las ofertas de una empresa como NDJSON
+    (una postulación por línea, mismos campos que `/api/postulaciones/empresa/{id}`)
+    o CSV. Acepta los mismos filtros que el listado. Se envía en streaming y
+    comprimido con gzip si el cliente lo admite. Solo para la sesión de la
+    propia empresa; con `EXPORT_CONCURRENTES` exportaciones en curso responde 503.
+    """
+    if format not in FORMATOS_EXPORT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato no soportado: {format}. Use {' o '.join(FORMATOS_EXPORT)}"
+        )
+    condiciones, params = filtros_postulaciones_empresa(empresa_id, estado, oferta_id, desde, hasta, None)
+    empresa_de_sesion(request, response, empresa_id)
+
+    sql = f'''
+        SELECT {select_campos(CAMPOS_POSTULACION_EMPRESA, list(CAMPOS_POSTULACION_EMPRESA))}
+        FROM postulaciones p
+        INNER JOIN ofertas_empleo o ON p.oferta_id = o.id
+        INNER JOIN usuarios u ON p.usuario_id = u.id
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY p.fecha_creacion_ts DESC, p.id DESC
+    '''
+    if not exportaciones_en_curso.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Hay demasiadas exportaciones en curso, intenta de nuevo en un momento",
+            headers={"Retry-After": str(EXPORT_REINTENTO_S)}
+        )
+    lineas = ExportEnCurso(_lineas_export(sql, params, format, exportaciones_en_curso.release))
+    try:
+        # Arranca la consulta aquí: un error llega como 500 en vez de cortar la
+        # descarga, y el generador ya iniciado libera el cupo aunque se descarte
+        primera = next(lineas, '')
+    except sqlite3.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al exportar postulaciones: {str(e)}"
+        )
+    cuerpo = itertools.chain([primera], lineas)
+    cabeceras = {
+        "Content-Disposition": f'attachment; filename="postulaciones_empresa_{empresa_id}.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if acepta_gzip(request.headers.get('accept-encoding', '')):
+        cuerpo = _comprimir_gzip(cuerpo)
+        cabeceras["Content-Encoding"] = "gzip"
+    else:
+        cuerpo = (parte.encode('utf-8') for parte in cuerpo)
+    return RespuestaExport(cuerpo, lineas.close, media_type=FORMATOS_EXPORT[format], headers=cabeceras)
+
+
 class PostulacionRequest(BaseModel):
     usuario_id: int
     oferta_id: int
@@ -1345,113 +4427,7 @@ def crear_postulacion(postulacion: PostulacionRequest):
                 detail="Se requiere usuario_id para postularse a la oferta"
             )
         
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Verificar que el usuario existe y es un buscador
-        cursor.execute('SELECT id, tipo_usuario FROM usuarios WHERE id = ?', (usuario_id,))
-        usuario = cursor.fetchone()
-        
-        if not usuario:
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Usuario no encontrado"
-            )
-        
-        if usuario['tipo_usuario'] != 'buscador':
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Solo los usuarios (buscadores de empleo) pueden postularse a ofertas"
-            )
-        
-        # Verificar que la oferta existe y está activa
-        cursor.execute('''
-            SELECT o.id, o.titulo, o.empresa_id, o.ubicacion, o.salario_min, o.salario_max, e.razon_social
-            FROM ofertas_empleo o
-            LEFT JOIN empresas e ON o.empresa_id = e.id
-            WHERE o.id = ? AND o.activa = 1
-        ''', (oferta_id,))
-        oferta = cursor.fetchone()
-        
-        if not oferta:
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Oferta no encontrada o no está disponible"
-            )
-        
-        # Verificar si ya está postulado
-        cursor.execute('''
-            SELECT id FROM postulaciones 
-            WHERE usuario_id = ? AND oferta_id = ?
-        ''', (usuario_id, oferta_id))
-        postulacion_existente = cursor.fetchone()
-        
-        if postulacion_existente:
-            conn.close()
-            return {
-                "message": "Ya estás postulado a esta oferta",
-                "postulacion_id": postulacion_existente['id'],
-                "ya_postulado": True,
-                "oferta_titulo": oferta['titulo']
-            }
-        
-        # Obtener información de la empresa
-        empresa_nombre = oferta['razon_social'] or 'Empresa'
-        
-        # Preparar datos de la postulación
-        salario_str = None
-        if oferta['salario_min'] and oferta['salario_max']:
-            salario_str = f"${oferta['salario_min']:,.0f} - ${oferta['salario_max']:,.0f}"
-        elif oferta['salario_min']:
-            salario_str = f"Desde ${oferta['salario_min']:,.0f}"
-        
-        # Crear la postulación
-        cursor.execute('''
-            INSERT INTO postulaciones (
-                usuario_id, oferta_id, empresa, puesto, descripcion,
-                estado_actual, salario, ubicacion, tags
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            usuario_id,
-            oferta_id,
-            empresa_nombre,
-            oferta['titulo'],
-            None,  # descripcion puede ser NULL
-            'Registrada',
-            salario_str,
-            oferta['ubicacion'],
-            json.dumps([])  # tags vacío por defecto
-        ))
-        
-        postulacion_id = cursor.lastrowid
-        
-        # Crear registro inicial en historial de estados
-        cursor.execute('''
-            INSERT INTO historial_estados (
-                postulacion_id, estado_anterior, estado_nuevo, usuario_cambio, observaciones
-            ) VALUES (?, ?, ?, ?, ?)
-        ''', (
-            postulacion_id,
-            None,
-            'Registrada',
-            'usuario',
-            'Postulación creada por el usuario'
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        return {
-            "message": "Postulación creada exitosamente",
-            "postulacion_id": postulacion_id,
-            "ya_postulado": False,
-            "oferta_titulo": oferta['titulo'],
-            "empresa": empresa_nombre
-        }
+        return escribir(_registrar_postulacion, usuario_id, oferta_id)
         
     except HTTPException:
         raise
@@ -1462,143 +4438,517 @@ def crear_postulacion(postulacion: PostulacionRequest):
         )
 
 
-@app.post("/api/postulaciones/{postulacion_id}/cambiar-estado")
-def cambiar_estado_postulacion(postulacion_id: int, req: CambioEstadoRequest):
-    """Cambia el estado de una postulación y registra el historial."""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+# Transiciones que acepta el cambio de estado por lote; Rechazada y Cancelada son finales
+TRANSICIONES_POSTULACION = {
+    'Registrada': {'En progreso', 'Aprobada', 'Rechazada', 'Cancelada'},
+    'En progreso': {'Aprobada', 'Rechazada', 'Cancelada'},
+    'Aprobada': {'Rechazada', 'Cancelada'},
+    'Rechazada': set(),
+    'Cancelada': set(),
+}
 
-        # Validar existencia y estado actual
-        cursor.execute('SELECT estado_actual FROM postulaciones WHERE id = ?', (postulacion_id,))
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
-            raise HTTPException(status_code=404, detail="Postulación no encontrada")
 
-        estado_anterior = row['estado_actual']
+def transicion_permitida(actual: str, nuevo: str) -> bool:
+    """True si `TRANSICIONES_POSTULACION` permite pasar de `actual` a `nuevo`.
+
+    Un estado actual fuera de la tabla (datos anteriores) admite cualquier estado válido.
+    """
+    return nuevo in TRANSICIONES_POSTULACION.get(actual, ESTADOS_POSTULACION)
+
+
+def _cambiar_estado(conn: sqlite3.Connection, postulacion_id: int, nuevo_estado: str,
+                    usuario_id: int, observaciones: Optional[str]) -> None:
+    """Operación de escritura de `cambiar_estado_postulacion` (corre en `db_writer`).
+
+    Puede cambiar el estado el dueño de la empresa de la oferta; el aspirante
+    solo puede cancelar su propia postulación (403 en otro caso). El historial
+    registra quién fue según la sesión.
+    """
+    cursor = conn.cursor()
+
+    # Validar existencia, estado actual y a quién pertenece
+    cursor.execute('''
+        SELECT p.estado_actual, p.usuario_id, e.usuario_id AS dueno_empresa
+        FROM postulaciones p
+        LEFT JOIN empresas e ON e.id = p.empresa_id
+        WHERE p.id = ?
+    ''', (postulacion_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Postulación no encontrada")
+    if row['dueno_empresa'] == usuario_id:
+        usuario = 'empresa'
+    elif row['usuario_id'] == usuario_id and nuevo_estado == 'Cancelada':
+        usuario = 'usuario'
+    else:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado para esta postulación")
+
+    estado_anterior = row['estado_actual']
+
+    # Actualizar postulación
+    cursor.execute('''
+        UPDATE postulaciones
+        SET estado_actual = ?, fecha_actualizacion = CURRENT_TIMESTAMP
+        WHERE id = ?
+    ''', (nuevo_estado, postulacion_id))
+
+    # Insertar historial
+    cursor.execute('''
+        INSERT INTO historial_estados (postulacion_id, estado_anterior, estado_nuevo, usuario_cambio, observaciones)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (postulacion_id, estado_anterior, nuevo_estado, usuario, observaciones))
+
+
+@app.post("/api/postulaciones/{postulacion_id}/cambiar-estado")
+def cambiar_estado_postulacion(postulacion_id: int, req: CambioEstadoRequest, request: Request, response: Response):
+    """Cambia el estado de una postulación y registra el historial.
+
+    Requiere sesión (401 si no hay): la empresa de la oferta o, para
+    cancelarla, el propio aspirante.
+    """
+    usuario = usuario_de_sesion(request, response)
+    if usuario is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='No autenticado')
+    try:
         nuevo_estado = req.nuevo_estado
 
         # Validar nuevo estado permitido
-        permitidos = {'Registrada', 'En progreso', 'Aprobada', 'Rechazada', 'Cancelada'}
-        if nuevo_estado not in permitidos:
-            conn.close()
+        if nuevo_estado not in ESTADOS_POSTULACION:
             raise HTTPException(status_code=400, detail="Estado no permitido")
 
-        # Actualizar postulación
-        cursor.execute('''
+        escribir(_cambiar_estado, postulacion_id, nuevo_estado, usuario['id'], req.observaciones)
+
+        return {"message": "Estado actualizado", "postulacion_id": postulacion_id, "nuevo_estado": nuevo_estado}
+
+    except HTTPException:
+        raise
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Error al cambiar estado: {e}")
+
+
+@app.put('/api/postulaciones/{postulacion_id}/estado')
+def actualizar_estado_postulacion(postulacion_id: int, req: CambioEstadoRequest, request: Request, response: Response):
+    """Alias más RESTful para actualizar el estado de una postulación."""
+    # Reusar la lógica del endpoint existente
+    return cambiar_estado_postulacion(postulacion_id, req, request, response)
+
+
+LOTE_MAX_CAMBIOS = int(os.getenv("CEO_LOTE_MAX_CAMBIOS", "1000"))
+
+
+class CambioEstadoItem(BaseModel):
+    postulacion_id: int
+    nuevo_estado: str
+    observaciones: Optional[str] = None
+
+
+class CambioEstadoLoteRequest(BaseModel):
+    cambios: List[CambioEstadoItem]
+
+
+def _cambiar_estados_lote(conn: sqlite3.Connection, empresa_id: int,
+                          cambios: List[CambioEstadoItem], usuario: str) -> List[Dict[str, Any]]:
+    """Operación de escritura de `cambiar_estados_empresa` (corre en `db_writer`).
+
+    Lee los estados actuales con una consulta por cada 500 ids, valida cada
+    transición en orden (un id repetido parte del estado que dejó el cambio
+    anterior) y aplica los UPDATE y los INSERT de historial con executemany.
+    """
+    ids = sorted({c.postulacion_id for c in cambios})
+    estados: Dict[int, str] = {}
+    for i in range(0, len(ids), 500):
+        trozo = ids[i:i + 500]
+        for row in conn.execute(
+            f"SELECT id, estado_actual FROM postulaciones "
+            f"WHERE empresa_id = ? AND id IN ({', '.join('?' * len(trozo))})",
+            [empresa_id, *trozo]
+        ):
+            estados[row['id']] = row['estado_actual']
+
+    resultados = []
+    actualizaciones = []
+    historial = []
+    for indice, cambio in enumerate(cambios):
+        resultado = {"indice": indice, "postulacion_id": cambio.postulacion_id}
+        actual = estados.get(cambio.postulacion_id)
+        if actual is None:
+            resultado.update(ok=False, error="Postulación no encontrada")
+        elif cambio.nuevo_estado not in ESTADOS_POSTULACION:
+            resultado.update(ok=False, error="Estado no permitido")
+        elif cambio.nuevo_estado == actual:
+            resultado.update(ok=True, cambiado=False, estado=actual)
+        elif not transicion_permitida(actual, cambio.nuevo_estado):
+            resultado.update(ok=False, error=f"Transición no permitida: {actual} -> {cambio.nuevo_estado}")
+        else:
+            estados[cambio.postulacion_id] = cambio.nuevo_estado
+            actualizaciones.append((cambio.nuevo_estado, cambio.postulacion_id))
+            historial.append((cambio.postulacion_id, actual, cambio.nuevo_estado, usuario, cambio.observaciones))
+            resultado.update(ok=True, cambiado=True, estado_anterior=actual, estado=cambio.nuevo_estado)
+        resultados.append(resultado)
+
+    if actualizaciones:
+        conn.executemany('''
             UPDATE postulaciones
             SET estado_actual = ?, fecha_actualizacion = CURRENT_TIMESTAMP
             WHERE id = ?
-        ''', (nuevo_estado, postulacion_id))
-
-        # Insertar historial
-        cursor.execute('''
+        ''', actualizaciones)
+        conn.executemany('''
             INSERT INTO historial_estados (postulacion_id, estado_anterior, estado_nuevo, usuario_cambio, observaciones)
             VALUES (?, ?, ?, ?, ?)
-        ''', (postulacion_id, estado_anterior, nuevo_estado, req.usuario or 'usuario', req.observaciones))
+        ''', historial)
+    return resultados
 
-        conn.commit()
-        conn.close()
 
-        return {"message": "Estado actualizado", "postulacion_id": postulacion_id, "nuevo_estado": nuevo_estado}
+@app.post('/api/empresa/{empresa_id}/postulaciones/estado')
+def cambiar_estados_empresa(empresa_id: int, req: CambioEstadoLoteRequest, request: Request, response: Response):
+    """Cambia el estado de varias postulaciones de la empresa en una sola transacción.
+
+    Requiere la sesión de la propia empresa (ver `empresa_de_sesion`). Cada
+    cambio se valida por separado (existencia, pertenencia a la empresa y
+    `TRANSICIONES_POSTULACION`); los rechazados no impiden aplicar los demás.
+    """
+    empresa_de_sesion(request, response, empresa_id)
+    if len(req.cambios) > LOTE_MAX_CAMBIOS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo {LOTE_MAX_CAMBIOS} cambios por petición"
+        )
+    if not req.cambios:
+        return {"total": 0, "aplicados": 0, "fallidos": 0, "resultados": []}
+    try:
+        resultados = escribir(_cambiar_estados_lote, empresa_id, req.cambios, 'empresa')
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Error al cambiar estados: {e}")
+    aplicados = sum(1 for r in resultados if r.get('cambiado'))
+    fallidos = sum(1 for r in resultados if not r['ok'])
+    return {"total": len(resultados), "aplicados": aplicados, "fallidos": fallidos, "resultados": resultados}
+
+
+SQL_ASPIRANTES_EMPRESA = '''
+    SELECT u.id as usuario_id, u.nombre, u.email, o.titulo as puesto_aplicado,
+           p.fecha_creacion as fecha_postulacion, p.estado_actual as estado, p.id as postulacion_id,
+           p.fecha_creacion_ts
+    FROM postulaciones p
+    JOIN usuarios u ON p.usuario_id = u.id
+    JOIN ofertas_empleo o ON p.oferta_id = o.id
+    WHERE {condiciones}
+    ORDER BY p.fecha_creacion_ts DESC, p.id DESC
+    LIMIT :limite
+'''
+
+
+@app.get('/api/empresa/{empresa_id}/aspirantes')
+def obtener_aspirantes_empresa(
+    empresa_id: int,
+    estado: Optional[str] = None,
+    oferta_id: Optional[int] = None,
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+    limit: Optional[int] = 0,
+    cursor_pagina: Optional[str] = Query(None, alias="cursor"),
+    conn: sqlite3.Connection = Depends(get_db)
+):
+    """Devuelve los aspirantes que aplicaron a las ofertas de la empresa, paginados por cursor.
+    Si no hay postulaciones, devuelve lista vacía (frontend mostrará datos de muestra).
+    """
+    limite = min(int(limit), POSTULACIONES_PAGINA_MAX) if limit and int(limit) > 0 else POSTULACIONES_PAGINA_DEFECTO
+    condiciones, params = filtros_postulaciones_empresa(empresa_id, estado, oferta_id, desde, hasta, cursor_pagina)
+    params['limite'] = limite + 1
+    try:
+        cursor = conn.cursor()
+
+        # Verificar existencia de empresa
+        cursor.execute('SELECT id, razon_social FROM empresas WHERE id = ?', (empresa_id,))
+        empresa = cursor.fetchone()
+        if not empresa:
+            raise HTTPException(status_code=404, detail='Empresa no encontrada')
+
+        cursor.execute(SQL_ASPIRANTES_EMPRESA.format(condiciones=' AND '.join(condiciones)), params)
+        rows, siguiente = cortar_pagina(cursor, limite, 'fecha_creacion_ts', 'postulacion_id')
+        aspirantes = []
+        for r in rows:
+            # Intentar separar nombre en nombres/apellidos si es posible
+            nombres = r['nombre'] or ''
+            partes = nombres.split(' ', 1)
+            apellido = partes[1] if len(partes) > 1 else ''
+            primer_nombre = partes[0] if len(partes) > 0 else ''
+            aspirantes.append({
+                'postulacion_id': r['postulacion_id'],
+                'usuario_id': r['usuario_id'],
+                'nombres': primer_nombre,
+                'apellidos': apellido,
+                'email': r['email'],
+                'puesto_aplicado': r['puesto_aplicado'],
+                'fecha_postulacion': r['fecha_postulacion'],
+                'estado': r['estado']
+            })
+
+        return {'aspirantes': aspirantes, 'total': len(aspirantes), 'siguiente_cursor': siguiente}
 
     except HTTPException:
         raise
     except sqlite3.Error as e:
-        raise HTTPException(status_code=500, detail=f"Error al cambiar estado: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.put('/api/postulaciones/{postulacion_id}/estado')
-def actualizar_estado_postulacion(postulacion_id: int, req: CambioEstadoRequest):
-    """Alias más RESTful para actualizar el estado de una postulación."""
-    # Reusar la lógica del endpoint existente
-    return cambiar_estado_postulacion(postulacion_id, req)
+# Pesos del puntaje de afinidad de una postulación (suman 1)
+AFINIDAD_PESO_HABILIDADES = 0.6
+AFINIDAD_PESO_EXPERIENCIA = 0.25
+AFINIDAD_PESO_UBICACION = 0.15
+
+_ANIOS_EXPERIENCIA = re.compile(r'(\d+)\s*anos?\b')
+
+
+def _palabras(texto: str) -> str:
+    """Texto normalizado entre espacios y con un espacio por separador, para
+    buscar una habilidad como palabra completa: `_palabras(h) in _palabras(texto)`."""
+    return f" {_SEPARADORES.sub(' ', normalizar_texto(texto)).strip()} "
+
+
+def _anios(texto: str) -> int:
+    return max((int(n) for n in _ANIOS_EXPERIENCIA.findall(normalizar_texto(texto))), default=0)
+
+
+def puntuar_postulacion(oferta, perfil) -> tuple:
+    """(puntaje 0..1, habilidades requeridas que cumple) de un perfil frente a una oferta.
+
+    Una habilidad cuenta si está en `perfil.habilidades` o se menciona en
+    `experiencia_laboral`. La experiencia compara los años del perfil con los
+    que pida `requisitos` (1 si no dice). La ubicación suma si coincide o la
+    oferta es remota.
+    """
+    if perfil is None:
+        return 0.0, []
+    requeridas = habilidades_normalizadas(oferta['habilidades_requeridas'])
+    propias = habilidades_normalizadas(perfil['habilidades'])
+    experiencia = _palabras(perfil['experiencia_laboral'])
+    coincidencias = sorted(h for h in requeridas if h in propias or _palabras(h) in experiencia)
+
+    puntaje = AFINIDAD_PESO_HABILIDADES * (len(coincidencias) / len(requeridas) if requeridas else 0.0)
+    anios_pedidos = _anios(oferta['requisitos']) or 1
+    puntaje += AFINIDAD_PESO_EXPERIENCIA * min(_anios(perfil['experiencia_laboral']) / anios_pedidos, 1.0)
+    ubicacion = normalizar_texto(perfil['ubicacion'])
+    if (oferta['modalidad'] or '').lower() == 'remoto' or (ubicacion and ubicacion in normalizar_texto(oferta['ubicacion'])):
+        puntaje += AFINIDAD_PESO_UBICACION
+    return round(puntaje, 4), coincidencias
+
+
+def _guardar_puntajes(conn: sqlite3.Connection, filas: List[tuple]) -> None:
+    # Solo si nadie las marcó pendientes otra vez mientras se calculaban
+    conn.executemany(
+        'UPDATE puntajes_postulacion SET puntaje = ?, coincidencias = ? WHERE postulacion_id = ? AND version = ?',
+        filas
+    )
+
+
+# Tope de puntajes que calcula la propia petición del ranking; el resto lo
+# completa `completar_puntajes` después de responder (p. ej. tras un bulk)
+RANKING_PUNTAJES_POR_PETICION = int(os.getenv("CEO_RANKING_PUNTAJES_POR_PETICION", "200"))
+_puntajes_en_curso = set()
+_puntajes_en_curso_lock = threading.Lock()
+
+
+def _leer_pendientes(conn: sqlite3.Connection, empresa_id: int, oferta_id: int,
+                     limite: int, desde: int = 0):
+    """Oferta de la empresa y lo necesario para puntuar hasta `limite` postulaciones
+    pendientes con id mayor que `desde`: (oferta, pendientes, perfiles, hay_mas).
+
+    Devuelve None si la oferta no es de la empresa.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        'SELECT titulo, habilidades_requeridas, requisitos, ubicacion, modalidad FROM ofertas_empleo WHERE id = ? AND empresa_id = ?',
+        (oferta_id, empresa_id)
+    )
+    oferta = cursor.fetchone()
+    if not oferta:
+        return None
+    cursor.execute('''
+        SELECT s.postulacion_id, s.version, p.usuario_id
+        FROM puntajes_postulacion s
+        JOIN postulaciones p ON p.id = s.postulacion_id
+        WHERE s.oferta_id = ? AND s.puntaje IS NULL AND s.postulacion_id > ?
+        ORDER BY s.postulacion_id
+        LIMIT ?
+    ''', (oferta_id, desde, limite + 1))
+    pendientes = cursor.fetchall()
+    hay_mas = len(pendientes) > limite
+    pendientes = pendientes[:limite]
+    if not pendientes:
+        return oferta, [], {}, False
+    # Si un usuario tiene varios perfiles vale el primero, como en el resto de la API
+    cursor.execute('''
+        SELECT usuario_id, habilidades, experiencia_laboral, ubicacion
+        FROM perfiles_buscadores
+        WHERE id IN (
+            SELECT MIN(id) FROM perfiles_buscadores
+            WHERE usuario_id IN (SELECT value FROM json_each(?))
+            GROUP BY usuario_id
+        )
+    ''', (json.dumps(sorted({row['usuario_id'] for row in pendientes})),))
+    return oferta, pendientes, {row['usuario_id']: row for row in cursor.fetchall()}, hay_mas
+
+
+def calcular_puntajes_pendientes(oferta, pendientes: list, perfiles: dict) -> int:
+    """Calcula y guarda los puntajes pendientes de una oferta; devuelve cuántos.
+
+    Se llama sin conexión de lectura tomada: el cálculo y la espera al
+    escritor no deben ocupar un hueco del pool.
+    """
+    if not pendientes:
+        return 0
+    filas = []
+    for row in pendientes:
+        puntaje, coincidencias = puntuar_postulacion(oferta, perfiles.get(row['usuario_id']))
+        filas.append((puntaje, json.dumps(coincidencias, ensure_ascii=False), row['postulacion_id'], row['version']))
+    escribir(_guardar_puntajes, filas)
+    return len(filas)
+
+
+def completar_puntajes(empresa_id: int, oferta_id: int) -> None:
+    """Calcula, por lotes y fuera de la petición, los puntajes que quedaron pendientes.
 
+    Recorre las pendientes una vez en orden de id; las que vuelvan a quedar
+    pendientes mientras tanto las toma la próxima consulta del ranking.
+    """
+    with _puntajes_en_curso_lock:
+        if oferta_id in _puntajes_en_curso:
+            return
+        _puntajes_en_curso.add(oferta_id)
+    try:
+        desde, hay_mas = 0, True
+        while hay_mas:
+            leido = _ejecutar_con_conexion(
+                _leer_pendientes, (empresa_id, oferta_id, RANKING_PUNTAJES_POR_PETICION, desde)
+            )
+            if leido is None:
+                return
+            oferta, pendientes, perfiles, hay_mas = leido
+            if not pendientes:
+                return
+            calcular_puntajes_pendientes(oferta, pendientes, perfiles)
+            desde = pendientes[-1]['postulacion_id']
+    except (HTTPException, sqlite3.Error):
+        pass  # queda pendiente; la próxima consulta del ranking lo vuelve a intentar
+    finally:
+        with _puntajes_en_curso_lock:
+            _puntajes_en_curso.discard(oferta_id)
+
+
+# Los puntajes van de 0 a 1; en el cursor, -1 marca que ya se está en la cola
+# de postulaciones aún sin puntaje (NULL va al final con ORDER BY ... DESC)
+PUNTAJE_CURSOR_PENDIENTE = -1
+
+
+def _pagina_ranking(conn: sqlite3.Connection, condiciones: List[str], params: dict, limite: int):
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT s.postulacion_id, s.puntaje, COALESCE(s.puntaje, {PUNTAJE_CURSOR_PENDIENTE}) as orden,
+               s.coincidencias, u.id as usuario_id, u.nombre, u.email,
+               p.fecha_creacion as fecha_postulacion, p.estado_actual as estado
+        FROM puntajes_postulacion s
+        JOIN postulaciones p ON p.id = s.postulacion_id
+        JOIN usuarios u ON p.usuario_id = u.id
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY s.puntaje DESC, s.postulacion_id DESC
+        LIMIT :limite
+    ''', params)
+    return cortar_pagina(cursor, limite, 'orden', 'postulacion_id')
+
+
+@app.get('/api/empresa/{empresa_id}/ofertas/{oferta_id}/ranking')
+def ranking_aspirantes_oferta(
+    empresa_id: int,
+    oferta_id: int,
+    tareas: BackgroundTasks,
+    estado: Optional[str] = None,
+    limit: Optional[int] = 0,
+    cursor_pagina: Optional[str] = Query(None, alias="cursor")
+):
+    """Aspirantes de una oferta ordenados por afinidad con ella, paginados por cursor.
 
-@app.get('/api/empresa/{empresa_id}/aspirantes')
-def obtener_aspirantes_empresa(empresa_id: int, limit: Optional[int] = 0):
-    """Devuelve los aspirantes que aplicaron a las ofertas de la empresa.
-    Si no hay postulaciones, devuelve lista vacía (frontend mostrará datos de muestra).
+    Los puntajes viven en `puntajes_postulacion`; antes de listar se calculan
+    los que quedaron pendientes desde la última vez, hasta
+    `RANKING_PUNTAJES_POR_PETICION`. Si hay más (`puntajes_pendientes`) se
+    completan después de responder. Las postulaciones sin puntaje salen al final.
     """
+    limite = min(int(limit), POSTULACIONES_PAGINA_MAX) if limit and int(limit) > 0 else POSTULACIONES_PAGINA_DEFECTO
+    condiciones, params = filtros_postulaciones_empresa(empresa_id, estado, None, None, None, None)
+    condiciones.insert(0, "s.oferta_id = :oferta_id")
+    params.update(oferta_id=oferta_id, limite=limite + 1)
+    if cursor_pagina:
+        params['cursor_puntaje'], params['cursor_id'] = decodificar_cursor(cursor_pagina, 2)
+        if params['cursor_puntaje'] < 0:
+            condiciones.append("s.puntaje IS NULL AND s.postulacion_id < :cursor_id")
+        else:
+            condiciones.append(
+                "(s.puntaje IS NULL OR (s.puntaje, s.postulacion_id) < (:cursor_puntaje, :cursor_id))"
+            )
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        leido = _ejecutar_con_conexion(_leer_pendientes, (empresa_id, oferta_id, RANKING_PUNTAJES_POR_PETICION))
+        if leido is None:
+            raise HTTPException(status_code=404, detail='Oferta no encontrada')
+        oferta, pendientes, perfiles, hay_mas = leido
 
-        # Verificar existencia de empresa
-        cursor.execute('SELECT id, razon_social FROM empresas WHERE id = ?', (empresa_id,))
-        empresa = cursor.fetchone()
-        if not empresa:
-            conn.close()
-            raise HTTPException(status_code=404, detail='Empresa no encontrada')
+        calculados = calcular_puntajes_pendientes(oferta, pendientes, perfiles)
+        if hay_mas:
+            tareas.add_task(completar_puntajes, empresa_id, oferta_id)
 
-        q = '''
-            SELECT u.id as usuario_id, u.nombre, u.email, o.titulo as puesto_aplicado,
-                   p.fecha_creacion as fecha_postulacion, p.estado_actual as estado, p.id as postulacion_id
-            FROM postulaciones p
-            JOIN usuarios u ON p.usuario_id = u.id
-            JOIN ofertas_empleo o ON p.oferta_id = o.id
-            WHERE o.empresa_id = ?
-            ORDER BY p.fecha_creacion DESC
-        '''
-        params = (empresa_id,)
-        if limit and int(limit) > 0:
-            q = q + '\nLIMIT ?'
-            params = (empresa_id, int(limit))
-
-        cursor.execute(q, params)
-        rows = cursor.fetchall()
+        rows, siguiente = _ejecutar_con_conexion(_pagina_ranking, (condiciones, params, limite))
         aspirantes = []
         for r in rows:
-            # Intentar separar nombre en nombres/apellidos si es posible
-            nombres = r['nombre'] or ''
-            partes = nombres.split(' ', 1)
-            apellido = partes[1] if len(partes) > 1 else ''
-            primer_nombre = partes[0] if len(partes) > 0 else ''
+            partes = (r['nombre'] or '').split(' ', 1)
             aspirantes.append({
                 'postulacion_id': r['postulacion_id'],
                 'usuario_id': r['usuario_id'],
-                'nombres': primer_nombre,
-                'apellidos': apellido,
+                'nombres': partes[0],
+                'apellidos': partes[1] if len(partes) > 1 else '',
                 'email': r['email'],
-                'puesto_aplicado': r['puesto_aplicado'],
+                'puesto_aplicado': oferta['titulo'],
                 'fecha_postulacion': r['fecha_postulacion'],
-                'estado': r['estado']
+                'estado': r['estado'],
+                'puntaje': r['puntaje'],
+                'habilidades_coincidentes': _lista_json(r['coincidencias'])
             })
 
-        conn.close()
-        return {'aspirantes': aspirantes, 'total': len(aspirantes)}
+        return {
+            'aspirantes': aspirantes,
+            'total': len(aspirantes),
+            'siguiente_cursor': siguiente,
+            'recalculados': calculados,
+            'puntajes_pendientes': hay_mas
+        }
 
+    except HTTPException:
+        raise
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+SQL_OFERTAS_EMPRESA = '''
+    SELECT o.id, o.titulo, o.descripcion, o.activa, o.fecha_publicacion,
+           COUNT(p.id) as postulantes
+    FROM ofertas_empleo o
+    LEFT JOIN postulaciones p ON o.id = p.oferta_id
+    WHERE o.empresa_id = ?
+    GROUP BY o.id
+    ORDER BY o.fecha_publicacion_ts DESC, o.id DESC
+'''
+
+
 @app.get('/api/empresa/{empresa_id}/ofertas')
-def obtener_ofertas_empresa(empresa_id: int):
+def obtener_ofertas_empresa(empresa_id: int, conn: sqlite3.Connection = Depends(get_db)):
     """Devuelve las ofertas de una empresa junto con el número de postulantes por oferta."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
         # Verificar existencia de empresa
         cursor.execute('SELECT id, razon_social FROM empresas WHERE id = ?', (empresa_id,))
         empresa = cursor.fetchone()
         if not empresa:
-            conn.close()
             raise HTTPException(status_code=404, detail='Empresa no encontrada')
 
-        cursor.execute('''
-            SELECT o.id, o.titulo, o.descripcion, o.activa, o.fecha_publicacion,
-                   COUNT(p.id) as postulantes
-            FROM ofertas_empleo o
-            LEFT JOIN postulaciones p ON o.id = p.oferta_id
-            WHERE o.empresa_id = ?
-            GROUP BY o.id
-            ORDER BY o.fecha_publicacion DESC
-        ''', (empresa_id,))
+        cursor.execute(SQL_OFERTAS_EMPRESA, (empresa_id,))
 
         ofertas = []
         for row in cursor.fetchall():
@@ -1611,7 +4961,6 @@ def obtener_ofertas_empresa(empresa_id: int):
                 'postulantes': int(row['postulantes'])
             })
 
-        conn.close()
         return {'ofertas': ofertas, 'total': len(ofertas)}
 
     except sqlite3.Error as e:
@@ -1631,142 +4980,173 @@ def obtener_ofertas_empresa(empresa_id: int):
 
 
 
-@app.get("/api/perfiles/{usuario_id}")
-async def obtener_perfil(usuario_id: int):
-    """
-    Obtiene el perfil completo de un usuario, incluyendo:
-    - datos del perfil (perfiles_buscadores)
-    - insignias asociadas
-    - inscripciones a cursos (con información básica del curso)
+# Campos de `/api/perfiles/{usuario_id}`; insignias, inscripciones y
+# postulaciones son consultas aparte que solo se ejecutan si se piden.
+CAMPOS_PERFIL = {
+    'usuario_id': ('u.id', None),
+    'nombre': ('u.nombre', None),
+    'email': ('u.email', None),
+    'tipo_usuario': ('u.tipo_usuario', None),
+    'identidad_genero': ('p.identidad_genero', None),
+    'condicion_discapacidad': ('p.condicion_discapacidad', None),
+    'informacion_academica': ('p.informacion_academica', None),
+    'experiencia_laboral': ('p.experiencia_laboral', None),
+    # Parsear habilidades si vienen como JSON string
+    'habilidades': ('p.habilidades', _lista_json),
+    'telefono': ('p.telefono', None),
+    'ubicacion': ('p.ubicacion', None),
+    'insignias': (None, None),
+    'inscripciones': (None, None),
+    'postulaciones': (None, None),
+}
 
-    Devuelve un único objeto JSON con las propiedades agrupadas.
-    """
+
+# Consultas de `obtener_perfil`
+SQL_PERFIL_USUARIO = '''
+    SELECT {columnas}
+    FROM usuarios u
+    LEFT JOIN perfiles_buscadores p ON u.id = p.usuario_id
+    WHERE u.id = ?
+'''
+
+SQL_PERFIL_INSIGNIAS = '''
+    SELECT id, curso_id, nombre, descripcion, fecha_obtencion, codigo_verificacion, imagen_url
+    FROM insignias
+    WHERE usuario_id = ?
+    ORDER BY fecha_obtencion_ts DESC, id DESC
+'''
+
+SQL_PERFIL_INSCRIPCIONES = '''
+    SELECT ic.id as inscripcion_id, ic.curso_id, ic.fecha_inscripcion, ic.progreso, ic.estado, ic.fecha_completado, ic.puntaje_test,
+           c.titulo AS curso_titulo, c.descripcion AS curso_descripcion
+    FROM inscripciones_cursos ic
+    LEFT JOIN cursos c ON ic.curso_id = c.id
+    WHERE ic.usuario_id = ?
+    ORDER BY ic.fecha_inscripcion_ts DESC, ic.id DESC
+'''
+
+SQL_PERFIL_POSTULACIONES = '''
+    SELECT p.id as postulacion_id, p.oferta_id, p.empresa, p.puesto, p.descripcion,
+           p.estado_actual, p.fecha_creacion, p.fecha_actualizacion, p.salario, p.ubicacion, p.tags,
+           o.titulo AS oferta_titulo, o.descripcion AS oferta_descripcion, o.modalidad, o.tipo_contrato
+    FROM postulaciones p
+    LEFT JOIN ofertas_empleo o ON p.oferta_id = o.id
+    WHERE p.usuario_id = ?
+    ORDER BY p.fecha_creacion_ts DESC, p.id DESC
+'''
+
+
+def _cargar_perfil_buscador(conn: sqlite3.Connection, usuario_id: int, campos: Optional[List[str]] = None):
+    """Consultas de `obtener_perfil`; se ejecuta en el executor de base de datos."""
+    if campos is None:
+        campos = list(CAMPOS_PERFIL)
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
         # 1) Datos básicos del usuario + perfil buscador
-        cursor.execute('''
-            SELECT u.id AS usuario_id, u.nombre, u.email, u.tipo_usuario,
-                   p.identidad_genero, p.condicion_discapacidad, p.informacion_academica,
-                   p.experiencia_laboral, p.habilidades, p.telefono, p.ubicacion
-            FROM usuarios u
-            LEFT JOIN perfiles_buscadores p ON u.id = p.usuario_id
-            WHERE u.id = ?
-        ''', (usuario_id,))
+        cursor.execute(SQL_PERFIL_USUARIO.format(columnas=select_campos(CAMPOS_PERFIL, campos)), (usuario_id,))
 
         row = cursor.fetchone()
         if not row:
-            conn.close()
             raise HTTPException(status_code=404, detail="Perfil no encontrado")
 
-        perfil_data = dict(row)
-
-        # Parsear habilidades si vienen como JSON string
-        habilidades = perfil_data.get('habilidades')
-        try:
-            if habilidades and isinstance(habilidades, str):
-                perfil_data['habilidades'] = json.loads(habilidades)
-            elif not habilidades:
-                perfil_data['habilidades'] = []
-        except Exception:
-            perfil_data['habilidades'] = []
-
-        # 2) Insignias del usuario (puede haber varias)
-        cursor.execute('''
-            SELECT id, curso_id, nombre, descripcion, fecha_obtencion, codigo_verificacion, imagen_url
-            FROM insignias
-            WHERE usuario_id = ?
-            ORDER BY fecha_obtencion DESC
-        ''', (usuario_id,))
-        insignias = []
-        for i in cursor.fetchall():
-            insignias.append({
-                'id': i['id'],
-                'curso_id': i['curso_id'],
-                'nombre': i['nombre'],
-                'descripcion': i['descripcion'],
-                'fecha_obtencion': i['fecha_obtencion'],
-                'codigo_verificacion': i['codigo_verificacion'],
-                'imagen_url': i['imagen_url']
-            })
-        perfil_data['insignias'] = insignias
-
-        # 3) Inscripciones a cursos (unir con la tabla cursos para mostrar título)
-        cursor.execute('''
-            SELECT ic.id as inscripcion_id, ic.curso_id, ic.fecha_inscripcion, ic.progreso, ic.estado, ic.fecha_completado, ic.puntaje_test,
-                   c.titulo AS curso_titulo, c.descripcion AS curso_descripcion
-            FROM inscripciones_cursos ic
-            LEFT JOIN cursos c ON ic.curso_id = c.id
-            WHERE ic.usuario_id = ?
-            ORDER BY ic.fecha_inscripcion DESC
-        ''', (usuario_id,))
-        inscripciones = []
-        for ic in cursor.fetchall():
-            inscripciones.append({
-                'id': ic['inscripcion_id'],
-                'curso_id': ic['curso_id'],
-                'curso_titulo': ic['curso_titulo'],
-                'curso_descripcion': ic['curso_descripcion'],
-                'fecha_inscripcion': ic['fecha_inscripcion'],
-                'progreso': ic['progreso'],
-                'estado': ic['estado'],
-                'fecha_completado': ic['fecha_completado'],
-                'puntaje_test': ic['puntaje_test']
-            })
-        perfil_data['inscripciones'] = inscripciones
+        perfil_data = proyectar_fila(CAMPOS_PERFIL, campos, row)
 
-        # 4) Postulaciones a ofertas de empleo (unir con la tabla ofertas_empleo para mostrar información)
-        cursor.execute('''
-            SELECT p.id as postulacion_id, p.oferta_id, p.empresa, p.puesto, p.descripcion, 
-                   p.estado_actual, p.fecha_creacion, p.fecha_actualizacion, p.salario, p.ubicacion, p.tags,
-                   o.titulo AS oferta_titulo, o.descripcion AS oferta_descripcion, o.modalidad, o.tipo_contrato
-            FROM postulaciones p
-            LEFT JOIN ofertas_empleo o ON p.oferta_id = o.id
-            WHERE p.usuario_id = ?
-            ORDER BY p.fecha_creacion DESC
-        ''', (usuario_id,))
-        postulaciones = []
-        for p in cursor.fetchall():
-            postulaciones.append({
-                'id': p['postulacion_id'],
-                'oferta_id': p['oferta_id'],
-                'empresa': p['empresa'],
-                'puesto': p['puesto'],
-                'descripcion': p['descripcion'],
-                'estado_actual': p['estado_actual'],
-                'fecha_creacion': p['fecha_creacion'],
-                'fecha_actualizacion': p['fecha_actualizacion'],
-                'salario': p['salario'],
-                'ubicacion': p['ubicacion'],
-                'tags': json.loads(p['tags']) if p['tags'] else [],
-                'oferta_titulo': p['oferta_titulo'],
-                'oferta_descripcion': p['oferta_descripcion'],
-                'modalidad': p['modalidad'],
-                'tipo_contrato': p['tipo_contrato']
-            })
-        perfil_data['postulaciones'] = postulaciones
+        if 'insignias' in campos:
+            perfil_data['insignias'] = _insignias_perfil(cursor, usuario_id)
+        if 'inscripciones' in campos:
+            perfil_data['inscripciones'] = _inscripciones_perfil(cursor, usuario_id)
+        if 'postulaciones' in campos:
+            perfil_data['postulaciones'] = _postulaciones_perfil(cursor, usuario_id)
 
-        conn.close()
         return perfil_data
 
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener el perfil: {str(e)}")
-    
 
-@app.get("/api/perfiles/empresa/{usuario_id}")
-async def obtener_perfil_empresa(usuario_id: int):
+
+def _insignias_perfil(cursor: sqlite3.Cursor, usuario_id: int) -> List[Dict[str, Any]]:
+    """Insignias del perfil, de la más reciente a la más antigua."""
+    # 2) Insignias del usuario (puede haber varias)
+    cursor.execute(SQL_PERFIL_INSIGNIAS, (usuario_id,))
+    insignias = []
+    for i in cursor.fetchall():
+        insignias.append({
+            'id': i['id'],
+            'curso_id': i['curso_id'],
+            'nombre': i['nombre'],
+            'descripcion': i['descripcion'],
+            'fecha_obtencion': i['fecha_obtencion'],
+            'codigo_verificacion': i['codigo_verificacion'],
+            'imagen_url': i['imagen_url']
+        })
+    return insignias
+
+
+def _inscripciones_perfil(cursor: sqlite3.Cursor, usuario_id: int) -> List[Dict[str, Any]]:
+    """Inscripciones a cursos del perfil, con el título del curso."""
+    # 3) Inscripciones a cursos (unir con la tabla cursos para mostrar título)
+    cursor.execute(SQL_PERFIL_INSCRIPCIONES, (usuario_id,))
+    inscripciones = []
+    for ic in cursor.fetchall():
+        inscripciones.append({
+            'id': ic['inscripcion_id'],
+            'curso_id': ic['curso_id'],
+            'curso_titulo': ic['curso_titulo'],
+            'curso_descripcion': ic['curso_descripcion'],
+            'fecha_inscripcion': ic['fecha_inscripcion'],
+            'progreso': ic['progreso'],
+            'estado': ic['estado'],
+            'fecha_completado': ic['fecha_completado'],
+            'puntaje_test': ic['puntaje_test']
+        })
+    return inscripciones
+
+
+def _postulaciones_perfil(cursor: sqlite3.Cursor, usuario_id: int) -> List[Dict[str, Any]]:
+    """Postulaciones del perfil, con datos básicos de la oferta."""
+    # 4) Postulaciones a ofertas de empleo (unir con la tabla ofertas_empleo para mostrar información)
+    cursor.execute(SQL_PERFIL_POSTULACIONES, (usuario_id,))
+    postulaciones = []
+    for p in cursor.fetchall():
+        postulaciones.append({
+            'id': p['postulacion_id'],
+            'oferta_id': p['oferta_id'],
+            'empresa': p['empresa'],
+            'puesto': p['puesto'],
+            'descripcion': p['descripcion'],
+            'estado_actual': p['estado_actual'],
+            'fecha_creacion': p['fecha_creacion'],
+            'fecha_actualizacion': p['fecha_actualizacion'],
+            'salario': p['salario'],
+            'ubicacion': p['ubicacion'],
+            'tags': _lista_json(p['tags']),
+            'oferta_titulo': p['oferta_titulo'],
+            'oferta_descripcion': p['oferta_descripcion'],
+            'modalidad': p['modalidad'],
+            'tipo_contrato': p['tipo_contrato']
+        })
+    return postulaciones
+
+
+@app.get("/api/perfiles/{usuario_id}")
+async def obtener_perfil(usuario_id: int, fields: Optional[str] = None):
     """
-    Obtiene el perfil completo de una empresa, incluyendo:
-    - datos básicos del usuario
-    - información completa de la empresa
-    - ofertas publicadas
-    - cursos publicados
+    Obtiene el perfil completo de un usuario, incluyendo:
+    - datos del perfil (perfiles_buscadores)
+    - insignias asociadas
+    - inscripciones a cursos (con información básica del curso)
+
+    Devuelve un único objeto JSON con las propiedades agrupadas. `fields` limita
+    los campos devueltos (ver `CAMPOS_PERFIL`); las listas no pedidas no se consultan.
     """
+    campos = campos_solicitados(fields, CAMPOS_PERFIL, 'perfiles', obligatorios=('usuario_id',))
+    return await ejecutar_en_db(como_json(_cargar_perfil_buscador), usuario_id, campos)
+
+
+def _cargar_perfil_empresa(conn: sqlite3.Connection, usuario_id: int):
+    """Consultas de `obtener_perfil_empresa`; se ejecuta en el executor de base de datos."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
         # 1) Datos básicos del usuario + información de la empresa
@@ -1782,7 +5162,6 @@ async def obtener_perfil_empresa(usuario_id: int):
 
         row = cursor.fetchone()
         if not row:
-            conn.close()
             raise HTTPException(status_code=404, detail="Perfil de empresa no encontrado")
 
         perfil_data = dict(row)
@@ -1803,7 +5182,7 @@ async def obtener_perfil_empresa(usuario_id: int):
                    salario_min, salario_max, fecha_publicacion, activa
             FROM ofertas_empleo
             WHERE empresa_id = ?
-            ORDER BY fecha_publicacion DESC
+            ORDER BY fecha_publicacion_ts DESC, id DESC
         ''', (perfil_data['empresa_id'],))
         
         ofertas = []
@@ -1828,7 +5207,7 @@ async def obtener_perfil_empresa(usuario_id: int):
                    visibilidad, fecha_publicacion, activo
             FROM cursos
             WHERE empresa_id = ?
-            ORDER BY fecha_publicacion DESC
+            ORDER BY fecha_publicacion_ts DESC, id DESC
         ''', (perfil_data['empresa_id'],))
         
         cursos = []
@@ -1845,7 +5224,6 @@ async def obtener_perfil_empresa(usuario_id: int):
             })
         perfil_data['cursos'] = cursos
 
-        conn.close()
         return perfil_data
 
     except HTTPException:
@@ -1854,6 +5232,23 @@ async def obtener_perfil_empresa(usuario_id: int):
         raise HTTPException(status_code=500, detail=f"Error al obtener el perfil de empresa: {str(e)}")
 
 
+@app.get("/api/perfiles/empresa/{usuario_id}")
+async def obtener_perfil_empresa(usuario_id: int):
+    """
+    Obtiene el perfil completo de una empresa, incluyendo:
+    - datos básicos del usuario
+    - información completa de la empresa
+    - ofertas publicadas
+    - cursos publicados
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, _perfil_empresa_json, usuario_id)
+
+
+def _perfil_empresa_json(usuario_id: int) -> RespuestaJSON:
+    return RespuestaJSON(entidad_cacheada('empresa', usuario_id, _cargar_perfil_empresa))
+
+
 # ============================================
 # ENDPOINTS PARA CURSOS
 # ============================================
@@ -1874,72 +5269,51 @@ class CursoCreate(BaseModel):
         extra = "ignore"
 
 
-@app.get("/api/cursos")
-def obtener_todos_los_cursos():
+# Campos de `/api/cursos` (ver `campos_solicitados`)
+CAMPOS_CURSO = {
+    'id': ('c.id', None),
+    'titulo': ('c.titulo', None),
+    'descripcion': ('c.descripcion', None),
+    'objetivos': ('c.objetivos', None),
+    'temario': ('c.temario', None),
+    'duracion_estimada': ('c.duracion_estimada', None),
+    'nivel_dificultad': ('c.nivel_dificultad', None),
+    # Parsear formato_contenido si viene como JSON string
+    'formato_contenido': ('c.formato_contenido', _lista_json),
+    'visibilidad': ('c.visibilidad', None),
+    'fecha_publicacion': ('c.fecha_publicacion', None),
+    'empresa': ('e.razon_social', None),
+    'sector': ('e.sector', None),
+}
+
+
+@app.get("/api/cursos", response_class=RespuestaJSON)
+def obtener_todos_los_cursos(
+    fields: Optional[str] = None,
+    _cache: None = Depends(cache_condicional('cursos', 'empresas')),
+    conn: sqlite3.Connection = Depends(get_db)
+):
     """
-    Obtiene todos los cursos públicos activos con información de la empresa
+    Obtiene todos los cursos públicos activos con información de la empresa.
+    `fields` limita los campos devueltos (ver `CAMPOS_CURSO`).
     """
+    campos = campos_solicitados(fields, CAMPOS_CURSO, 'cursos')
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         # Query con JOIN para obtener información de la empresa
-        cursor.execute('''
-            SELECT 
-                c.id,
-                c.titulo,
-                c.descripcion,
-                c.objetivos,
-                c.temario,
-                c.duracion_estimada,
-                c.nivel_dificultad,
-                c.formato_contenido,
-                c.visibilidad,
-                c.fecha_publicacion,
-                c.activo,
-                e.razon_social as empresa,
-                e.sector
+        cursor.execute(f'''
+            SELECT {select_campos(CAMPOS_CURSO, campos)}
             FROM cursos c
             INNER JOIN empresas e ON c.empresa_id = e.id
             WHERE c.visibilidad = 'publico' AND c.activo = 1
-            ORDER BY c.fecha_publicacion DESC
+            ORDER BY c.fecha_publicacion_ts DESC, c.id DESC
         ''')
         
-        cursos = []
-        for row in cursor.fetchall():
-            # Parsear formato_contenido si viene como JSON string
-            formato_contenido = row['formato_contenido']
-            try:
-                if formato_contenido and isinstance(formato_contenido, str):
-                    formato_contenido = json.loads(formato_contenido)
-                elif not formato_contenido:
-                    formato_contenido = []
-            except Exception:
-                formato_contenido = []
-            
-            curso = {
-                'id': row['id'],
-                'titulo': row['titulo'],
-                'descripcion': row['descripcion'],
-                'objetivos': row['objetivos'],
-                'temario': row['temario'],
-                'duracion_estimada': row['duracion_estimada'],
-                'nivel_dificultad': row['nivel_dificultad'],
-                'formato_contenido': formato_contenido,
-                'visibilidad': row['visibilidad'],
-                'fecha_publicacion': row['fecha_publicacion'],
-                'empresa': row['empresa'],
-                'sector': row['sector']
-            }
-            cursos.append(curso)
-        
-        conn.close()
+        codificar = codificador_filas(CAMPOS_CURSO, campos, cursor.description)
+        cursos = [codificar(row) for row in cursor.fetchall()]
         
-        return {
-            "cursos": cursos,
-            "total": len(cursos)
-        }
+        return json_listado('cursos', cursos, total=len(cursos))
         
     except sqlite3.Error as e:
         raise HTTPException(
@@ -1948,6 +5322,44 @@ def obtener_todos_los_cursos():
         )
 
 
+def _insertar_curso(conn: sqlite3.Connection, curso: CursoCreate, nivel_dificultad: str,
+                   visibilidad: str, formato_contenido: Optional[str]) -> int:
+    """Operación de escritura de `crear_curso` (corre en `db_writer`)."""
+    # Validar que la empresa existe
+    cursor = conn.cursor()
+
+    cursor.execute('SELECT id FROM empresas WHERE id = ?', (curso.empresa_id,))
+    if not cursor.fetchone():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Empresa no encontrada"
+        )
+
+    # Insertar el curso
+    # Nota: activo y fecha_publicacion tienen valores por defecto en la BD,
+    # pero los establecemos explícitamente para asegurar consistencia
+    cursor.execute('''
+        INSERT INTO cursos (
+            empresa_id, titulo, descripcion, objetivos, temario,
+            duracion_estimada, nivel_dificultad, formato_contenido,
+            visibilidad, oferta_asociada, activo
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    ''', (
+        curso.empresa_id,
+        curso.titulo,
+        curso.descripcion,
+        curso.objetivos,
+        curso.temario,
+        curso.duracion_estimada,
+        nivel_dificultad,
+        formato_contenido,
+        visibilidad,
+        curso.oferta_asociada
+    ))
+
+    return cursor.lastrowid
+
+
 @app.post("/api/cursos")
 def crear_curso(curso: CursoCreate):
     """Crea un nuevo curso a partir de un JSON en el body."""
@@ -2002,43 +5414,7 @@ def crear_curso(curso: CursoCreate):
         else:
             formato_contenido = formato_value  # ya es str o None
 
-        # Validar que la empresa existe
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute('SELECT id FROM empresas WHERE id = ?', (curso.empresa_id,))
-        if not cursor.fetchone():
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Empresa no encontrada"
-            )
-
-        # Insertar el curso
-        # Nota: activo y fecha_publicacion tienen valores por defecto en la BD,
-        # pero los establecemos explícitamente para asegurar consistencia
-        cursor.execute('''
-            INSERT INTO cursos (
-                empresa_id, titulo, descripcion, objetivos, temario,
-                duracion_estimada, nivel_dificultad, formato_contenido,
-                visibilidad, oferta_asociada, activo
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-        ''', (
-            curso.empresa_id,
-            curso.titulo,
-            curso.descripcion,
-            curso.objetivos,
-            curso.temario,
-            curso.duracion_estimada,
-            nivel_dificultad,
-            formato_contenido,
-            visibilidad,
-            curso.oferta_asociada
-        ))
-
-        new_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        new_id = escribir(_insertar_curso, curso, nivel_dificultad, visibilidad, formato_contenido)
 
         return {"message": "Curso creado exitosamente", "curso_id": new_id}
 
@@ -2087,14 +5463,20 @@ def serve_page(page_name: str):
     raise HTTPException(status_code=404, detail=f"Página '{page_name}' no encontrada")
 
 
-@app.get("/api/cursos/{curso_id}")
-def obtener_detalle_curso(curso_id: int):
+@app.get("/api/cursos/{curso_id}", response_class=RespuestaJSON)
+def obtener_detalle_curso(
+    curso_id: int,
+    _cache: None = Depends(cache_condicional('cursos', 'empresas', 'ofertas_empleo'))
+):
     """
     Obtiene los detalles completos de un curso específico por su ID
     """
+    return entidad_cacheada('curso', curso_id, _cargar_curso)
+
+
+def _cargar_curso(conn: sqlite3.Connection, curso_id: int) -> Dict[str, Any]:
+    """Consultas de `obtener_detalle_curso`; el resultado se guarda en `cache_entidades`."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         # Query con JOIN para obtener información completa del curso y la empresa
@@ -2177,7 +5559,6 @@ def obtener_detalle_curso(curso_id: int):
             }
         }
         
-        conn.close()
         return curso
         
     except HTTPException:
@@ -2190,13 +5571,11 @@ def obtener_detalle_curso(curso_id: int):
 
 
 @app.get("/api/cursos/usuario/{user_id}")
-def obtener_cursos_usuario(user_id: int):
+def obtener_cursos_usuario(user_id: int, conn: sqlite3.Connection = Depends(get_db)):
     """
     Obtiene los cursos en los que está inscrito un usuario específico
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -2223,7 +5602,7 @@ def obtener_cursos_usuario(user_id: int):
             INNER JOIN cursos c ON ic.curso_id = c.id
             INNER JOIN empresas e ON c.empresa_id = e.id
             WHERE ic.usuario_id = ? AND c.activo = 1
-            ORDER BY ic.fecha_inscripcion DESC
+            ORDER BY ic.fecha_inscripcion_ts DESC, ic.id DESC
         ''', (user_id,))
         
         cursos = []
@@ -2261,7 +5640,6 @@ def obtener_cursos_usuario(user_id: int):
             }
             cursos.append(curso)
         
-        conn.close()
         
         return {
             "cursos": cursos,
@@ -2278,6 +5656,76 @@ def obtener_cursos_usuario(user_id: int):
 class InscripcionRequest(BaseModel):
     usuario_id: int
 
+def _inscribir_en_curso(conn: sqlite3.Connection, usuario_id: int, curso_id: int) -> Dict[str, Any]:
+    """Operación de escritura de `inscribir_usuario_curso` (corre en `db_writer`)."""
+    cursor = conn.cursor()
+    
+    # Verificar que el usuario existe y es un buscador
+    cursor.execute('SELECT id, tipo_usuario FROM usuarios WHERE id = ?', (usuario_id,))
+    usuario = cursor.fetchone()
+    
+    if not usuario:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuario no encontrado"
+        )
+    
+    if usuario['tipo_usuario'] != 'buscador':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los usuarios (buscadores de empleo) pueden inscribirse a cursos"
+        )
+    
+    # Verificar que el curso existe y está activo
+    cursor.execute('SELECT id, titulo, activo FROM cursos WHERE id = ?', (curso_id,))
+    curso = cursor.fetchone()
+    
+    if not curso:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Curso no encontrado"
+        )
+    
+    if not curso['activo']:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El curso no está disponible para inscripción"
+        )
+    
+    # Verificar si ya está inscrito
+    cursor.execute('''
+        SELECT id FROM inscripciones_cursos 
+        WHERE usuario_id = ? AND curso_id = ?
+    ''', (usuario_id, curso_id))
+    
+    inscripcion_existente = cursor.fetchone()
+    
+    if inscripcion_existente:
+        return {
+            "message": "Ya estás inscrito en este curso",
+            "inscripcion_id": inscripcion_existente['id'],
+            "ya_inscrito": True
+        }
+    
+    # Insertar la inscripción
+    cursor.execute('''
+        INSERT INTO inscripciones_cursos (usuario_id, curso_id, estado, progreso)
+        VALUES (?, ?, 'no_iniciado', 0)
+    ''', (usuario_id, curso_id))
+    
+    inscripcion_id = cursor.lastrowid
+    
+    return {
+        "message": "Inscripción realizada exitosamente",
+        "inscripcion_id": inscripcion_id,
+        "curso_id": curso_id,
+        "curso_titulo": curso['titulo'],
+        "usuario_id": usuario_id,
+        "ya_inscrito": False
+    }
+    
+
+
 @app.post("/api/cursos/{curso_id}/inscribir")
 def inscribir_usuario_curso(curso_id: int, inscripcion: InscripcionRequest):
     """
@@ -2293,80 +5741,7 @@ def inscribir_usuario_curso(curso_id: int, inscripcion: InscripcionRequest):
                 detail="Se requiere usuario_id para inscribirse al curso"
             )
         
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Verificar que el usuario existe y es un buscador
-        cursor.execute('SELECT id, tipo_usuario FROM usuarios WHERE id = ?', (usuario_id,))
-        usuario = cursor.fetchone()
-        
-        if not usuario:
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Usuario no encontrado"
-            )
-        
-        if usuario['tipo_usuario'] != 'buscador':
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Solo los usuarios (buscadores de empleo) pueden inscribirse a cursos"
-            )
-        
-        # Verificar que el curso existe y está activo
-        cursor.execute('SELECT id, titulo, activo FROM cursos WHERE id = ?', (curso_id,))
-        curso = cursor.fetchone()
-        
-        if not curso:
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Curso no encontrado"
-            )
-        
-        if not curso['activo']:
-            conn.close()
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El curso no está disponible para inscripción"
-            )
-        
-        # Verificar si ya está inscrito
-        cursor.execute('''
-            SELECT id FROM inscripciones_cursos 
-            WHERE usuario_id = ? AND curso_id = ?
-        ''', (usuario_id, curso_id))
-        
-        inscripcion_existente = cursor.fetchone()
-        
-        if inscripcion_existente:
-            conn.close()
-            return {
-                "message": "Ya estás inscrito en este curso",
-                "inscripcion_id": inscripcion_existente['id'],
-                "ya_inscrito": True
-            }
-        
-        # Insertar la inscripción
-        cursor.execute('''
-            INSERT INTO inscripciones_cursos (usuario_id, curso_id, estado, progreso)
-            VALUES (?, ?, 'no_iniciado', 0)
-        ''', (usuario_id, curso_id))
-        
-        inscripcion_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return {
-            "message": "Inscripción realizada exitosamente",
-            "inscripcion_id": inscripcion_id,
-            "curso_id": curso_id,
-            "curso_titulo": curso['titulo'],
-            "usuario_id": usuario_id,
-            "ya_inscrito": False
-        }
+        return escribir(_inscribir_en_curso, usuario_id, curso_id)
         
     except HTTPException:
         raise
@@ -2378,25 +5753,23 @@ def inscribir_usuario_curso(curso_id: int, inscripcion: InscripcionRequest):
 
 
 @app.get("/api/session") 
-def get_session(request: Request): 
-    user_id = request.cookies.get("user_id") 
-    if not user_id: 
-        return {"logged": False} 
+def get_session(request: Request, response: Response): 
     try: 
-        uid = int(user_id) 
-    except Exception: 
+        user = usuario_de_sesion(request, response) 
+    except HTTPException as e: 
+        return {"logged": False} if e.status_code < 500 else {"logged": False, "error": e.detail} 
+    if not user: 
         return {"logged": False} 
-    try: 
-        conn = sqlite3.connect(DB_PATH) 
-        conn.row_factory = sqlite3.Row 
-        cursor = conn.cursor() 
-        cursor.execute("SELECT id, email, nombre, tipo_usuario FROM usuarios WHERE id = ?", (uid,)) 
-        user = cursor.fetchone() 
-        conn.close() 
-        if not user: 
-            return {"logged": False} 
-        return {"logged": True, "session": dict(user)} 
-    except Exception as e: return {"logged": False, "error": str(e)}
+    return {"logged": True, "session": user} 
+
+
+@app.post("/api/logout")
+def logout():
+    """Borra la cookie de sesión (HttpOnly, el navegador no puede hacerlo) y la de legado."""
+    respuesta = JSONResponse({"ok": True})
+    respuesta.delete_cookie(SESION_COOKIE, path='/')
+    respuesta.delete_cookie('user_id', path='/')
+    return respuesta
     
 
 
@@ -0,0 +1,57 @@
+"""Errores del escritor de SQLite.
+
+Si falla el BEGIN o el COMMIT de un lote, todas sus operaciones tienen que
+recibir el error de inmediato, también las que no alcanzaron a empezar.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+import pytest
+
+os.environ.setdefault("CEO_DB_PATH", os.path.join(tempfile.mkdtemp(), "CEO.db"))
+os.environ.setdefault("CEO_SESSION_EPHEMERAL_KEY", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+class _ConexionBeginFallido:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql, *args):
+        if sql == "BEGIN IMMEDIATE":
+            raise sqlite3.OperationalError("database is locked")
+        return self._conn.execute(sql, *args)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+class _EscritorBeginFallido(main.EscritorSQLite):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encolado = threading.Event()
+
+    def _conectar(self):
+        # El hilo no toma nada de la cola hasta que estén todas las operaciones
+        self.encolado.wait(5)
+        return _ConexionBeginFallido(super()._conectar())
+
+
+def test_begin_fallido_resuelve_todo_el_lote(tmp_path):
+    escritor = _EscritorBeginFallido(str(tmp_path / "w.db"), batch_max=16, flush_ms=50)
+    try:
+        futuros = [escritor.submit(lambda conn, i: i, i) for i in range(5)]
+        escritor.encolado.set()
+        for futuro in futuros:
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                futuro.result(timeout=2)
+        stats = escritor.stats()
+        assert stats["fallidas"] == 5
+        assert stats["lotes"] == 0
+    finally:
+        escritor.stop()
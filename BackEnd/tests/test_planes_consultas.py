@@ -0,0 +1,111 @@
+"""Regresión de planes de consulta.
+
+Crea el esquema con `crear_esquema` en una base temporal y revisa con EXPLAIN
+QUERY PLAN las consultas de los endpoints más transitados, armadas con las
+mismas constantes `SQL_*` y funciones de filtros que usan los endpoints. Falla
+si alguna recorre una tabla completa (SCAN), p. ej. porque se perdió un índice
+o se reescribió una consulta.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+os.environ.setdefault("CEO_DB_PATH", os.path.join(tempfile.mkdtemp(), "CEO.db"))
+os.environ.setdefault("CEO_SESSION_EPHEMERAL_KEY", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+CURSOR = main.codificar_cursor(1763664520, 9)
+
+
+def _ofertas_pagina(**filtros):
+    cursor_pagina = filtros.pop('cursor', None)
+    condiciones, params = main.filtros_ofertas(
+        filtros.get('ubicacion'), filtros.get('modalidad'), filtros.get('tipo_contrato'),
+        filtros.get('salario_min'), filtros.get('habilidad'), filtros.get('radio_km')
+    )
+    if cursor_pagina:
+        condiciones.append("(o.fecha_publicacion_ts, o.id) < (:cursor_ts, :cursor_id)")
+        params['cursor_ts'], params['cursor_id'] = main.decodificar_cursor(cursor_pagina, 2)
+    params['limite'] = 21
+    sql = main.SQL_OFERTAS_PAGINA.format(
+        columnas=main.select_campos(main.CAMPOS_OFERTA, list(main.CAMPOS_OFERTA)),
+        condiciones=' AND '.join(['o.activa = 1'] + condiciones)
+    )
+    return sql, params
+
+
+def _postulaciones_empresa(sql, estado=None, cursor_pagina=None, **columnas):
+    condiciones, params = main.filtros_postulaciones_empresa(1, estado, None, None, None, cursor_pagina)
+    params['limite'] = 51
+    return sql.format(condiciones=' AND '.join(condiciones), **columnas), params
+
+
+def _buscar_ofertas():
+    sql = main.SQL_BUSCAR_OFERTAS.format(
+        columnas=main.select_campos(main.CAMPOS_OFERTA, list(main.CAMPOS_OFERTA)), filtros=''
+    )
+    params = {'consulta': main.consulta_fts('react'), 'peso': 0.5, 'ahora': 1763664520,
+              'vida_media': 30.0, 'limite': 50}
+    return sql, params
+
+
+CONSULTAS = {
+    'validar_login': (main.SQL_USUARIO_POR_EMAIL, ('buscador1@ejemplo.com',)),
+    'obtener_todas_las_ofertas': _ofertas_pagina(),
+    'obtener_todas_las_ofertas.cursor': _ofertas_pagina(cursor=CURSOR),
+    'obtener_todas_las_ofertas.filtros': _ofertas_pagina(modalidad='Remoto', salario_min=1000000),
+    'obtener_todas_las_ofertas.municipio': _ofertas_pagina(ubicacion='Medellín', radio_km=50),
+    'obtener_todas_las_ofertas.habilidad': _ofertas_pagina(habilidad='python'),
+    'buscar_ofertas': _buscar_ofertas(),
+    'obtener_ofertas_recomendadas.relleno': (main.SQL_RECOMENDADAS_RELLENO.format(excluidas='?, ?'), (1, 2, 8)),
+    'listar_postulaciones': (
+        main.SQL_POSTULACIONES_USUARIO.format(
+            columnas=main.select_campos(main.CAMPOS_POSTULACION, [c for c in main.CAMPOS_POSTULACION if c != 'historial'])
+        ),
+        (1,)
+    ),
+    'listar_postulaciones.historial': (main.SQL_HISTORIAL_POSTULACIONES.format(ids='?, ?'), (1, 2)),
+    'listar_postulaciones_empresa': _postulaciones_empresa(
+        main.SQL_POSTULACIONES_EMPRESA_PAGINA,
+        columnas=main.select_campos(main.CAMPOS_POSTULACION_EMPRESA, list(main.CAMPOS_POSTULACION_EMPRESA))
+    ),
+    'listar_postulaciones_empresa.cursor': _postulaciones_empresa(
+        main.SQL_POSTULACIONES_EMPRESA_PAGINA, cursor_pagina=CURSOR,
+        columnas=main.select_campos(main.CAMPOS_POSTULACION_EMPRESA, list(main.CAMPOS_POSTULACION_EMPRESA))
+    ),
+    'obtener_aspirantes_empresa': _postulaciones_empresa(main.SQL_ASPIRANTES_EMPRESA),
+    'obtener_aspirantes_empresa.estado': _postulaciones_empresa(main.SQL_ASPIRANTES_EMPRESA, estado='Registrada'),
+    'obtener_ofertas_empresa': (main.SQL_OFERTAS_EMPRESA, (1,)),
+    'obtener_perfil.usuario': (
+        main.SQL_PERFIL_USUARIO.format(
+            columnas=main.select_campos(main.CAMPOS_PERFIL, list(main.CAMPOS_PERFIL))
+        ),
+        (1,)
+    ),
+    'obtener_perfil.insignias': (main.SQL_PERFIL_INSIGNIAS, (1,)),
+    'obtener_perfil.inscripciones': (main.SQL_PERFIL_INSCRIPCIONES, (1,)),
+    'obtener_perfil.postulaciones': (main.SQL_PERFIL_POSTULACIONES, (1,)),
+}
+
+
+@pytest.fixture(scope="module")
+def conexion(tmp_path_factory):
+    conn = sqlite3.connect(str(tmp_path_factory.mktemp("planes") / "CEO.db"))
+    main.crear_esquema(conn.cursor())
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("nombre", list(CONSULTAS))
+def test_consulta_sin_scan(conexion, nombre):
+    sql, params = CONSULTAS[nombre]
+    plan = [fila[3] for fila in conexion.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    # Un MATCH de FTS5 aparece como "SCAN ... VIRTUAL TABLE INDEX", pero usa el índice
+    scans = [paso for paso in plan if paso.startswith("SCAN ") and "VIRTUAL TABLE INDEX" not in paso]
+    assert not scans, f"{nombre} recorre tablas completas: {plan}"